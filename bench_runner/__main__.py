@@ -8,12 +8,14 @@ import rich
 COMMANDS = {
     "backfill": "Schedule benchmarking a number of commits",
     "compare": "Compare a matrix of specific results",
+    "detect_regressions": "Detect and report regressions in the results over time",
     "find_failures": "Find the benchmarks that failed in the last weekly run",
     "generate_results": "Create all of the derived artifacts from raw data",
     "get_merge_base": (
         "Get the merge base of the selected commit, and determine if it should run"
     ),
     "install": "Install the workflow files into a results repository",
+    "profiling_diff": "Compare the profiling results of two runs",
     "profiling_plot": "Generate the profiling plots from raw data",
     "purge": "Purge old results from a results repository",
     "remove_benchmark": "Remove specific benchmarks from the data set",
@@ -0,0 +1,291 @@
+"""
+Online change-point detection over the longitudinal time series of results.
+
+Each series (the geometric mean of a runner and configuration against a fixed
+base, or the median time of one of its benchmarks) is fed through a two-sided
+CUSUM detector, one point at a time, in commit date order. The detector keeps
+the mean and standard deviation of the current segment of the series, and
+flags a change point once the cumulative deviation from it in either direction
+exceeds a threshold. Values are compared in log space, so changes are relative.
+
+The state of every detector is saved in `changepoints.json`, at the top of the
+results repository, so each new result only costs a constant amount of work.
+A series is only replayed from the start if a result is inserted before the
+last one seen (e.g. when backfilling), or removed.
+"""
+
+from __future__ import annotations
+
+
+import json
+import math
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Callable, Sequence
+
+
+from . import result as mod_result
+from . import trend_store
+from .util import PathLike
+
+
+STATE_FILENAME = "changepoints.json"
+
+# Bump this whenever the state or the detector changes, to force a rebuild.
+SCHEMA_VERSION = 1
+
+# The cumulative deviation, in standard deviations, that signals a change
+THRESHOLD = 5.0
+
+# The deviation, in standard deviations, that is ignored at each point
+DRIFT = 0.5
+
+# The number of points used to estimate the mean and standard deviation of a
+# segment before looking for changes in it
+MIN_SIZE = 5
+
+# The smallest standard deviation assumed (in log space, so roughly relative),
+# so that tiny changes in very stable series aren't reported
+MIN_STD = 0.005
+
+
+def get_state_path(repo_dir: PathLike) -> Path:
+    return Path(repo_dir) / STATE_FILENAME
+
+
+class _RunningStats:
+    """
+    The count, mean and sum of squared differences of a stream of values,
+    using Welford's algorithm.
+    """
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        if self.n < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.n - 1))
+
+    def to_list(self) -> list[float]:
+        return [self.n, self.mean, self.m2]
+
+
+def _empty_side() -> dict[str, Any]:
+    return {"sum": 0.0, "before": None, "first": None, "stats": _RunningStats()}
+
+
+class Detector:
+    """
+    A two-sided CUSUM change-point detector.
+
+    `update` takes each point of the series, and a label identifying it, and
+    returns a description of the change if one was detected at that point.
+    """
+
+    def __init__(self, state: dict[str, Any] | None = None):
+        if state is None:
+            state = {}
+        self.segment = _RunningStats(*state.get("segment", ()))
+        self.previous = state.get("previous")
+        # For increases (+1) and decreases (-1), the cumulative deviation, the
+        # labels of the last point before and the first point after the
+        # possible change, and the values since it
+        self.sides: dict[int, dict[str, Any]] = {}
+        for direction in (1, -1):
+            side = state.get("sides", {}).get(str(direction), {})
+            self.sides[direction] = {
+                "sum": side.get("sum", 0.0),
+                "before": side.get("before"),
+                "first": side.get("first"),
+                "stats": _RunningStats(*side.get("stats", ())),
+            }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "segment": self.segment.to_list(),
+            "previous": self.previous,
+            "sides": {
+                str(direction): {
+                    "sum": side["sum"],
+                    "before": side["before"],
+                    "first": side["first"],
+                    "stats": side["stats"].to_list(),
+                }
+                for direction, side in self.sides.items()
+            },
+        }
+
+    def update(self, value: float, label: Any) -> dict[str, Any] | None:
+        x = math.log(value)
+        change = None
+
+        if self.segment.n < MIN_SIZE:
+            self.segment.add(x)
+        else:
+            std = max(self.segment.std, MIN_STD)
+            z = (x - self.segment.mean) / std
+            for direction, side in self.sides.items():
+                total = side["sum"] + direction * z - DRIFT
+                if total <= 0.0:
+                    self.sides[direction] = _empty_side()
+                    continue
+                if side["sum"] == 0.0:
+                    side.update(before=self.previous, first=label)
+                side["sum"] = total
+                side["stats"].add(x)
+                if change is None and total > THRESHOLD:
+                    change = {
+                        "direction": direction,
+                        "before": side["before"],
+                        "first": side["first"],
+                        "detected": label,
+                        "ratio": math.exp(side["stats"].mean - self.segment.mean),
+                    }
+                    new_segment = side["stats"]
+
+            if change is not None:
+                # The points since the change are the start of the new segment
+                self.segment = new_segment
+                self.sides = {direction: _empty_side() for direction in self.sides}
+            elif all(side["sum"] == 0.0 for side in self.sides.values()):
+                self.segment.add(x)
+
+        self.previous = label
+        return change
+
+
+def get_label(result: mod_result.Result) -> dict[str, str]:
+    return {
+        "result": trend_store.get_result_key(result.filename),
+        "hash": result.cpython_hash,
+        "fork": result.fork,
+        "date": result.commit_date,
+    }
+
+
+class ChangePointStore:
+    """
+    The detector state and change points of every series in a
+    `changepoints.json` file.
+
+    Use as a context manager, so that any changes are saved at the end. The
+    state is discarded if it was computed against a different base.
+    """
+
+    def __init__(self, path: PathLike, base: str):
+        self.path = Path(path)
+        self.base = base
+        self._series: dict[str, dict[str, Any]] = {}
+        self.is_new = True
+
+        if self.path.is_file():
+            with self.path.open(encoding="utf-8") as fd:
+                state = json.load(fd)
+            if state.get("version") == SCHEMA_VERSION and state.get("base") == base:
+                self._series = state["series"]
+                self.is_new = False
+
+    def __enter__(self) -> "ChangePointStore":
+        return self
+
+    def __exit__(self, *_args) -> None:
+        self.save()
+
+    def update(
+        self,
+        key: str,
+        fields: dict[str, Any],
+        results: Sequence[mod_result.Result],
+        get_value: Callable[[mod_result.Result], float | None],
+    ) -> list[dict[str, Any]]:
+        """
+        Feed the results of a series, in order, that haven't been seen yet to
+        its detector. `get_value` is only called for those results.
+
+        Returns the change points detected in the new results.
+        """
+        entry = self._series.get(key)
+        if entry is not None:
+            count = entry["count"]
+            if count > len(results) or (
+                count > 0
+                and trend_store.get_result_key(results[count - 1].filename)
+                != entry["last"]
+            ):
+                # The series has changed before the last point seen
+                entry = None
+        if entry is None:
+            entry = {**fields, "count": 0, "last": None, "detector": {}, "changes": []}
+        self._series[key] = entry
+
+        detector = Detector(entry["detector"])
+        new_changes = []
+        for result in results[entry["count"] :]:
+            value = get_value(result)
+            if value is None or value <= 0.0:
+                continue
+            change = detector.update(value, get_label(result))
+            if change is not None:
+                entry["changes"].append(change)
+                new_changes.append({**fields, **change})
+
+        entry["detector"] = detector.to_dict()
+        entry["count"] = len(results)
+        if len(results):
+            entry["last"] = trend_store.get_result_key(results[-1].filename)
+        return new_changes
+
+    def get_changes(self) -> list[dict[str, Any]]:
+        """
+        Get all of the change points of every series, with the fields
+        describing the series.
+        """
+        changes = []
+        for entry in self._series.values():
+            fields = {
+                k: v
+                for k, v in entry.items()
+                if k not in ("count", "last", "detector", "changes")
+            }
+            changes.extend({**fields, **change} for change in entry["changes"])
+        return changes
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump(
+                    {
+                        "version": SCHEMA_VERSION,
+                        "base": self.base,
+                        "series": dict(sorted(self._series.items())),
+                    },
+                    fp,
+                    indent=1,
+                )
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+
+def get_slowdown(change: dict[str, Any]) -> float:
+    """
+    How much slower the series got at a change point, as a fraction. This is
+    negative for improvements.
+    """
+    if change["higher_is_better"]:
+        return 1.0 / change["ratio"] - 1.0
+    return change["ratio"] - 1.0
@@ -0,0 +1,127 @@
+"""
+A content-addressed cache of the values computed when comparing two results.
+
+Entries are keyed on the digests of the two raw results files, the set of
+excluded benchmarks and the version of bench_runner, so they remain valid
+when derived files are regenerated (e.g. with `--force` after a change to the
+templates), and are only recomputed when the inputs actually change.
+
+Each entry also records the digest of its head results file, so the entries
+for a result are removed when the result is removed from the results index.
+"""
+
+from __future__ import annotations
+
+
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+from typing import Any
+
+
+from . import util
+from .util import PathLike
+
+
+# Bump this whenever the set of cached values changes, to force a rebuild.
+SCHEMA_VERSION = 2
+
+CACHE_FILENAME = "comparisons.sqlite"
+
+
+def get_cache_path(results_dir: PathLike) -> Path:
+    return util.get_cache_dir(results_dir) / CACHE_FILENAME
+
+
+def get_key(ref_digest: str, head_digest: str, *extra: Any) -> str:
+    """
+    Get the cache key for a comparison between two results files with the
+    given digests. Anything else the comparison depends on should be passed
+    in `extra`.
+    """
+    return hashlib.sha256(
+        json.dumps(
+            [
+                SCHEMA_VERSION,
+                util.get_bench_runner_version(),
+                sorted(util.get_excluded_benchmarks()),
+                ref_digest,
+                head_digest,
+                *extra,
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Comparisons may be generated from many worker processes at once
+    conn = sqlite3.connect(path, timeout=60)
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version != SCHEMA_VERSION:
+        conn.execute("DROP TABLE IF EXISTS comparisons")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS comparisons (
+            key TEXT PRIMARY KEY,
+            head_digest TEXT NOT NULL,
+            value TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS comparisons_head ON comparisons (head_digest)"
+    )
+    return conn
+
+
+def load(results_dir: PathLike, key: str) -> dict[str, Any] | None:
+    """
+    Get the cached values for the given key, or None if there aren't any.
+    """
+    path = get_cache_path(results_dir)
+    if not path.is_file():
+        return None
+    conn = _connect(path)
+    try:
+        row = conn.execute(
+            "SELECT value FROM comparisons WHERE key = ?", (key,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return json.loads(row[0])
+
+
+def store(
+    results_dir: PathLike, key: str, head_digest: str, value: dict[str, Any]
+) -> None:
+    conn = _connect(get_cache_path(results_dir))
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO comparisons VALUES (?, ?, ?)",
+                (key, head_digest, json.dumps(value)),
+            )
+    finally:
+        conn.close()
+
+
+def remove(results_dir: PathLike, head_digest: str) -> None:
+    """
+    Remove the cached comparisons of the results file with the given digest.
+    """
+    path = get_cache_path(results_dir)
+    if not path.is_file():
+        return
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute(
+                "DELETE FROM comparisons WHERE head_digest = ?", (head_digest,)
+            )
+    finally:
+        conn.close()
@@ -28,13 +28,14 @@ import io
 import functools
 import json
 from pathlib import Path
-from typing import Any, Mapping
+from typing import Any, Callable, Iterable, Mapping, Sequence
 
 
 import numpy as np
 from numpy.typing import NDArray
 
 
+from . import timing_store
 from . import util
 from .util import PathLike
 
@@ -51,18 +52,7 @@ def load_from_json(
 
 
 def load_data(data: Mapping[str, Any]) -> dict[str, NDArray[np.float64]]:
-    results = {}
-    for benchmark in data["benchmarks"]:
-        if "metadata" in benchmark:
-            name = benchmark["metadata"]["name"]
-        else:
-            name = data["metadata"]["name"]
-        values = []
-        for run in benchmark["runs"]:
-            values.extend(run.get("values", []))
-        results[name] = np.array(values, dtype=np.float64)
-
-    return results
+    return timing_store.load_data(data)
 
 
 def create_matrices(
@@ -154,15 +144,23 @@ def ranksum_table(n: int, alpha: float) -> tuple[float, float]:
 def get_rank(
     gr_x: NDArray[np.float64],
 ) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
-    rank = np.zeros((len(gr_x),), int)
-    rep = np.zeros((len(gr_x),), int)
+    """
+    Get the rank of each value (1 + the number of values less than it) and
+    the number of times it is repeated.
 
-    for i in range(len(gr_x)):
-        diff = gr_x - gr_x[i]
-        less = np.sum(diff < 0)
-        same = np.sum(diff == 0)
-        rank[i] = less + 1
-        rep[i] = same
+    NaN values compare unequal to everything, so they get a rank of 1 and a
+    repeat count of 0, and don't affect the rank of other values.
+    """
+    gr_x = np.asarray(gr_x)
+    sorted_x = np.sort(gr_x)
+    less = np.searchsorted(sorted_x, gr_x, side="left")
+    rank = less + 1
+    rep = np.searchsorted(sorted_x, gr_x, side="right") - less
+
+    nan = np.isnan(gr_x)
+    if nan.any():
+        rank[nan] = 1
+        rep[nan] = 0
 
     return rank, rep
 
@@ -236,91 +234,226 @@ def hpt_basic(
     return crossbench(meddiff)
 
 
-def maxspeedup(
-    reli: float,
+class _BatchedHpt:
+    """
+    Evaluates `hpt_basic` for many values of `multi` at once.
+
+    Everything that doesn't depend on `multi` (the sorted samples, the head
+    side's median and the rank-sum bounds) is computed once up front.
+    """
+
+    def __init__(
+        self,
+        mtx_a: Mapping[str, NDArray[np.float64]],
+        mtx_b: Mapping[str, NDArray[np.float64]],
+        alpha: float,
+    ):
+        assert mtx_a.keys() == mtx_b.keys()
+
+        self.alpha = alpha
+        self.benchmarks = []
+        for bm in mtx_a.keys():
+            a = np.asarray(mtx_a[bm], dtype=np.float64)
+            b = np.asarray(mtx_b[bm], dtype=np.float64)
+            if len(a) == len(b):
+                self.benchmarks.append(
+                    (
+                        np.sort(a),
+                        np.sort(b),
+                        np.float64(np.median(b)),
+                        ranksum_table(len(a), alpha),
+                    )
+                )
+            else:
+                # The halves split by unibench don't line up with the two
+                # samples, so just do what hpt_basic does.
+                self.benchmarks.append((a, b, None, None))
+
+    def _meddiffs(
+        self,
+        multis: NDArray[np.float64],
+        sorted_a: NDArray[np.float64],
+        sorted_b: NDArray[np.float64],
+        mr: np.float64,
+        bounds: tuple[float, float],
+    ) -> NDArray[np.float64]:
+        # Scaling by a positive number keeps each row sorted
+        scaled = np.multiply.outer(multis, sorted_a)
+        k, n = scaled.shape
+
+        # Position of the start and end of each run of equal values in the
+        # scaled samples, which gives the number of lesser and equal values
+        # within the same sample.
+        index = np.broadcast_to(np.arange(n), (k, n))
+        run_start = np.ones((k, n), dtype=bool)
+        run_start[:, 1:] = scaled[:, 1:] != scaled[:, :-1]
+        run_end = np.ones((k, n), dtype=bool)
+        run_end[:, :-1] = run_start[:, 1:]
+        less_a = np.maximum.accumulate(np.where(run_start, index, 0), axis=1)
+        last_a = np.minimum.accumulate(
+            np.where(run_end, index, n - 1)[:, ::-1], axis=1
+        )[:, ::-1]
+
+        less_b = np.searchsorted(sorted_b, scaled, side="left")
+        same_b = np.searchsorted(sorted_b, scaled, side="right") - less_b
+
+        rank = less_a + less_b + 1
+        rep = (last_a - less_a + 1) + same_b
+        wl = np.sum(rank + (rep - 1) // 2, axis=1).astype(np.float64)
+
+        ml = np.median(scaled, axis=1)
+        rst_lower, rst_upper = bounds
+        return np.where(
+            (wl <= rst_lower) | (wl >= rst_upper), np.subtract(ml, mr), np.nan
+        )
+
+    def evaluate(self, multis: NDArray[np.float64]) -> NDArray[np.float64]:
+        """
+        Returns the first value returned by `hpt_basic` for each multiplier.
+        """
+        multis = np.asarray(multis, dtype=np.float64)
+        meddiff = np.zeros((len(multis), len(self.benchmarks)), float)
+
+        for i, (a, b, mr, bounds) in enumerate(self.benchmarks):
+            if bounds is not None:
+                meddiff[:, i] = self._meddiffs(multis, a, b, mr, bounds)
+            else:
+                for j, multi in enumerate(multis):
+                    hpt_x = np.hstack((multi * a, b), dtype=np.float64)
+                    meddiff[j, i] = unibench(hpt_x, self.alpha)
+
+        return np.array([crossbench(row)[0] for row in meddiff])
+
+
+class _DigitSearch:
+    """
+    The state of the digit-by-digit search for the maximum speedup at a given
+    reliability level.
+    """
+
+    def __init__(self, reli: float):
+        self.reli = reli
+        self.step = -1
+        self.myscale = 1.0
+        self.minimum = 1
+        self.maximum = 10
+        self.base_su = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.step >= ACC_MAXSU
+
+    def candidates(self) -> list[float]:
+        """
+        All of the values that may be tested while finding the next digit.
+        """
+        return [
+            self.base_su + self.myscale * mid
+            for mid in range(self.minimum + 1, self.maximum)
+        ]
+
+    def next_digit(self, is_above: Callable[[float], bool]) -> None:
+        step = self.step
+        while self.step == step:
+            mid = (self.maximum - self.minimum) // 2 + self.minimum
+            su = self.base_su + self.myscale * mid
+            if is_above(su):
+                self.minimum = mid
+            else:
+                self.maximum = mid
+
+            if self.minimum == self.maximum - 1:
+                self.base_su += self.minimum * self.myscale
+                self.myscale /= 10.0
+                self.step += 1
+                self.minimum = 0
+                self.maximum = 10
+
+
+def maxspeedups(
+    relis: Sequence[float],
     better: bool,
     alpha: float,
     mtx_a: Mapping[str, NDArray[np.float64]],
     mtx_b: Mapping[str, NDArray[np.float64]],
-) -> float:
-    if reli < 0.5:
-        raise ValueError(
-            f"The reliability value {reli}, which is less than 0.5, "
-            "will lead to a meaningless conclusion"
-        )
+) -> list[float]:
+    """
+    Find the maximum speedup (or slowdown) at each of the given reliability
+    levels, with a digit-by-digit search.
 
-    if better:
-        su = 10.0
-        ret, _, _ = hpt_basic(mtx_a, mtx_b, alpha, su)
-        if ret < 1.0 - reli:
-            print("Overflow: the maximum speedup is beyond the upper bound 10")
-            return -1.0
+    All of the candidates for the next digit of every search are evaluated as
+    a single batch, and values are shared between the searches.
+    """
+    for reli in relis:
+        if reli < 0.5:
+            raise ValueError(
+                f"The reliability value {reli}, which is less than 0.5, "
+                "will lead to a meaningless conclusion"
+            )
+
+    batch = _BatchedHpt(mtx_a, mtx_b, alpha)
+    rets: dict[float, float] = {}
+
+    def evaluate(sus: Iterable[float]) -> None:
+        todo = sorted(set(su for su in sus if su not in rets))
+        if todo:
+            if better:
+                multis = np.array(todo)
+            else:
+                multis = np.array([1.0 / su for su in todo])
+            rets.update(zip(todo, batch.evaluate(multis)))
+
+    def is_above(su: float, reli: float) -> bool:
+        # True if the speedup/slowdown is at least `su` with reliability `reli`
+        if better:
+            return rets[su] < 1.0 - reli
         else:
-            step = -1
-            myscale = 1.0
-            minimum = 1
-            maximum = 10
-            base_su = 0.0
-            while step < ACC_MAXSU:
-                mid = (maximum - minimum) // 2 + minimum
-                su = base_su + myscale * mid
-                ret, _, _ = hpt_basic(mtx_a, mtx_b, alpha, su)
-                if ret < 1 - reli:
-                    minimum = mid
-                else:
-                    maximum = mid
-
-                if minimum == maximum - 1:
-                    base_su += minimum * myscale
-                    myscale /= 10.0
-                    step += 1
-                    minimum = 0
-                    maximum = 10
-
-            return base_su
-    else:
-        su = 10.0
-        reci = 1.0 / su
-        ret, _, _ = hpt_basic(mtx_a, mtx_b, alpha, reci)
-        if ret > reli:
+            return rets[su] > reli
+
+    searches = [_DigitSearch(reli) for reli in relis]
+    evaluate([10.0, *(su for search in searches for su in search.candidates())])
+
+    results: dict[_DigitSearch, float] = {}
+    for search in searches:
+        if is_above(10.0, search.reli):
             print("Overflow: the maximum speedup is beyond the upper bound 10")
-            return -1
-        else:
-            step = -1
-            myscale = 1.0
-            minimum = 1
-            maximum = 10
-            base_su = 0.0
-            while step < ACC_MAXSU:
-                mid = (maximum - minimum) // 2 + minimum
-                su = base_su + myscale * mid
-                reci = 1.0 / su
-                ret, _, _ = hpt_basic(mtx_a, mtx_b, alpha, reci)
-                if ret > reli:
-                    minimum = mid
-                else:
-                    maximum = mid
-
-                if minimum == maximum - 1:
-                    base_su += minimum * myscale
-                    myscale /= 10.0
-                    step += 1
-                    minimum = 0
-                    maximum = 10
-
-            return base_su
+            results[search] = -1.0
+
+    active = [search for search in searches if search not in results]
+    while active:
+        evaluate(su for search in active for su in search.candidates())
+        for search in active:
+            search.next_digit(lambda su: is_above(su, search.reli))
+        active = [search for search in active if not search.done]
+
+    return [results.get(search, search.base_su) for search in searches]
+
+
+def maxspeedup(
+    reli: float,
+    better: bool,
+    alpha: float,
+    mtx_a: Mapping[str, NDArray[np.float64]],
+    mtx_b: Mapping[str, NDArray[np.float64]],
+) -> float:
+    return maxspeedups([reli], better, alpha, mtx_a, mtx_b)[0]
 
 
 def make_report(ref: PathLike, head: PathLike, alpha=0.1):
+    return make_report_from_data(load_from_json(ref), load_from_json(head), alpha)
+
+
+def make_report_from_data(
+    ref_data: Mapping[str, NDArray[np.float64]],
+    head_data: Mapping[str, NDArray[np.float64]],
+    alpha=0.1,
+):
     # The original code inverted the inputs from the standard in bench_runner,
     # and it's easier to just flip them here.
-    a, b = head, ref
+    a_data, b_data = head_data, ref_data
 
     result = io.StringIO()
 
-    a_data = load_from_json(a)
-    b_data = load_from_json(b)
-
     mtx_a, mtx_b = create_matrices(a_data, b_data)
 
     ret, wp, wn = hpt_basic(mtx_a, mtx_b, alpha)
@@ -338,8 +471,8 @@ def make_report(ref: PathLike, head: PathLike, alpha=0.1):
     result.write("# HPT report\n\n")
     result.write(f"- Reliability score: {ret:.2%} likely to be {relative}\n")
 
-    for reli in [0.9, 0.95, 0.99]:
-        ret = maxspeedup(reli, better, alpha, mtx_a, mtx_b)
+    relis = [0.9, 0.95, 0.99]
+    for reli, ret in zip(relis, maxspeedups(relis, better, alpha, mtx_a, mtx_b)):
         if ret > 0:
             result.write(f"- {reli:.0%} likely to have a {effect} of {ret:.2f}x\n")
 
@@ -4,16 +4,21 @@ from __future__ import annotations
 import argparse
 import datetime
 import functools
+import io
 import json
+import math
 from pathlib import Path
 import re
-import tempfile
-from typing import Callable, Iterable, Sequence
+import shutil
+import time
+from typing import Any, Callable, Iterable, Sequence
+import warnings
 
 
 from matplotlib import pyplot as plt
 import matplotlib
 import numpy as np
+import rich
 import rich_argparse
 from scour import scour
 
@@ -24,6 +29,7 @@ matplotlib.use("agg")
 from . import config as mconfig
 from . import flags as mflags
 from . import result
+from . import trend_store
 from .util import PathLike
 
 
@@ -49,29 +55,246 @@ INTERPRETER_HEAVY = {
 }
 
 
-def savefig(output_filename: PathLike, **kwargs):
-    class Options:
-        quiet = True
-        remove_descriptive_elements = True
-        strip_comments = True
-        indent_type = "none"
-        strip_ids = True
-        shorten_ids = True
-        digits = 3
+SVG_OPTIMIZERS = ("scour", "fast", "none")
 
+
+# How the plots of each comparison are written: as SVG files, or as the data
+# needed to draw them, which is rendered in the browser by the viewer.
+COMPARISON_PLOT_FORMATS = ("svg", "data")
+
+
+# The static page that renders the plot data files, installed at the top of
+# the results repository.
+VIEWER_FILENAME = "viewer.html"
+
+
+def install_viewer(dest_dir: PathLike) -> None:
+    """
+    Copy the viewer to the given directory, replacing any older version.
+    """
+    src = Path(__file__).parent / VIEWER_FILENAME
+    dest = Path(dest_dir) / VIEWER_FILENAME
+    if not dest.is_file() or dest.read_bytes() != src.read_bytes():
+        shutil.copyfile(src, dest)
+
+
+# The number of points of each distribution drawn on a violin plot
+VIOLIN_POINTS = 100
+
+
+# Settings used when rendering SVGs, so that matplotlib doesn't emit content
+# that would only be removed again afterward.
+SVG_RCPARAMS = {
+    # Use the same ids every time, so regenerated plots are byte-identical
+    "svg.hashsalt": "bench_runner",
+}
+SVG_METADATA = {"Creator": None, "Date": None, "Format": None, "Type": None}
+
+
+class _ScourOptions:
+    quiet = True
+    remove_descriptive_elements = True
+    strip_comments = True
+    indent_type = "none"
+    strip_ids = True
+    shorten_ids = True
+    digits = 3
+
+
+_MINIFY_REGEXES = [
+    (re.compile(rb"<!--.*?-->", re.DOTALL), b""),
+    (re.compile(rb">\s+<"), b"><"),
+]
+# Start tags, and the attributes within them. Only attribute values are
+# changed, never text or the contents of <style> elements.
+_TAG_REGEX = re.compile(rb"<[^!?/][^>]*>")
+_ATTRIBUTE_REGEX = re.compile(rb'\s+([\w:.-]+)="([^"]*)"')
+_WHITESPACE_REGEX = re.compile(rb"\s+")
+_NUMBER_REGEX = re.compile(rb"(?<![\w.#/])[0-9]+\.[0-9]+")
+_PATH_COMMAND_REGEX = re.compile(rb"\s*([A-Za-z])\s*")
+
+
+def _round_number(match: re.Match) -> bytes:
+    # Numbers greater than 1 are coordinates in points, where 2 decimal
+    # places is more than enough. Smaller numbers (e.g. scale factors) keep 3
+    # significant digits.
+    value = float(match.group(0))
+    if value >= 1.0:
+        digits = 2
+    elif value > 0.0:
+        digits = 2 - math.floor(math.log10(value))
+    else:
+        return b"0"
+    rounded = f"{value:.{digits}f}".rstrip("0").rstrip(".")
+    return rounded.encode("ascii")
+
+
+def _minify_path_data(data: bytes) -> bytes:
+    # After a moveto or lineto, more coordinates are implicitly linetos, so
+    # the "L" between each point of a line can be dropped.
+    tokens = _PATH_COMMAND_REGEX.split(data)
+    parts = [tokens[0]]
+    previous = None
+    for command, args in zip(tokens[1::2], tokens[2::2]):
+        if command == b"L" and previous in (b"M", b"L"):
+            parts.append(b" ")
+        else:
+            parts.append(command)
+        parts.append(args)
+        previous = command
+    return b"".join(parts)
+
+
+def _minify_attribute(match: re.Match) -> bytes:
+    name, value = match.groups()
+    # matplotlib puts each path command on its own line
+    value = _WHITESPACE_REGEX.sub(b" ", value).strip()
+    value = _NUMBER_REGEX.sub(_round_number, value)
+    if name == b"d":
+        value = _minify_path_data(value)
+    return b" " + name + b'="' + value + b'"'
+
+
+def _minify_tag(match: re.Match) -> bytes:
+    return _ATTRIBUTE_REGEX.sub(_minify_attribute, match.group(0))
+
+
+def minify_svg(contents: bytes) -> bytes:
+    """
+    A fast alternative to scour for the SVGs matplotlib produces: removes
+    comments and whitespace between elements, and in attribute values,
+    reduces the precision of numbers and removes redundant path commands.
+    """
+    contents = contents.strip()
+    for regex, replacement in _MINIFY_REGEXES:
+        contents = regex.sub(replacement, contents)
+    return _TAG_REGEX.sub(_minify_tag, contents)
+
+
+def optimize_svg(contents: bytes, optimizer: str) -> bytes:
+    if optimizer == "scour":
+        return scour.scourString(
+            contents.decode("utf-8"), scour.sanitizeOptions(_ScourOptions())
+        ).encode("utf-8")
+    elif optimizer == "fast":
+        return minify_svg(contents)
+    elif optimizer == "none":
+        return contents
+    raise ValueError(f"Unknown SVG optimizer {optimizer!r}")
+
+
+@functools.cache
+def get_svg_config() -> tuple[str, bool]:
+    """
+    Get the SVG optimizer to use (one of `SVG_OPTIMIZERS`), and whether to
+    report statistics about each SVG file, from the `plot` section of
+    `bench_runner.toml`.
+    """
+    try:
+        content = mconfig.get_bench_runner_config().get("plot", {})
+    except FileNotFoundError:
+        content = {}
+
+    optimizer = content.get("svg_optimizer", "scour")
+    if optimizer not in SVG_OPTIMIZERS:
+        raise ValueError(
+            f"Unknown svg_optimizer {optimizer!r}. "
+            f"Must be one of {', '.join(SVG_OPTIMIZERS)}"
+        )
+    return optimizer, bool(content.get("svg_stats", False))
+
+
+@functools.cache
+def get_comparison_plot_format() -> str:
+    """
+    Get the format of the plots of each comparison (one of
+    `COMPARISON_PLOT_FORMATS`) from the `plot` section of `bench_runner.toml`.
+    """
+    try:
+        content = mconfig.get_bench_runner_config().get("plot", {})
+    except FileNotFoundError:
+        content = {}
+
+    plot_format = content.get("comparison_plots", "svg")
+    if plot_format not in COMPARISON_PLOT_FORMATS:
+        raise ValueError(
+            f"Unknown comparison_plots {plot_format!r}. "
+            f"Must be one of {', '.join(COMPARISON_PLOT_FORMATS)}"
+        )
+    return plot_format
+
+
+class SvgStats:
+    """
+    The size of an SVG file before and after optimization, and the time taken.
+    """
+
+    def __init__(
+        self,
+        filename: Path,
+        optimizer: str,
+        original_size: int,
+        size: int,
+        render_time: float,
+        optimize_time: float,
+    ):
+        self.filename = filename
+        self.optimizer = optimizer
+        self.original_size = original_size
+        self.size = size
+        self.render_time = render_time
+        self.optimize_time = optimize_time
+
+    def __str__(self) -> str:
+        saved = self.original_size - self.size
+        return (
+            f"{self.filename}: {self.optimizer} saved {saved} bytes "
+            f"({saved / max(self.original_size, 1):.1%}) in "
+            f"{self.optimize_time:.3f}s (rendered in {self.render_time:.3f}s)"
+        )
+
+
+def savefig(output_filename: PathLike, **kwargs) -> SvgStats | None:
+    """
+    Save the current figure and close it.
+
+    SVG files are rendered in memory and optimized before they are written,
+    using the optimizer from `get_svg_config`. Returns statistics about the
+    optimization for SVG files.
+    """
     output_filename = Path(output_filename)
 
-    plt.savefig(output_filename, **kwargs)
+    if output_filename.suffix != ".svg":
+        plt.savefig(output_filename, **kwargs)
+        plt.close("all")
+        return None
+
+    optimizer, report_stats = get_svg_config()
+
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    with matplotlib.rc_context(SVG_RCPARAMS):
+        plt.savefig(buffer, format="svg", metadata=SVG_METADATA, **kwargs)
     plt.close("all")
+    original = buffer.getvalue()
+    rendered = time.perf_counter()
+
+    contents = optimize_svg(original, optimizer)
+    optimized = time.perf_counter()
 
-    if output_filename.suffix == ".svg":
-        with tempfile.NamedTemporaryFile(
-            dir=output_filename.parent, delete=False
-        ) as tmp:
-            with open(output_filename) as fd:
-                scour.start(Options(), fd, tmp)
-            output_filename.unlink()
-            Path(tmp.name).rename(output_filename)
+    output_filename.write_bytes(contents)
+
+    stats = SvgStats(
+        output_filename,
+        optimizer,
+        len(original),
+        len(contents),
+        rendered - start,
+        optimized - rendered,
+    )
+    if report_stats:
+        rich.print(str(stats))
+    return stats
 
 
 @functools.cache
@@ -92,6 +315,14 @@ def get_plot_config():
     return content
 
 
+def downsample(values: np.ndarray) -> np.ndarray:
+    """
+    Reduce a sorted distribution to `VIOLIN_POINTS` evenly-spaced quantiles.
+    """
+    idx = np.round(np.linspace(0, len(values) - 1, VIOLIN_POINTS)).astype(int)
+    return values[idx]
+
+
 def plot_diff_pair(ax, data):
     if not len(data):
         return []
@@ -102,8 +333,7 @@ def plot_diff_pair(ax, data):
 
     for i, (name, values, _mean) in enumerate(data):
         if values is not None:
-            idx = np.round(np.linspace(0, len(values) - 1, 100)).astype(int)
-            violins.append(values[idx])
+            violins.append(downsample(values))
             all_data.extend(values)
             if name in INTERPRETER_HEAVY:
                 colors.append("red")
@@ -183,6 +413,35 @@ def plot_diff(
     savefig(output_filename)
 
 
+def write_diff_data(
+    combined_data: result.CombinedData,
+    output_filename: PathLike,
+    title: str,
+    differences: tuple[str, str],
+) -> None:
+    """
+    Write the data for the same plot as `plot_diff`, as JSON, for the viewer
+    to render. Only the downsampled distributions that are drawn are kept.
+    """
+    data = {
+        "title": title,
+        "differences": list(differences),
+        "benchmarks": [
+            {
+                "name": name,
+                "mean": mean,
+                "values": (
+                    None if values is None else np.round(downsample(values), 4).tolist()
+                ),
+                "interpreter_heavy": name in INTERPRETER_HEAVY,
+            }
+            for name, values, mean in combined_data
+        ],
+    }
+    with Path(output_filename).open("w", encoding="utf-8") as fd:
+        json.dump(data, fd, separators=(",", ":"))
+
+
 def get_micro_version(version: str) -> str:
     micro = version.split(".")[-1].replace("+", "")
     if match := re.match(r"[0-9]+([a-z]+.+)", micro):
@@ -230,46 +489,156 @@ def add_axvline(ax, dt: datetime.datetime, name: str):
     )
 
 
-def longitudinal_plot(
+# The function of a comparison that older versions of the longitudinal plots
+# took, rather than the name of a metric
+Getter = Callable[["result.BenchmarkComparison"], "float | None"]
+
+
+def _get_store(
+    output_filename: Path, store: trend_store.TrendStore | None
+) -> trend_store.TrendStore:
+    if store is None:
+        return trend_store.TrendStore(
+            trend_store.get_store_path(output_filename.parent)
+        )
+    return store
+
+
+def _get_metric(metric: str | Getter, getter: Getter | None) -> str | Getter:
+    """
+    Handle the deprecated `getter` argument of the longitudinal plots, which
+    may also be passed in place of `metric`.
+    """
+    if getter is not None:
+        metric = getter
+    if callable(metric):
+        warnings.warn(
+            "Passing a getter function is deprecated; pass the name of one of "
+            "trend_store.METRICS as `metric` instead",
+            DeprecationWarning,
+            stacklevel=3,
+        )
+    return metric
+
+
+def _get_value(
+    store: trend_store.TrendStore,
+    metric: str | Getter,
+    ref: result.Result,
+    head: result.Result,
+    base: str,
+) -> float | None:
+    if callable(metric):
+        # Arbitrary values can't be stored, so they are always recomputed
+        return metric(result.BenchmarkComparison(ref, head, base))
+    return store.get(ref, head, base, [metric])[metric]
+
+
+def remove_old_plot_cache(output_filename: PathLike) -> None:
+    """
+    Remove the cache of values that older versions kept next to each
+    longitudinal plot, which has been replaced by the trend store.
+    """
+    output_filename = Path(output_filename)
+    if output_filename.suffix != ".json":
+        output_filename.with_suffix(".json").unlink(missing_ok=True)
+
+
+class TimeSeriesPlot:
+    """
+    The data for a figure of time series, one per axis.
+
+    This is computed from the results and trend store up front, and only
+    contains plain data, so it can be rendered in another process.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        differences: tuple[str, str],
+        standardize_xlims: bool = False,
+    ):
+        self.title = title
+        self.differences = differences
+        self.standardize_xlims = standardize_xlims
+        # The title, lines and version labels of each axis
+        self.axes: list[tuple[str, list[dict[str, Any]], list[tuple]]] = []
+
+    def add_axis(self, title: str) -> tuple[list[dict[str, Any]], list[tuple]]:
+        lines: list[dict[str, Any]] = []
+        labels: list[tuple] = []
+        self.axes.append((title, lines, labels))
+        return lines, labels
+
+    def render(self, output_filename: PathLike) -> None:
+        axs: Sequence[matplotlib.Axes]  # pyright: ignore
+
+        fig, axs = plt.subplots(
+            len(self.axes), 1, figsize=(10, 5 * len(self.axes)), layout="constrained"
+        )  # type: ignore
+
+        for (title, lines, labels), ax in zip(self.axes, axs):
+            ax.set_title(title)
+
+            for line in lines:
+                ax.plot(
+                    line["dates"],
+                    line["changes"],
+                    color=line["color"],
+                    linestyle=line["style"],
+                    marker=line["marker"],
+                    markersize=5,
+                    label=line["name"],
+                    alpha=0.9,
+                )
+
+            for micro, date, change in labels:
+                text = ax.annotate(
+                    micro,
+                    xy=(date, change),
+                    xycoords="data",
+                    xytext=(-3, 15),
+                    textcoords="offset points",
+                    rotation=90,
+                    arrowprops=dict(arrowstyle="-", connectionstyle="arc"),
+                )
+                text.set_color("#888")
+                text.set_size(8)
+                text.arrow_patch.set_color("#888")
+
+            annotate_y_axis(ax, self.differences)
+
+        fig.suptitle(self.title)
+
+        if self.standardize_xlims:
+            _standardize_xlims(axs)
+
+        savefig(output_filename, dpi=150)
+
+
+def render_plot(plot: TimeSeriesPlot, output_filename: PathLike) -> None:
+    plot.render(output_filename)
+
+
+def get_longitudinal_data(
     results: Iterable[result.Result],
-    output_filename: PathLike,
-    getter: Callable[
-        [result.BenchmarkComparison], float | None
-    ] = lambda r: r.geometric_mean_float,
+    store: trend_store.TrendStore,
+    metric: str | Getter = "geometric_mean",
     differences: tuple[str, str] = ("slower", "faster"),
     title="Performance improvement by configuration",
-):
-    def get_comparison_value(ref, r, base):
-        key = ",".join((str(ref.filename)[8:], str(r.filename)[8:], base))
-        if key in data:
-            return data[key]
-        else:
-            value = getter(result.BenchmarkComparison(ref, r, base))
-            data[key] = value
-            return value
-
-    output_filename = Path(output_filename)
+) -> TimeSeriesPlot:
+    """
+    Get the data for a plot of `metric` (one of `trend_store.METRICS`) of each
+    result against its base over time, from the trend store. `metric` may
+    also be a function of a `BenchmarkComparison`, whose values aren't stored.
+    """
     cfg = get_plot_config()
 
-    data_cache = output_filename.with_suffix(".json")
-    if data_cache.is_file():
-        with data_cache.open() as fd:
-            data = json.load(fd)
-    else:
-        data = {}
-
-    axs: Sequence[matplotlib.Axes]  # pyright: ignore
-
-    fig, axs = plt.subplots(
-        len(cfg["versions"]),
-        1,
-        figsize=(10, 5 * len(cfg["versions"])),
-        layout="constrained",
-    )  # type: ignore
+    plot = TimeSeriesPlot(title, differences)
 
     results = [r for r in results if r.fork == "python"]
 
-    for i, (version, base, ax) in enumerate(zip(cfg["versions"], cfg["bases"], axs)):
+    for i, (version, base) in enumerate(zip(cfg["versions"], cfg["bases"])):
         version_str = ".".join(str(x) for x in version)
         ver_results = [
             r for r in results if list(r.parsed_version.release[0:2]) == version
@@ -278,7 +647,7 @@ def longitudinal_plot(
         subtitle = f"Python {version_str}.x vs. {base}"
         if i == 3:
             subtitle += " (with JIT)"
-        ax.set_title(subtitle)
+        lines, labels = plot.add_axis(subtitle)
 
         for runner_i, (runner, name, color, style, marker) in enumerate(
             zip(
@@ -311,49 +680,61 @@ def longitudinal_plot(
                 datetime.datetime.fromisoformat(x.commit_datetime)
                 for x in runner_results
             ]
-            changes = [get_comparison_value(ref, r, base) for r in runner_results]
+            changes = [_get_value(store, metric, ref, r, base) for r in runner_results]
 
             if any(x is not None for x in changes):
-                ax.plot(
-                    dates,
-                    changes,
-                    color=color,
-                    linestyle=style,
-                    marker=marker,
-                    markersize=5,
-                    label=name,
-                    alpha=0.9,
+                lines.append(
+                    dict(
+                        dates=dates,
+                        changes=changes,
+                        name=name,
+                        color=color,
+                        style=style,
+                        marker=marker,
+                    )
                 )
 
             if runner_i > 0:
                 continue
 
-            annotations = set()
+            micros = set()
             for r, date, change in zip(runner_results, dates, changes):
                 micro = get_micro_version(r.version)
-                if micro not in annotations and not r.version.endswith("+"):
-                    annotations.add(micro)
-                    text = ax.annotate(
-                        micro,
-                        xy=(date, change),
-                        xycoords="data",
-                        xytext=(-3, 15),
-                        textcoords="offset points",
-                        rotation=90,
-                        arrowprops=dict(arrowstyle="-", connectionstyle="arc"),
-                    )
-                    text.set_color("#888")
-                    text.set_size(8)
-                    text.arrow_patch.set_color("#888")
+                if micro not in micros and not r.version.endswith("+"):
+                    micros.add(micro)
+                    labels.append((micro, date, change))
 
-        annotate_y_axis(ax, differences)
+    return plot
 
-    fig.suptitle(title)
 
-    savefig(output_filename, dpi=150)
+def longitudinal_plot(
+    results: Iterable[result.Result],
+    output_filename: PathLike,
+    metric: str | Getter = "geometric_mean",
+    differences: tuple[str, str] = ("slower", "faster"),
+    title="Performance improvement by configuration",
+    store: trend_store.TrendStore | None = None,
+    getter: Getter | None = None,
+):
+    """
+    Plot `metric` (one of `trend_store.METRICS`) of each result against its
+    base over time. The values come from the trend store next to the output
+    file, unless another `store` is given.
+
+    Passing a function of a `BenchmarkComparison`, as `getter` or `metric`,
+    is deprecated.
+    """
+    output_filename = Path(output_filename)
+    metric = _get_metric(metric, getter)
+    remove_old_plot_cache(output_filename)
+    trends = _get_store(output_filename, store)
+
+    get_longitudinal_data(results, trends, metric, differences, title).render(
+        output_filename
+    )
 
-    with data_cache.open("w") as fd:
-        json.dump(data, fd, indent=2)
+    if store is None:
+        trends.save()
 
 
 def _standardize_xlims(axs: Sequence[matplotlib.Axes]) -> None:  # pyright: ignore
@@ -379,45 +760,27 @@ def _standardize_xlims(axs: Sequence[matplotlib.Axes]) -> None:  # pyright: igno
             ax.set_xlim((minx, maxx))
 
 
-def flag_effect_plot(
+def get_flag_effect_data(
     results: Iterable[result.Result],
-    output_filename: PathLike,
-    getter: Callable[
-        [result.BenchmarkComparison], float | None
-    ] = lambda r: r.geometric_mean_float,
+    store: trend_store.TrendStore,
+    metric: str | Getter = "geometric_mean",
     differences: tuple[str, str] = ("slower", "faster"),
     title="Performance improvement by configuration",
-):
-    output_filename = Path(output_filename)
-
+) -> TimeSeriesPlot:
+    """
+    Get the data for a plot of `metric` (one of `trend_store.METRICS`) of each
+    result with flags against the result without flags from the same commit,
+    over time, from the trend store. `metric` may also be a function of a
+    `BenchmarkComparison`, whose values aren't stored.
+    """
     # We don't need to track the performance of the Tier 2 configuration
     all_flags = [flag for flag in mflags.FLAGS if flag.name != "PYTHON_UOPS"]
     flags = [flag.name for flag in reversed(all_flags)]
     configs = [flag.description for flag in reversed(all_flags)]
 
-    def get_comparison_value(ref, r):
-        key = ",".join((str(ref.filename)[8:], str(r.filename)[8:]))
-        if key in data:
-            return data[key]
-        else:
-            value = getter(result.BenchmarkComparison(ref, r, "default"))
-            data[key] = value
-            return value
-
     cfg = get_plot_config()
 
-    data_cache = output_filename.with_suffix(".json")
-    if data_cache.is_file():
-        with data_cache.open() as fd:
-            data = json.load(fd)
-    else:
-        data = {}
-
-    axs: Sequence[matplotlib.Axes]  # pyright: ignore
-
-    fig, axs = plt.subplots(
-        len(flags), 1, figsize=(10, 5 * len(flags)), layout="constrained"
-    )  # type: ignore
+    plot = TimeSeriesPlot(title, differences, standardize_xlims=True)
 
     results = [r for r in results if r.fork == "python"]
 
@@ -430,8 +793,8 @@ def flag_effect_plot(
             flag = ""
         commits.setdefault(r.nickname, {}).setdefault(flag, {})[r.cpython_hash] = r
 
-    for config, flag, ax in zip(configs, flags, axs):
-        ax.set_title(f"Effect of {config} vs. Tier 1 (same commit)")
+    for config, flag in zip(configs, flags):
+        lines, _ = plot.add_axis(f"Effect of {config} vs. Tier 1 (same commit)")
 
         for runner, name, color, style, marker in zip(
             cfg["runners"], cfg["names"], cfg["colors"], cfg["styles"], cfg["markers"]
@@ -445,7 +808,13 @@ def flag_effect_plot(
                     line.append(
                         (
                             r.commit_datetime,
-                            get_comparison_value(base_results[cpython_hash], r),
+                            _get_value(
+                                store,
+                                metric,
+                                base_results[cpython_hash],
+                                r,
+                                "default",
+                            ),
                         )
                     )
             line.sort(key=lambda x: datetime.datetime.fromisoformat(x[0]))
@@ -454,27 +823,47 @@ def flag_effect_plot(
             changes = [x[1] for x in line]
 
             if any(x is not None for x in changes):
-                ax.plot(
-                    dates,
-                    changes,
-                    color=color,
-                    linestyle=style,
-                    marker=marker,
-                    markersize=5,
-                    label=name,
-                    alpha=0.9,
+                lines.append(
+                    dict(
+                        dates=dates,
+                        changes=changes,
+                        name=name,
+                        color=color,
+                        style=style,
+                        marker=marker,
+                    )
                 )
 
-        annotate_y_axis(ax, differences)
+    return plot
 
-    fig.suptitle(title)
 
-    _standardize_xlims(axs)
+def flag_effect_plot(
+    results: Iterable[result.Result],
+    output_filename: PathLike,
+    metric: str | Getter = "geometric_mean",
+    differences: tuple[str, str] = ("slower", "faster"),
+    title="Performance improvement by configuration",
+    store: trend_store.TrendStore | None = None,
+    getter: Getter | None = None,
+):
+    """
+    Plot `metric` (one of `trend_store.METRICS`) of each result with flags
+    against the result without flags from the same commit, over time.
 
-    savefig(output_filename, dpi=150)
+    Passing a function of a `BenchmarkComparison`, as `getter` or `metric`,
+    is deprecated.
+    """
+    output_filename = Path(output_filename)
+    metric = _get_metric(metric, getter)
+    remove_old_plot_cache(output_filename)
+    trends = _get_store(output_filename, store)
+
+    get_flag_effect_data(results, trends, metric, differences, title).render(
+        output_filename
+    )
 
-    with data_cache.open("w") as fd:
-        json.dump(data, fd, indent=2)
+    if store is None:
+        trends.save()
 
 
 if __name__ == "__main__":
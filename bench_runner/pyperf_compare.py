@@ -0,0 +1,388 @@
+"""
+An in-process equivalent of `pyperf compare_to -G --table --table-format md`.
+
+This works from the timing data that `Result` has already loaded, rather than
+starting a new interpreter and re-parsing both results files for every
+comparison. The output is the same as pyperf 2.x's, including its formatting
+of values, its significance test and its grouping by tag.
+"""
+
+from __future__ import annotations
+
+
+import io
+import os
+import statistics
+from typing import TYPE_CHECKING, Any, Mapping, Sequence
+
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+from . import table
+
+
+if TYPE_CHECKING:
+    from .result import Result
+
+
+# Critical values of the two-tailed Student's t-distribution at 95%
+# confidence, indexed by degrees of freedom. Same table as pyperf uses.
+T_DIST_95_CONF_LEVELS = [
+    0,
+    12.706,
+    4.303,
+    3.182,
+    2.776,
+    2.571,
+    2.447,
+    2.365,
+    2.306,
+    2.262,
+    2.228,
+    2.201,
+    2.179,
+    2.160,
+    2.145,
+    2.131,
+    2.120,
+    2.110,
+    2.101,
+    2.093,
+    2.086,
+    2.080,
+    2.074,
+    2.069,
+    2.064,
+    2.060,
+    2.056,
+    2.052,
+    2.048,
+    2.045,
+    2.042,
+]
+
+
+TIMEDELTA_UNITS = ("sec", "ms", "us", "ns")
+
+
+def tdist95conf_level(df: int) -> float:
+    """
+    Approximate the critical value of Student's t-distribution at 95%
+    confidence for the given degrees of freedom.
+    """
+    if df >= 200:
+        return 1.960
+    if df >= 100:
+        return 1.984
+    if df >= 80:
+        return 1.990
+    if df >= 60:
+        return 2.000
+    if df >= 50:
+        return 2.009
+    if df >= 40:
+        return 2.021
+    if df >= len(T_DIST_95_CONF_LEVELS):
+        return T_DIST_95_CONF_LEVELS[-1]
+    return T_DIST_95_CONF_LEVELS[df]
+
+
+# tdist95conf_level for every degree of freedom up to the point where it
+# becomes constant
+_T_DIST_95_CONF_LEVELS_TABLE = np.array([tdist95conf_level(i) for i in range(201)])
+
+
+def _segment_sums(
+    values: NDArray[np.float64], segments: NDArray[np.intp], n_segments: int
+) -> NDArray[np.float64]:
+    return np.bincount(segments, weights=values, minlength=n_segments)
+
+
+def is_significant_batch(
+    samples1: Sequence[NDArray[np.float64]], samples2: Sequence[NDArray[np.float64]]
+) -> tuple[NDArray[np.bool_], NDArray[np.float64]]:
+    """
+    Student's two-sample, two-tailed t-test with alpha=0.95, for many pairs of
+    samples at once. The samples may have different lengths.
+
+    Returns arrays of (significant, t_score) for each pair. Like pyperf,
+    comparisons that can't be tested (a single value on each side, a different
+    number of values on each side, or zero variance) are considered
+    significant, with a t_score of NaN.
+    """
+    n_pairs = len(samples1)
+    if len(samples2) != n_pairs:
+        raise ValueError("Must have the same number of samples on each side")
+    if n_pairs == 0:
+        return np.empty(0, dtype=bool), np.empty(0, dtype=np.float64)
+
+    n1 = np.array([len(x) for x in samples1], dtype=np.intp)
+    n2 = np.array([len(x) for x in samples2], dtype=np.intp)
+    testable = (n1 == n2) & (n1 > 1)
+
+    # All of the samples on each side are concatenated, with each value
+    # labelled with the index of the pair it belongs to.
+    def stats(samples, n):
+        values = np.concatenate([np.asarray(x, dtype=np.float64) for x in samples])
+        segments = np.repeat(np.arange(n_pairs), n)
+        mean = _segment_sums(values, segments, n_pairs) / np.maximum(n, 1)
+        squares = _segment_sums(np.square(values - mean[segments]), segments, n_pairs)
+        return mean, squares
+
+    mean1, squares1 = stats(samples1, n1)
+    mean2, squares2 = stats(samples2, n2)
+
+    deg_freedom = np.where(testable, 2 * n1 - 2, 1)
+    variance = (squares1 + squares2) / deg_freedom
+    testable &= variance != 0.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_scores = (mean1 - mean2) / np.sqrt(variance / np.maximum(n1, 1) * 2)
+    t_scores = np.where(testable, t_scores, np.nan)
+    critical_values = _T_DIST_95_CONF_LEVELS_TABLE[
+        np.minimum(deg_freedom, len(_T_DIST_95_CONF_LEVELS_TABLE) - 1)
+    ]
+    significant = ~testable | (np.abs(t_scores) >= critical_values)
+    return significant, t_scores
+
+
+def is_significant(
+    sample1: NDArray[np.float64], sample2: NDArray[np.float64]
+) -> tuple[bool, float | None]:
+    """
+    Student's two-sample, two-tailed t-test with alpha=0.95.
+
+    Returns (significant, t_score). Like pyperf, comparisons that can't be
+    tested (a single value on each side, a different number of values on each
+    side, or zero variance) are considered significant, with a t_score of None.
+    """
+    significant, t_scores = is_significant_batch([sample1], [sample2])
+    t_score = float(t_scores[0])
+    return bool(significant[0]), None if np.isnan(t_score) else t_score
+
+
+def format_timedelta(value: float) -> str:
+    ref_value = abs(value)
+    for i in range(2, -9, -1):
+        if ref_value >= 10.0**i:
+            break
+    else:
+        i = -9
+
+    precision = 2 - i % 3
+    k = -(i // 3) if i < 0 else 0
+    return f"{value * 10 ** (k * 3):.{precision}f} {TIMEDELTA_UNITS[k]}"
+
+
+def format_filesize(size: float) -> str:
+    if size < 10 * 1024:
+        if size != 1:
+            return f"{size:.0f} bytes"
+        else:
+            return f"{size:.0f} byte"
+
+    if size > 10 * 1024 * 1024:
+        return f"{size / (1024.0 * 1024.0):.1f} MiB"
+
+    return f"{size / 1024.0:.1f} KiB"
+
+
+def format_integer(number: float) -> str:
+    if number >= 10000:
+        pow10 = 0
+        x = number
+        while x >= 10:
+            x, r = divmod(x, 10)
+            pow10 += 1
+            if r:
+                break
+        if not r:
+            return f"10^{pow10}"
+    return str(number)
+
+
+def format_value(unit: str | None, value: float) -> str:
+    if unit in (None, "second"):
+        return format_timedelta(value)
+    elif unit == "byte":
+        return format_filesize(value)
+    elif unit == "integer":
+        return format_integer(value)
+    else:
+        raise ValueError(f"Unknown unit {unit}")
+
+
+def format_normalized_mean(norm_mean: float) -> str:
+    if norm_mean == 1.0:
+        return "no change"
+    elif norm_mean < 1.0:
+        return f"{1.0 / norm_mean:.2f}x faster"
+    else:
+        return f"{norm_mean:.2f}x slower"
+
+
+def format_filenames(filenames: Sequence[str]) -> list[str]:
+    """
+    Get the names used to label each results file in the table headers.
+    """
+    basenames = [os.path.basename(x) for x in filenames]
+    if len(set(basenames)) != len(basenames):
+        return list(filenames)
+
+    def strip_extension(filename):
+        name = os.path.splitext(filename)[0]
+        if name.endswith(".json"):
+            name = name[:-5]
+        return name
+
+    names = [strip_extension(x) for x in basenames]
+    if len(set(names)) != len(names):
+        return basenames
+    return names
+
+
+class _BenchmarkResult:
+    def __init__(
+        self,
+        name: str,
+        ref_values: NDArray[np.float64],
+        head_values: NDArray[np.float64],
+        unit: str | None,
+        tags: Sequence[str],
+        significant: bool,
+    ):
+        self.name = name
+        self.unit = unit
+        self.tags = tags
+        # statistics.mean is correctly rounded, so the displayed means are
+        # exactly the ones pyperf would display.
+        self.ref_mean = statistics.mean(ref_values.tolist())
+        self.head_mean = statistics.mean(head_values.tolist())
+        self.norm_mean = self.head_mean / self.ref_mean
+        self.significant = significant
+
+
+def _write_table(
+    fd: io.StringIO, headers: list[str], results: list[_BenchmarkResult]
+) -> None:
+    rows = []
+    not_significant = []
+    for result in results:
+        if result.significant:
+            rows.append(
+                [
+                    result.name,
+                    format_value(result.unit, result.ref_mean),
+                    f"{format_value(result.unit, result.head_mean)}: "
+                    f"{format_normalized_mean(result.norm_mean)}",
+                ]
+            )
+        else:
+            not_significant.append(result.name)
+
+    # Only show the geometric mean if there are at least two benchmarks and at
+    # least one of them is significant.
+    if len(results) > 1 and rows:
+        geometric_mean = statistics.geometric_mean(x.norm_mean for x in results)
+        rows.append(["Geometric mean", "(ref)", format_normalized_mean(geometric_mean)])
+
+    if rows:
+        table.output_padded_table(fd, headers, rows)
+
+    if not_significant:
+        if rows:
+            fd.write("\n")
+        fd.write(
+            f"Benchmark hidden because not significant ({len(not_significant)}): "
+            f"{', '.join(not_significant)}\n"
+        )
+
+
+def _write_title(fd: io.StringIO, title: str) -> None:
+    fd.write(f"{title}\n{'=' * len(title)}\n\n")
+
+
+def compare(
+    ref_filename: str,
+    ref_data: Mapping[str, NDArray[np.float64]],
+    ref_metadata: Mapping[str, Mapping[str, Any]],
+    head_filename: str,
+    head_data: Mapping[str, NDArray[np.float64]],
+) -> str:
+    """
+    Compare two sets of timing data, producing the same output as
+    `pyperf compare_to -G --table --table-format md ref_filename head_filename`.
+
+    `ref_metadata` maps each benchmark name to its metadata, and is used to
+    get the unit and tags of each benchmark.
+    """
+    names = [name for name in ref_data if name in head_data]
+    if not names:
+        raise ValueError("Benchmark suites have no benchmark in common")
+
+    significant, _ = is_significant_batch(
+        [ref_data[name] for name in names], [head_data[name] for name in names]
+    )
+
+    results = []
+    for name, is_sig in zip(names, significant):
+        metadata = ref_metadata.get(name, {})
+        results.append(
+            _BenchmarkResult(
+                name,
+                ref_data[name],
+                head_data[name],
+                metadata.get("unit"),
+                metadata.get("tags", []),
+                bool(is_sig),
+            )
+        )
+
+    headers = ["Benchmark", *format_filenames([ref_filename, head_filename])]
+
+    fd = io.StringIO()
+
+    tags = sorted(set(tag for result in results for tag in result.tags))
+    if tags:
+        # pyperf sorts the full list of results only after selecting the
+        # results for the first tag, so that first section remains in file
+        # order.
+        ordered = list(results)
+        for tag in tags:
+            _write_title(fd, f"Benchmarks with tag '{tag}':")
+            _write_table(fd, headers, [x for x in ordered if tag in x.tags])
+            ordered = sorted(results, key=lambda x: x.norm_mean)
+            fd.write("\n")
+        _write_title(fd, "All benchmarks:")
+
+    results.sort(key=lambda x: x.norm_mean)
+    _write_table(fd, headers, results)
+
+    for filename, data in ((ref_filename, ref_data), (head_filename, head_data)):
+        ignored = sorted(set(data.keys()) - set(names))
+        if ignored:
+            fd.write(
+                f"Ignored benchmarks ({len(ignored)}) of {filename}: "
+                f"{', '.join(ignored)}\n"
+            )
+
+    return fd.getvalue()
+
+
+def compare_results(ref: "Result", head: "Result") -> str:
+    """
+    Compare the timings of two results, producing the same output as
+    `pyperf compare_to -G --table --table-format md`.
+
+    Like pyperf, this includes all of the benchmarks, even those that are
+    excluded from the other comparisons.
+    """
+    return compare(
+        str(ref.filename),
+        ref.get_timing_data(include_excluded=True),
+        ref.get_benchmark_metadata(),
+        str(head.filename),
+        head.get_timing_data(include_excluded=True),
+    )
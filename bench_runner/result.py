@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from collections import defaultdict
 import functools
+import hashlib
 import io
 import json
 from operator import itemgetter
@@ -18,24 +19,55 @@ from urllib.parse import unquote
 
 import numpy as np
 from packaging import version
-import pyperf
 import rich.progress
 
 
 from . import bases as mbases
+from . import comparison_cache
 from . import config
 from . import flags as mflags
 from . import git
 from . import hpt
 from . import plot
+from . import pyperf_compare
+from . import result_index
+from . import results_archive
 from . import runners
+from . import timing_store
 from . import util
 from .util import PathLike
 
 
+# For each benchmark: (name, sorted sample of the ratios of every pair of
+# values, or None if not significant, mean of the ratios)
 CombinedData = list[tuple[str, np.ndarray | None, float]]
 
 
+# The maximum number of values from each side used to build the sample of
+# ratios, which bounds it to MAX_DIFF_SAMPLES ** 2 values
+MAX_DIFF_SAMPLES = 256
+
+
+def _sample_sorted(values: np.ndarray, n: int) -> np.ndarray:
+    """
+    Get at most `n` evenly spaced order statistics of `values`.
+    """
+    values = np.sort(values)
+    if len(values) <= n:
+        return values
+    idx = np.round(np.linspace(0, len(values) - 1, n)).astype(int)
+    return values[idx]
+
+
+# The suffix of the machine-readable summary written alongside each comparison
+SUMMARY_SUFFIX = "-summary.json"
+
+# The suffix of the plot data files written in place of the SVG plots, when the
+# `comparison_plots` setting is "data". The memory plot data ends in
+# `-mem-plot.json`.
+PLOT_DATA_SUFFIX = "-plot.json"
+
+
 def _clean(string: str) -> str:
     """
     Clean an arbitrary string to be suitable for a filename.
@@ -73,6 +105,24 @@ def _get_architecture(python: PathLike) -> str:
     return machine
 
 
+def _get_run_datetime(contents: dict[str, Any]) -> str | None:
+    try:
+        return contents["benchmarks"][0]["runs"][0]["metadata"]["date"]
+    except (KeyError, IndexError):
+        return None
+
+
+def _get_benchmark_names(contents: dict[str, Any]) -> set[str]:
+    names = set()
+    # pystats raw results don't have any benchmarks
+    for benchmark in contents.get("benchmarks", []):
+        if "metadata" in benchmark:
+            names.add(benchmark["metadata"]["name"])
+        else:
+            names.add(contents["metadata"]["name"])
+    return names
+
+
 class Comparison:
     def __init__(
         self, ref: "Result", head: "Result", base: str, force_valid: bool = False
@@ -91,6 +141,12 @@ class Comparison:
     def copy(self):
         return type(self)(self.ref, self.head, self.base)
 
+    def evict(self) -> None:
+        """
+        Release any data computed for this comparison.
+        """
+        pass
+
     @property
     def base_filename(self) -> Path | None:
         if not self.valid_comparison:
@@ -100,18 +156,37 @@ class Comparison:
             f"{self.head.filename.stem}-vs-{self.base}.txt"
         )
 
-    def get_files(self) -> Iterable[tuple[Callable, str, str]]:
+    def get_files(self, summary: bool = False) -> Iterable[tuple[Callable, str, str]]:
+        """
+        Get the derived files for this comparison, as tuples of the form
+        (func, suffix, file_type).
+
+        If `summary` is True, the machine-readable summary files, which aren't
+        linked from the indices, are also included.
+        """
         return []
 
 
 class BenchmarkComparison(Comparison):
-    def get_files(self) -> Iterable[tuple[Callable, str, str]]:
+    def get_files(self, summary: bool = False) -> Iterable[tuple[Callable, str, str]]:
         if self.base_filename is None:
             return
         yield (self.write_table, ".md", "table")
-        yield (self.write_timing_plot, ".svg", "time plot")
-        if not self.head.is_windows() and self.base == "base":
-            yield (self.write_memory_plot, "-mem.svg", "memory plot")
+        if summary:
+            yield (self.write_summary, SUMMARY_SUFFIX, "summary")
+        has_memory = not self.head.is_windows() and self.base == "base"
+        if plot.get_comparison_plot_format() == "data":
+            yield (self.write_timing_data, PLOT_DATA_SUFFIX, "time plot data")
+            if has_memory:
+                yield (
+                    self.write_memory_data,
+                    f"-mem{PLOT_DATA_SUFFIX}",
+                    "memory plot data",
+                )
+        else:
+            yield (self.write_timing_plot, ".svg", "time plot")
+            if has_memory:
+                yield (self.write_memory_plot, "-mem.svg", "memory plot")
 
     @functools.cached_property
     def _contents(self) -> str | None:
@@ -121,8 +196,56 @@ class BenchmarkComparison(Comparison):
         if self.base_filename.with_suffix(".md").is_file():
             with self.base_filename.with_suffix(".md").open(encoding="utf-8") as fd:
                 return fd.read()
+        elif self._cached_values is not None:
+            return self._cached_values["contents"]
         else:
-            return self._generate_contents()
+            contents = self._generate_contents()
+            self._store_cached_values(contents)
+            return contents
+
+    @functools.cached_property
+    def _cached_values(self) -> dict[str, Any] | None:
+        """
+        The values computed for this comparison by a previous run, if the
+        inputs haven't changed since.
+        """
+        if self.head.results_dir is None:
+            return None
+        return comparison_cache.load(self.head.results_dir, self._cache_key)
+
+    @functools.cached_property
+    def _cache_key(self) -> str:
+        # Whether the head is on Windows determines whether memory is compared,
+        # and the filenames are included in the tables
+        return comparison_cache.get_key(
+            self.ref.digest,
+            self.head.digest,
+            self.head.is_windows(),
+            self.ref.filename.name,
+            self.head.filename.name,
+        )
+
+    def _store_cached_values(self, contents: str) -> None:
+        if self.head.results_dir is None:
+            return
+        values = {
+            "contents": contents,
+            **self._get_summary_values(contents.splitlines()),
+        }
+        comparison_cache.store(
+            self.head.results_dir, self._cache_key, self.head.digest, values
+        )
+        self._cached_values = values
+
+    @property
+    def _stored_values(self) -> dict[str, Any] | None:
+        """
+        The summary values of this comparison from the summary file, or from
+        the cache if there isn't one.
+        """
+        if self._summary is not None:
+            return self._summary
+        return self._cached_values
 
     @property
     def _contents_lines(self) -> list[str]:
@@ -133,28 +256,18 @@ class BenchmarkComparison(Comparison):
 
     def _generate_contents(self) -> str:
         fd = io.StringIO()
-        fd.write(
-            subprocess.check_output(
-                [
-                    "pyperf",
-                    "compare_to",
-                    "-G",
-                    "--table",
-                    "--table-format",
-                    "md",
-                    self.ref.filename,
-                    self.head.filename,
-                ],
-                encoding="utf-8",
-            )
-        )
+        fd.write(pyperf_compare.compare_results(self.ref, self.head))
         fd.write("\n")
         fd.write(
             "- Geometric mean (including insignificant results): "
             f"{self._calculate_geometric_mean()}"
         )
         fd.write("\n\n")
-        fd.write(hpt.make_report(self.ref.filename, self.head.filename))
+        fd.write(
+            hpt.make_report_from_data(
+                self.ref.get_timing_data(), self.head.get_timing_data()
+            )
+        )
         fd.write("\n")
         fd.write("# Memory\n")
         fd.write(f"- memory change: {self._calculate_memory_change()}")
@@ -187,6 +300,46 @@ class BenchmarkComparison(Comparison):
             fd.write("\n")
             fd.write(contents)
 
+    @property
+    def summary_filename(self) -> Path | None:
+        if self.base_filename is None:
+            return None
+        return util.apply_suffix(self.base_filename, SUMMARY_SUFFIX)
+
+    def write_summary(self, filename: PathLike) -> None:
+        """
+        Write the summary statistics of the comparison to a JSON file, so they
+        can be read back without parsing the Markdown table.
+        """
+        summary = self._get_summary_values(self._contents_lines)
+        with Path(filename).open("w") as fd:
+            json.dump(summary, fd, indent=2)
+            fd.write("\n")
+
+    def _get_summary_values(self, lines: list[str]) -> dict[str, Any]:
+        return {
+            "geometric_mean": self._parse_geometric_mean(lines),
+            "geometric_mean_float": self.geometric_mean_float,
+            "hpt_reliability": self._parse_hpt_reliability(lines),
+            "hpt_percentiles": {
+                str(percentile): value
+                for percentile, value in self._parse_hpt_percentiles(lines).items()
+            },
+            "memory_change": self._parse_memory_change(lines),
+        }
+
+    @functools.cached_property
+    def _summary(self) -> dict[str, Any] | None:
+        """
+        The contents of the summary file, or None for comparisons generated
+        before summary files existed.
+        """
+        filename = self.summary_filename
+        if filename is None or not filename.is_file():
+            return None
+        with filename.open() as fd:
+            return json.load(fd)
+
     def _get_combined_data(
         self, ref_data: dict[str, np.ndarray], head_data: dict[str, np.ndarray]
     ) -> CombinedData:
@@ -195,62 +348,106 @@ class BenchmarkComparison(Comparison):
                 abs(values - np.mean(values)) < np.multiply(m, np.std(values))
             ]
 
-        def calculate_diffs(ref_values, head_values) -> tuple[np.ndarray | None, float]:
+        def calculate_diffs(
+            ref_values, head_values, significant
+        ) -> tuple[np.ndarray | None, float]:
             if len(ref_values) > 3 and len(head_values) > 3:
-                sig, t_score = pyperf._utils.is_significant(ref_values, head_values)
-                if not sig:
+                if not significant:
                     return None, 0.0
                 else:
                     ref_values = remove_outliers(ref_values)
                     head_values = remove_outliers(head_values)
-            values = np.outer(ref_values, 1.0 / head_values).flatten()
+            inv_head_values = 1.0 / head_values
+            # The mean of all of the pairwise ratios is the product of the
+            # means, so the full cross product is never needed for it.
+            mean = float(np.mean(ref_values) * np.mean(inv_head_values))
+            values = np.outer(
+                _sample_sorted(ref_values, MAX_DIFF_SAMPLES),
+                _sample_sorted(inv_head_values, MAX_DIFF_SAMPLES),
+            ).ravel()
             values.sort()
-            return values, float(values.mean())
+            return values, mean
 
         excluded = util.get_excluded_benchmarks()
+        names = [
+            name
+            for name, ref in ref_data.items()
+            if len(ref) != 0
+            and name in head_data
+            and name not in excluded
+            and len(ref) == len(head_data[name])
+        ]
+        significant, _ = pyperf_compare.is_significant_batch(
+            [ref_data[name] for name in names], [head_data[name] for name in names]
+        )
         combined_data = []
-        for name, ref in ref_data.items():
-            if len(ref) != 0 and name in head_data and name not in excluded:
-                head = head_data[name]
-                if len(ref) == len(head):
-                    combined_data.append((name, *calculate_diffs(ref, head)))
+        for name, is_sig in zip(names, significant):
+            combined_data.append(
+                (name, *calculate_diffs(ref_data[name], head_data[name], is_sig))
+            )
         combined_data.sort(key=itemgetter(2))
         return combined_data
 
-    def get_timing_diff(self) -> CombinedData:
+    def evict(self) -> None:
+        self.__dict__.pop("_timing_diff", None)
+        self.__dict__.pop("_memory_diff", None)
+
+    @functools.cached_property
+    def _timing_diff(self) -> CombinedData:
         ref_data = self.ref.get_timing_data()
         head_data = self.head.get_timing_data()
         return self._get_combined_data(ref_data, head_data)
 
+    def get_timing_diff(self) -> CombinedData:
+        return self._timing_diff
+
+    def _get_plot_title(self, measurement: str) -> str:
+        return (
+            f"{measurement} of "
+            f"{unquote(self.head.fork)}-{self.head.ref}-"
+            f"{self.head.cpython_hash}"
+            f" vs. {self.ref.version}"
+        )
+
     def write_timing_plot(self, filename: PathLike) -> None:
         plot.plot_diff(
             self.get_timing_diff(),
             filename,
-            (
-                "Timings of "
-                f"{unquote(self.head.fork)}-{self.head.ref}-"
-                f"{self.head.cpython_hash}"
-                f" vs. {self.ref.version}"
-            ),
+            self._get_plot_title("Timings"),
             ("slower", "faster"),
         )
 
-    def get_memory_diff(self) -> CombinedData:
+    def write_timing_data(self, filename: PathLike) -> None:
+        plot.write_diff_data(
+            self.get_timing_diff(),
+            filename,
+            self._get_plot_title("Timings"),
+            ("slower", "faster"),
+        )
+
+    @functools.cached_property
+    def _memory_diff(self) -> CombinedData:
         ref_data = self.ref.get_memory_data()
         head_data = self.head.get_memory_data()
         # Explicitly reversed so higher is bigger
         return self._get_combined_data(head_data, ref_data)
 
+    def get_memory_diff(self) -> CombinedData:
+        return self._memory_diff
+
     def write_memory_plot(self, filename: PathLike) -> None:
         plot.plot_diff(
             self.get_memory_diff(),
             filename,
-            (
-                "Memory usage of "
-                f"{unquote(self.head.fork)}-{self.head.ref}-"
-                f"{self.head.cpython_hash}"
-                f" vs. {self.ref.version}"
-            ),
+            self._get_plot_title("Memory usage"),
+            ("less", "more"),
+        )
+
+    def write_memory_data(self, filename: PathLike) -> None:
+        plot.write_diff_data(
+            self.get_memory_diff(),
+            filename,
+            self._get_plot_title("Memory usage"),
             ("less", "more"),
         )
 
@@ -259,6 +456,9 @@ class BenchmarkComparison(Comparison):
         if not self.valid_comparison:
             return None
 
+        if self._stored_values is not None:
+            return self._stored_values["geometric_mean_float"]
+
         data = self.get_timing_diff()
 
         product = np.prod(np.array([x[2] for x in data if x[1] is not None]))
@@ -278,8 +478,12 @@ class BenchmarkComparison(Comparison):
         if not self.valid_comparison:
             return ""
 
-        lines = self._contents_lines
+        if self._stored_values is not None:
+            return self._stored_values["geometric_mean"]
 
+        return self._parse_geometric_mean(self._contents_lines)
+
+    def _parse_geometric_mean(self, lines: list[str]) -> str:
         for line in lines[::-1]:
             if "Geometric mean (including insignificant results)" in line:
                 geometric_mean = line.split(":", maxsplit=1)[-1].strip()
@@ -307,7 +511,13 @@ class BenchmarkComparison(Comparison):
         if not self.valid_comparison:
             return ""
 
-        for line in self._contents_lines:
+        if self._stored_values is not None:
+            return self._stored_values["memory_change"]
+
+        return self._parse_memory_change(self._contents_lines)
+
+    def _parse_memory_change(self, lines: list[str]) -> str | None:
+        for line in lines:
             if line.startswith("- memory change:"):
                 return line[line.find(":") + 1 :].strip()
 
@@ -331,8 +541,12 @@ class BenchmarkComparison(Comparison):
         if not self.valid_comparison:
             return ""
 
-        lines = self._contents_lines
+        if self._stored_values is not None:
+            return self._stored_values["hpt_reliability"]
 
+        return self._parse_hpt_reliability(self._contents_lines)
+
+    def _parse_hpt_reliability(self, lines: list[str]) -> str | None:
         for line in lines:
             m = re.match(r"- Reliability score: (\S+)", line)
             if m is not None:
@@ -344,19 +558,24 @@ class BenchmarkComparison(Comparison):
         if not self.valid_comparison:
             return ""
 
-        lines = self._contents_lines
+        if self._stored_values is not None:
+            return self._stored_values["hpt_percentiles"].get(str(percentile))
+
+        return self._parse_hpt_percentiles(self._contents_lines).get(percentile)
+
+    def _parse_hpt_percentiles(self, lines: list[str]) -> dict[int, str]:
+        percentiles = {}
 
         for line in lines:
             m = re.match(r"- ([0-9]+)% likely to have a (\S+) of (\S+)", line)
             if m is not None:
-                if int(m.group(1)) == percentile:
-                    if m.group(2) == "slowdown":
-                        suffix = "slower"
-                    else:
-                        suffix = "faster"
-                    return f"{m.group(3)} {suffix}"
+                if m.group(2) == "slowdown":
+                    suffix = "slower"
+                else:
+                    suffix = "faster"
+                percentiles.setdefault(int(m.group(1)), f"{m.group(3)} {suffix}")
 
-        return None
+        return percentiles
 
     def hpt_percentile_float(self, percentile: int) -> float | None:
         result = self.hpt_percentile(percentile)
@@ -398,7 +617,7 @@ class BenchmarkComparison(Comparison):
 
 
 class PystatsComparison(Comparison):
-    def get_files(self) -> Iterable[tuple[Callable, str, str]]:
+    def get_files(self, summary: bool = False) -> Iterable[tuple[Callable, str, str]]:
         if self.base_filename is None:
             return
         yield (self.write_pystats_diff, ".md", "pystats diff")
@@ -460,6 +679,9 @@ class Result:
         self.flags = sorted(set(flags or []))
         self._commit_datetime = commit_datetime
         self._filename = None
+        self._index_entry: result_index.IndexEntry | None = None
+        self._archive_entry: results_archive.ArchiveEntry | None = None
+        self._results_dir: Path | None = None
         self.bases = {}
 
     @classmethod
@@ -494,19 +716,34 @@ class Result:
             flags=flags,
         )
         obj._filename = filename
+        obj._results_dir = filename.parent.parent
+        return obj
+
+    @classmethod
+    def from_archive_entry(
+        cls, results_dir: PathLike, entry: results_archive.ArchiveEntry
+    ) -> "Result":
+        """
+        Create a result from an entry in the results archive. Its raw results
+        file no longer exists, so its contents aren't available, but its
+        metadata, timings and memory usage are.
+        """
+        obj = cls.from_filename(Path(results_dir).parent / entry.filename)
+        obj._archive_entry = entry
+        obj.set_index_entry(entry.index_entry)
         return obj
 
     @classmethod
     def from_arbitrary_filename(cls, filename: PathLike) -> "Result":
         filename = Path(filename)
-        content = json.loads(filename.read_text())
+        metadata = util.read_json_top_level_value(filename, "metadata", {})
         obj = cls(
             nickname="unknown",
             machine="unknown",
             fork="unknown",
             ref=filename.stem,
             version="unknown",
-            cpython_hash=content.get("metadata", {}).get("commit_id", "unknown"),
+            cpython_hash=metadata.get("commit_id", "unknown"),
             extra=[],
             suffix=filename.suffix,
             flags=[],
@@ -596,18 +833,94 @@ class Result:
                 return ("time plot", base, None)
             case (["vs", base, "mem"], ".svg"):
                 return ("memory plot", base, None)
+            case (["vs", base, "summary"], ".json"):
+                return ("summary", base, None)
+            case (["vs", base, "plot"], ".json"):
+                return ("time plot data", base, None)
+            case (["vs", base, "mem", "plot"], ".json"):
+                return ("memory plot data", base, None)
         raise ValueError(
             f"Unknown result type (extra={self.extra} suffix={self.suffix})"
         )
 
+    @property
+    def results_dir(self) -> Path | None:
+        """
+        The results directory containing this result, or None if it isn't
+        part of a results directory.
+        """
+        return self._results_dir
+
+    @property
+    def is_archived(self) -> bool:
+        return self._archive_entry is not None
+
+    @functools.cached_property
+    def digest(self) -> str:
+        if self._archive_entry is not None:
+            return self._archive_entry.digest
+        if self._index_entry is not None and self._index_entry.digest is not None:
+            return self._index_entry.digest
+        return util.get_file_digest(self.filename)
+
     @functools.cached_property
     def contents(self) -> dict[str, Any]:
+        """
+        The full contents of the results file. This is large, so only use it
+        when the benchmark data itself is needed, and call `evict` when done.
+        """
         with self.filename.open("rb") as fd:
             return json.load(fd)
 
+    def evict(self) -> None:
+        """
+        Release the full contents of the results file, if loaded, and the
+        data computed when comparing it to its bases.
+        """
+        self.__dict__.pop("contents", None)
+        self.__dict__.pop("_timing_data", None)
+        self.__dict__.pop("_memory_data", None)
+        for compare in self.bases.values():
+            compare.evict()
+
+    @functools.cached_property
+    def _streamed_metadata(self) -> dict[str, Any]:
+        return util.read_json_top_level_value(self.filename, "metadata", {})
+
+    def load_index_entry(self) -> result_index.IndexEntry:
+        """
+        Read the values stored in the results index from the file.
+        """
+        # The digest is computed from the same read of the file, so it never
+        # needs to be read in full just to compute it
+        with self.filename.open("rb") as fd:
+            data = fd.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if "contents" in self.__dict__:
+            contents = self.contents
+        else:
+            # Don't keep the full contents alive just to build the index
+            contents = json.loads(data)
+        return result_index.IndexEntry(
+            contents.get("metadata", {}),
+            _get_run_datetime(contents),
+            _get_benchmark_names(contents),
+            digest,
+        )
+
+    def get_index_entry(self) -> result_index.IndexEntry | None:
+        return self._index_entry
+
+    def set_index_entry(self, entry: result_index.IndexEntry) -> None:
+        self._index_entry = entry
+
     @property
     def metadata(self) -> dict[str, Any]:
-        return self.contents.get("metadata", {})
+        if self._index_entry is not None:
+            return self._index_entry.metadata
+        if "contents" in self.__dict__:
+            return self.contents.get("metadata", {})
+        return self._streamed_metadata
 
     @property
     def commit_datetime(self) -> str:
@@ -621,6 +934,8 @@ class Result:
 
     @property
     def run_datetime(self) -> str:
+        if self._index_entry is not None and self._index_entry.run_datetime:
+            return self._index_entry.run_datetime
         return self.contents["benchmarks"][0]["runs"][0]["metadata"]["date"]
 
     @property
@@ -676,13 +991,9 @@ class Result:
 
     @functools.cached_property
     def benchmark_names(self) -> set[str]:
-        names = set()
-        for benchmark in self.contents["benchmarks"]:
-            if "metadata" in benchmark:
-                names.add(benchmark["metadata"]["name"])
-            else:
-                names.add(self.contents["metadata"]["name"])
-        return names
+        if self._index_entry is not None:
+            return self._index_entry.benchmark_names
+        return _get_benchmark_names(self.contents)
 
     @functools.cached_property
     def parsed_version(self):
@@ -690,30 +1001,82 @@ class Result:
 
         return pkg_version.parse(self.version.replace("+", "0"))
 
-    def get_timing_data(self) -> dict[str, np.ndarray]:
-        data = {}
+    @functools.cached_property
+    def _timing_data(self) -> dict[str, np.ndarray]:
+        """
+        The timing values of every benchmark, read from the timing store if
+        possible.
+        """
+        if self._archive_entry is not None:
+            return self._archive_entry.timing_data
+        if self.results_dir is None:
+            return timing_store.load_data(self.contents)
+        data = timing_store.load(self.results_dir, self.digest)
+        if data is None:
+            data = timing_store.load_data(self.contents)
+            timing_store.store(self.results_dir, self.digest, data)
+        return data
+
+    def get_timing_data(self, include_excluded: bool = False) -> dict[str, np.ndarray]:
+        """
+        Get the timing values of each benchmark. The benchmarks excluded in
+        `bench_runner.toml` are left out, unless `include_excluded` is True.
+        """
+        if include_excluded:
+            return self._timing_data
         excluded = util.get_excluded_benchmarks()
+        return {
+            name: values
+            for name, values in self._timing_data.items()
+            if name not in excluded
+        }
+
+    def get_benchmark_metadata(self) -> dict[str, dict[str, Any]]:
+        """
+        Get the metadata of each benchmark, including the metadata shared by
+        the whole suite.
+        """
+        if self._archive_entry is not None:
+            return {
+                name: {**self.metadata, **metadata}
+                for name, metadata in self._archive_entry.benchmark_metadata.items()
+            }
+
+        data = {}
+        suite_metadata = self.contents["metadata"]
 
         for benchmark in self.contents["benchmarks"]:
-            name = benchmark.get("metadata", self.contents["metadata"])["name"]
-            if name not in excluded:
-                row = []
-                for run in benchmark["runs"]:
-                    row.extend(run.get("values", []))
-                data[name] = np.array(row, dtype=np.float64)
+            metadata = {**suite_metadata, **benchmark.get("metadata", {})}
+            data[metadata["name"]] = metadata
 
         return data
 
-    def get_memory_data(self) -> dict[str, np.ndarray]:
-        data = {}
+    def get_memory_data(self, include_excluded: bool = False) -> dict[str, np.ndarray]:
+        if include_excluded:
+            return self._memory_data
         excluded = util.get_excluded_benchmarks()
+        return {
+            name: values
+            for name, values in self._memory_data.items()
+            if name not in excluded
+        }
+
+    @functools.cached_property
+    def _memory_data(self) -> dict[str, np.ndarray]:
+        """
+        The memory usage of every benchmark.
+        """
+        if self._archive_entry is not None:
+            return self._archive_entry.memory_data
+
+        data = {}
 
         # On MacOS, there was a bug in pyperf where the `mem_max_rss` value was
         # erroneously multiplied by 1024.  (BSD defines maxrss in bytes, Linux
         # in kilobytes).
 
         needs_correction = self.system == "darwin" and version.parse(
-            self.contents["metadata"]["perf_version"]
+            self.metadata["perf_version"]
         ) < version.parse("2.6.3")
 
         def memory_value(metadata):
@@ -728,16 +1091,15 @@ class Result:
         for benchmark in self.contents["benchmarks"]:
             metadata = benchmark.get("metadata", self.contents["metadata"])
             name = metadata["name"]
-            if name not in excluded:
-                if mem := memory_value(metadata):
-                    data[name] = np.array([mem], dtype=np.float64)
-                else:
-                    row = []
-                    for run in benchmark["runs"]:
-                        metadata = run.get("metadata", {})
-                        if mem := memory_value(metadata):
-                            row.append(mem)
-                    data[name] = np.array(row, dtype=np.float64)
+            if mem := memory_value(metadata):
+                data[name] = np.array([mem], dtype=np.float64)
+            else:
+                row = []
+                for run in benchmark["runs"]:
+                    metadata = run.get("metadata", {})
+                    if mem := memory_value(metadata):
+                        row.append(mem)
+                data[name] = np.array(row, dtype=np.float64)
 
         return data
 
@@ -751,50 +1113,157 @@ def has_result(
     benchmark_hash: str,
     progress: bool = True,
 ) -> Result | None:
+    """
+    Find an existing result for the given commit, machine, flags and benchmark
+    hash, or None if there isn't one.
+
+    This is on the critical path of every benchmarking job, so rather than
+    loading all of the results, the candidates are found from the directory
+    and file names, and only their metadata is read. If there is more than one
+    match, the first one found is returned, as with `load_all_results`.
+    """
     if machine in ("__really_all", "all"):
         nickname = None
     else:
         _, _, nickname = machine.split("-")
 
-    results = load_all_results([], results_dir, False, progress=progress)
-
-    if pystats:
-        for result in results:
-            if (
-                commit_hash.startswith(result.cpython_hash)
-                and result.result_info[0] == "pystats raw"
-                and result.flags == flags
-                and result.benchmark_hash == benchmark_hash
-            ):
-                return result
-    else:
-        for result in results:
-            if (
-                commit_hash.startswith(result.cpython_hash)
-                and (nickname is None or result.nickname == nickname)
-                and result.flags == flags
-                and result.benchmark_hash == benchmark_hash
-            ):
-                return result
+    candidates = []
+    for dirpath in Path(results_dir).iterdir():
+        # Directory names are of the form bm-{date}-{version}-{hash}[-{flags}]
+        parts = dirpath.name.split("-")
+        if (
+            len(parts) < 4
+            or parts[0] != "bm"
+            or not commit_hash.startswith(parts[3])
+            or not dirpath.is_dir()
+        ):
+            continue
+        for filename in dirpath.glob("*.json"):
+            result = Result.from_filename(filename)
+            if result.flags != flags:
+                continue
+            if pystats:
+                if result.result_info[0] != "pystats raw":
+                    continue
+            else:
+                if result.result_info[0] not in ("raw results", "pystats raw") or (
+                    nickname is not None and result.nickname != nickname
+                ):
+                    continue
+            candidates.append(result)
 
+    if not candidates and not util.has_any_element(Path(results_dir).glob("**/*.json")):
+        raise ValueError("Didn't find any results.  That seems fishy.")
+
+    # Use the index for the metadata if it exists, but this isn't worth
+    # creating or updating it for.
+    if candidates and result_index.get_index_path(results_dir).is_file():
+        with result_index.ResultIndex(results_dir) as index:
+            for result in candidates:
+                entry = index.lookup(result.filename)
+                if entry is not None:
+                    result.set_index_entry(entry)
+
+    for result in candidates:
+        if result.benchmark_hash == benchmark_hash:
+            return result
     return None
 
 
+class _BaseCandidates:
+    """
+    The results that may be used as bases for the results from a single runner
+    configuration, indexed so that matching every result to its bases takes
+    close to linear time.
+
+    Candidates are grouped by benchmark hash, so candidates with the same
+    benchmark hash as the result can be preferred. Within each group, they
+    are indexed by version and by commit hash, along with their flags, and
+    when there are multiple matches, the earliest added is used.
+    """
+
+    def __init__(self):
+        self._groups: dict[
+            str | None,
+            tuple[
+                dict[tuple[str, tuple[str, ...]], list[tuple[int, Result]]],
+                dict[tuple[str, tuple[str, ...]], list[tuple[int, Result]]],
+            ],
+        ] = {}
+        self._hash_lengths: set[int] = set()
+        self._count = 0
+
+    def add(self, result: Result) -> None:
+        by_version, by_hash = self._groups.setdefault(
+            result.benchmark_hash, (defaultdict(list), defaultdict(list))
+        )
+        flags = tuple(result.flags)
+        entry = (self._count, result)
+        by_version[(result.version, flags)].append(entry)
+        by_hash[(result.cpython_hash, flags)].append(entry)
+        self._hash_lengths.add(len(result.cpython_hash))
+        self._count += 1
+
+    def _find(
+        self, result: Result, by_version: bool, keys: Iterable[tuple[str, tuple]]
+    ) -> Result | None:
+        keys = list(keys)
+        # Try for an exact match (same benchmark_hash) first, then fall back
+        # to less exact.
+        groups = []
+        if result.benchmark_hash in self._groups:
+            groups.append(self._groups[result.benchmark_hash])
+        groups.extend(v for k, v in self._groups.items() if k != result.benchmark_hash)
+
+        for group in groups:
+            index = group[0] if by_version else group[1]
+            best = None
+            for key in keys:
+                for entry in index.get(key, ()):
+                    if entry[1] is not result:
+                        if best is None or entry[0] < best[0]:
+                            best = entry
+                        break
+            if best is not None:
+                return best[1]
+        return None
+
+    def find_by_version(self, result: Result, version: str) -> Result | None:
+        """
+        Find a result with the given version and no flags.
+        """
+        return self._find(result, True, [(version, ())])
+
+    def find_by_hash_prefix(
+        self, result: Result, commit_hash: str, flags: Sequence[str]
+    ) -> Result | None:
+        """
+        Find a result, with the given flags, whose (abbreviated) commit hash is
+        a prefix of the given commit hash.
+        """
+        return self._find(
+            result,
+            False,
+            [(commit_hash[:length], tuple(flags)) for length in self._hash_lengths],
+        )
+
+    def find_by_hash(
+        self, result: Result, commit_hash: str, flags: Sequence[str]
+    ) -> Result | None:
+        """
+        Find a result with exactly the given commit hash and flags.
+        """
+        return self._find(result, False, [(commit_hash, tuple(flags))])
+
+
 def match_to_bases(
     results: Iterable[Result], bases: Sequence[str] | None, progress: bool = True
 ):
-    def find_match(result, candidates, base, func):
-        # Try for an exact match (same benchmark_hash) first,
-        # then fall back to less exact.
-        for result_set in [
-            candidates.get(result.benchmark_hash, []),
-            *(v for k, v in candidates.items() if k != result.benchmark_hash),
-        ]:
-            for ref in result_set:
-                if ref != result and func(ref):
-                    result.bases[base] = comparison_factory(ref, result, base)
-                    return True
-        return False
+    def set_base(result, base, ref):
+        if ref is None:
+            return False
+        result.bases[base] = comparison_factory(ref, result, base)
+        return True
 
     if bases is None:
         bases = []
@@ -806,12 +1275,14 @@ def match_to_bases(
         def track(it, *_args, **_kwargs):
             return it
 
-    groups = defaultdict(lambda: defaultdict(list))
+    groups = defaultdict(_BaseCandidates)
     for result in track(results, description="Loading results"):
         if result.fork == "python":
-            groups[(result.nickname, tuple(result.extra))][
-                result.benchmark_hash
-            ].append(result)
+            groups[(result.nickname, tuple(result.extra))].add(result)
+
+    compare_to_default = (
+        config.get_bench_runner_config().get("bases", {}).get("compare_to_default", [])
+    )
 
     for result in track(results, description="Matching results to bases"):
         candidates = groups[(result.nickname, tuple(result.extra))]
@@ -823,66 +1294,64 @@ def match_to_bases(
         ):
             continue
 
-        if bases is not None:
-            for base in bases:
-                find_match(
-                    result,
-                    candidates,
-                    base,
-                    lambda ref: ref.version == base and ref.flags == [],
-                )
+        for base in bases:
+            set_base(result, base, candidates.find_by_version(result, base))
 
         merge_base = result.commit_merge_base
         found_base = False
         if merge_base is not None:
-            _merge_base: str = merge_base
-            found_base = find_match(
+            found_base = set_base(
                 result,
-                candidates,
                 "base",
-                lambda ref: (
-                    _merge_base.startswith(ref.cpython_hash)
-                    and ref.flags == result.flags
-                ),
-            )
-
-            compare_to_default = (
-                config.get_bench_runner_config()
-                .get("bases", {})
-                .get("compare_to_default", [])
+                candidates.find_by_hash_prefix(result, merge_base, result.flags),
             )
 
             for flag in compare_to_default:
                 if result.flags == [flag]:
-                    found_default_base = find_match(
+                    found_default_base = set_base(
                         result,
-                        candidates,
                         "default_base_vs_" + flag,
-                        lambda ref: (
-                            _merge_base.startswith(ref.cpython_hash) and ref.flags == []
-                        ),
+                        candidates.find_by_hash_prefix(result, merge_base, []),
                     )
                     found_base = found_base or found_default_base
 
         if not found_base and result.fork == "python" and result.flags != []:
             # Compare builds with flags with builds with no flags
-            find_match(
+            set_base(
                 result,
-                candidates,
                 "base",
-                lambda ref: (
-                    ref.cpython_hash == result.cpython_hash and ref.flags == []
-                ),
+                candidates.find_by_hash(result, result.cpython_hash, []),
             )
 
 
+def _result_sort_key(result: Result) -> tuple:
+    return (
+        result.parsed_version,
+        result.commit_datetime,
+        tuple(result.flags),
+        result.filename,  # Just to produce a stable ordering
+    )
+
+
 def load_all_results(
     bases: Sequence[str] | None,
     results_dir: PathLike,
     sorted: bool = True,
     match: bool = True,
     progress: bool = True,
+    use_index: bool = True,
+    archive: bool = False,
 ) -> list[Result]:
+    """
+    Load all of the raw results in `results_dir`.
+
+    If `use_index` is True, the metadata of each result is read from (and
+    updated in) the persistent results index, so only new or changed files
+    need to be parsed.
+
+    If `archive` is True, the results in the results archive (whose raw
+    results files have been removed) are also included. See `is_archived`.
+    """
     results = []
 
     for entry in Path(results_dir).glob("**/*.json"):
@@ -893,18 +1362,22 @@ def load_all_results(
     if len(results) == 0:
         raise ValueError("Didn't find any results.  That seems fishy.")
 
+    if use_index:
+        with result_index.ResultIndex(results_dir) as index:
+            index.update(results)
+
+    if archive:
+        # If a result is both in the archive and on disk, use the one on disk
+        filenames = set(result.filename for result in results)
+        for archive_entry in results_archive.load(results_dir):
+            result = Result.from_archive_entry(results_dir, archive_entry)
+            if result.filename not in filenames:
+                results.append(result)
+
     if match:
         match_to_bases(results, bases, progress=progress)
 
     if sorted:
-        results.sort(
-            key=lambda x: (
-                x.parsed_version,
-                x.commit_datetime,
-                tuple(x.flags),
-                x.filename,  # Just to produce a stable ordering
-            ),
-            reverse=True,
-        )
+        results.sort(key=_result_sort_key, reverse=True)
 
     return results
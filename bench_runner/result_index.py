@@ -0,0 +1,217 @@
+"""
+A persistent index of the metadata stored in the raw results files.
+
+Answering questions like "what is the merge base of this result?" otherwise
+requires fully parsing every (multi-megabyte) pyperf JSON file in the results
+directory. The index stores the handful of values we need from each file,
+keyed by its path, modification time and size, so that only new or changed
+files need to be parsed on subsequent loads. This includes the digest of each
+file, which keys the other caches, so that it doesn't need to be recomputed.
+
+When an entry is removed or replaced, the cached timings and comparisons of
+the file it was for are removed too.
+
+Paths are stored relative to the parent of the results directory, so that
+results directories that share a cache (because they share a parent) each
+have their own entries.
+"""
+
+from __future__ import annotations
+
+
+import json
+import os
+from pathlib import Path
+import sqlite3
+from typing import TYPE_CHECKING, Any, Iterable
+
+
+from . import comparison_cache
+from . import timing_store
+from . import util
+from .util import PathLike
+
+
+if TYPE_CHECKING:
+    from .result import Result
+
+
+# Bump this whenever the set of indexed values changes, to force a rebuild.
+SCHEMA_VERSION = 3
+
+INDEX_FILENAME = "results_index.sqlite"
+
+
+def get_index_path(results_dir: PathLike) -> Path:
+    return util.get_cache_dir(results_dir) / INDEX_FILENAME
+
+
+class IndexEntry:
+    """
+    The values stored in the index for a single results file.
+    """
+
+    def __init__(
+        self,
+        metadata: dict[str, Any],
+        run_datetime: str | None,
+        benchmark_names: Iterable[str],
+        digest: str | None = None,
+    ):
+        self.metadata = metadata
+        self.run_datetime = run_datetime
+        self.benchmark_names = set(benchmark_names)
+        self.digest = digest
+
+
+class ResultIndex:
+    """
+    An on-disk SQLite index of result metadata.
+
+    Use as a context manager, so the changes are committed and the database
+    is closed at the end.
+    """
+
+    def __init__(self, results_dir: PathLike):
+        self.results_dir = Path(results_dir)
+        self._prefix = self.results_dir.resolve().name
+        self.path = get_index_path(results_dir)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._create_tables()
+
+    def __enter__(self) -> "ResultIndex":
+        return self
+
+    def __exit__(self, *_args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+    def _create_tables(self) -> None:
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS results")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                metadata TEXT NOT NULL,
+                run_datetime TEXT,
+                benchmark_names TEXT NOT NULL,
+                digest TEXT
+            )
+            """
+        )
+
+    def _key(self, filename: PathLike) -> str:
+        path = Path(filename)
+        try:
+            path = self._prefix / path.relative_to(self.results_dir)
+        except ValueError:
+            pass
+        return path.as_posix()
+
+    def lookup(
+        self, filename: PathLike, stat: os.stat_result | None = None
+    ) -> IndexEntry | None:
+        """
+        Get the index entry for the given file, or None if it isn't in the
+        index or the file has changed since it was indexed.
+        """
+        if stat is None:
+            stat = Path(filename).stat()
+        row = self._conn.execute(
+            "SELECT mtime_ns, size, metadata, run_datetime, benchmark_names, digest "
+            "FROM results WHERE path = ?",
+            (self._key(filename),),
+        ).fetchone()
+        if row is None:
+            return None
+        mtime_ns, size, metadata, run_datetime, benchmark_names, digest = row
+        if mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+            return None
+        return IndexEntry(
+            json.loads(metadata), run_datetime, json.loads(benchmark_names), digest
+        )
+
+    def store(
+        self, filename: PathLike, entry: IndexEntry, stat: os.stat_result | None = None
+    ) -> None:
+        if stat is None:
+            stat = Path(filename).stat()
+        key = self._key(filename)
+        old = self._conn.execute(
+            "SELECT digest FROM results WHERE path = ?", (key,)
+        ).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                stat.st_mtime_ns,
+                stat.st_size,
+                json.dumps(entry.metadata),
+                entry.run_datetime,
+                json.dumps(sorted(entry.benchmark_names)),
+                entry.digest,
+            ),
+        )
+        if old is not None:
+            self._evict([old[0]])
+
+    def _evict(self, digests: Iterable[str | None]) -> None:
+        """
+        Remove the cached timings and comparisons of any of the given digests
+        that are no longer in the index.
+        """
+        for digest in set(digests):
+            if digest is None:
+                continue
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM results WHERE digest = ?", (digest,)
+            ).fetchone()
+            if count == 0:
+                timing_store.remove(self.results_dir, digest)
+                comparison_cache.remove(self.results_dir, digest)
+
+    def prune(self, filenames: Iterable[PathLike]) -> None:
+        """
+        Remove the entries for any files in this results directory that are
+        not in `filenames`.
+        """
+        keep = set(self._key(x) for x in filenames)
+        prefix = f"{self._prefix}/"
+        stale = [
+            (path, digest)
+            for (path, digest) in self._conn.execute("SELECT path, digest FROM results")
+            if path.startswith(prefix) and path not in keep
+        ]
+        self._conn.executemany(
+            "DELETE FROM results WHERE path = ?", [(path,) for path, _ in stale]
+        )
+        self._evict(digest for _, digest in stale)
+
+    def update(self, results: Iterable["Result"]) -> int:
+        """
+        Fill in the indexed values on each of the given results, parsing only
+        those files that are new or have changed since they were last indexed.
+
+        Returns the number of files that needed to be parsed.
+        """
+        results = list(results)
+        parsed = 0
+        for result in results:
+            stat = result.filename.stat()
+            entry = self.lookup(result.filename, stat)
+            if entry is None:
+                entry = result.load_index_entry()
+                self.store(result.filename, entry, stat)
+                parsed += 1
+            result.set_index_entry(entry)
+        self.prune(result.filename for result in results)
+        return parsed
@@ -0,0 +1,168 @@
+"""
+A consolidated, read-only archive of old raw results.
+
+Old results directories are rarely needed, but each one is a multi-megabyte
+pyperf JSON file that has to be found and parsed. Rather than deleting them
+outright, `purge --archive` moves them into the `archive` directory of the
+results repository, which holds a pair of append-only files for each year:
+
+- `results-{year}.jsonl`: One line per result, with its original filename,
+  digest, metadata and the offsets of each benchmark's values.
+- `results-{year}.f64`: The timing and memory values of every benchmark of
+  every result, as little-endian 64-bit floats.
+
+The values file is memory-mapped when loaded, so each benchmark's values are a
+zero-copy view into it.
+"""
+
+from __future__ import annotations
+
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Mapping
+
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+from . import result_index
+from .util import PathLike
+
+
+if TYPE_CHECKING:
+    from .result import Result
+
+
+ARCHIVE_DIRNAME = "archive"
+
+DTYPE = np.dtype("<f8")
+
+
+def get_archive_dir(results_dir: PathLike) -> Path:
+    """
+    Get the archive directory, which lives next to the results directory.
+    """
+    return Path(results_dir).parent / ARCHIVE_DIRNAME
+
+
+def _get_paths(archive_dir: Path, year: str) -> tuple[Path, Path]:
+    root = archive_dir / f"results-{year}"
+    return root.with_suffix(".jsonl"), root.with_suffix(".f64")
+
+
+class ArchiveEntry:
+    """
+    A single result in the archive.
+    """
+
+    def __init__(self, record: dict[str, Any], values: NDArray[np.float64]):
+        self.filename = Path(record["filename"])
+        self.digest = record["digest"]
+        self.index_entry = result_index.IndexEntry(
+            record["metadata"], record["run_datetime"], record["benchmark_names"]
+        )
+        self.benchmark_metadata = record["benchmark_metadata"]
+        self.timing_data = self._get_arrays(values, record["timings"])
+        self.memory_data = self._get_arrays(values, record["memory"])
+
+    @staticmethod
+    def _get_arrays(
+        values: NDArray[np.float64], offsets: Mapping[str, tuple[int, int]]
+    ) -> dict[str, NDArray[np.float64]]:
+        return {name: values[start:end] for name, (start, end) in offsets.items()}
+
+
+def _write_values(
+    fd, offset: int, data: Mapping[str, NDArray[np.float64]]
+) -> tuple[dict[str, tuple[int, int]], int]:
+    offsets = {}
+    for name, values in data.items():
+        values = np.asarray(values, dtype=DTYPE)
+        fd.write(values.tobytes())
+        offsets[name] = (offset, offset + len(values))
+        offset += len(values)
+    return offsets, offset
+
+
+def append(results_dir: PathLike, results: Iterable["Result"]) -> int:
+    """
+    Add the given raw results to the archive. Results that are already in the
+    archive are skipped.
+
+    Returns the number of results added.
+    """
+    results_dir = Path(results_dir)
+    archive_dir = get_archive_dir(results_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+
+    existing = set(entry.filename for entry in load(results_dir))
+
+    added = 0
+    for result in results:
+        filename = Path(results_dir.name) / result.filename.relative_to(results_dir)
+        if filename in existing:
+            continue
+
+        index_entry = result.load_index_entry()
+        records_path, values_path = _get_paths(archive_dir, result.commit_date[:4])
+        with values_path.open("ab") as fd:
+            offset = fd.tell() // DTYPE.itemsize
+            timings, offset = _write_values(
+                fd, offset, result.get_timing_data(include_excluded=True)
+            )
+            memory, offset = _write_values(
+                fd, offset, result.get_memory_data(include_excluded=True)
+            )
+
+        record = {
+            "filename": filename.as_posix(),
+            "digest": result.digest,
+            "metadata": index_entry.metadata,
+            "run_datetime": index_entry.run_datetime,
+            "benchmark_names": sorted(index_entry.benchmark_names),
+            "benchmark_metadata": {
+                name: {
+                    key: value
+                    for key, value in metadata.items()
+                    if key in ("unit", "tags")
+                }
+                for name, metadata in result.get_benchmark_metadata().items()
+            },
+            "timings": timings,
+            "memory": memory,
+        }
+        # The record is appended last, so a partially-written result is never
+        # visible
+        with records_path.open("a", encoding="utf-8") as fd:
+            fd.write(json.dumps(record))
+            fd.write("\n")
+
+        existing.add(filename)
+        result.evict()
+        added += 1
+
+    return added
+
+
+def load(results_dir: PathLike) -> list[ArchiveEntry]:
+    """
+    Load all of the entries in the archive.
+    """
+    archive_dir = get_archive_dir(results_dir)
+    if not archive_dir.is_dir():
+        return []
+
+    entries = []
+    for records_path in sorted(archive_dir.glob("results-*.jsonl")):
+        values_path = records_path.with_suffix(".f64")
+        if values_path.stat().st_size == 0:
+            values = np.empty(0, dtype=DTYPE)
+        else:
+            values = np.memmap(values_path, dtype=DTYPE, mode="r")
+        with records_path.open(encoding="utf-8") as fd:
+            for line in fd:
+                if line.strip():
+                    entries.append(ArchiveEntry(json.loads(line), values))
+    return entries
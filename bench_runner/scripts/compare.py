@@ -17,6 +17,7 @@ import rich_argparse
 
 
 from bench_runner import flags as mflags
+from bench_runner import plot
 from bench_runner import result as mod_result
 from bench_runner import runners as mod_runners
 from bench_runner import util
@@ -75,7 +76,10 @@ def compare_pair(
     for func, suffix, file_type in comparison.get_files():
         output_filename = util.apply_suffix(output_dir / name, suffix)
         func(output_filename)
-        entry.append(f"[{util.TYPE_TO_ICON[file_type]}]({output_filename.name})")
+        link = output_filename.name
+        if file_type in util.PLOT_DATA_TYPES:
+            link = f"{plot.VIEWER_FILENAME}?data={link}"
+        entry.append(f"[{util.TYPE_TO_ICON[file_type]}]({link})")
 
     return "".join(entry)
 
@@ -239,6 +243,8 @@ def _main(
     output_dir_path = Path(output_dir)
     if not output_dir_path.exists():
         output_dir_path.mkdir()
+    if plot.get_comparison_plot_format() == "data":
+        plot.install_viewer(output_dir_path)
 
     if all(commit.endswith(".json") for commit in commits):
         _main_with_files(commits, output_dir_path, comparison_type)
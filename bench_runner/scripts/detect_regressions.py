@@ -0,0 +1,297 @@
+"""
+Detect change points in the longitudinal results, and report the regressions.
+"""
+
+from __future__ import annotations
+
+
+import argparse
+from collections import defaultdict
+import datetime
+from pathlib import Path
+from typing import Any, Iterable, TextIO
+
+
+import numpy as np
+import rich
+import rich.progress
+import rich_argparse
+
+
+from bench_runner.bases import get_bases
+from bench_runner import changepoints
+from bench_runner import flags as mflags
+from bench_runner import gh
+from bench_runner.result import load_all_results, Result
+from bench_runner import table
+from bench_runner import trend_store
+from bench_runner import util
+from bench_runner.util import PathLike
+
+
+# The maximum number of regressions listed in a notification
+MAX_NOTIFICATION_LINES = 20
+
+
+SeriesKey = tuple[str, tuple[str, ...], str]
+
+
+def get_series(results: Iterable[Result], base: str) -> dict[SeriesKey, list[Result]]:
+    """
+    Group the results of the main CPython repo that are compared to `base` by
+    runner, flags and major version, each sorted by commit date.
+    """
+    series = defaultdict(list)
+    for result in results:
+        if result.fork != "python" or result.result_info[0] != "raw results":
+            continue
+        compare = result.bases.get(base)
+        if compare is None or not compare.valid_comparison:
+            continue
+        version = ".".join(str(x) for x in result.parsed_version.release[0:2])
+        series[(result.nickname, tuple(result.flags), version)].append(result)
+
+    for series_results in series.values():
+        series_results.sort(
+            key=lambda r: (
+                datetime.datetime.fromisoformat(r.commit_datetime),
+                r.filename.name,
+            )
+        )
+    return dict(series)
+
+
+def _get_series_key(runner: str, flags: Iterable[str], version: str, name: str):
+    return "/".join([runner, ",".join(flags), version, name])
+
+
+def _get_medians(result: Result, cache: dict[Path, dict[str, float]]):
+    if result.filename not in cache:
+        cache[result.filename] = {
+            name: float(np.median(values))
+            for name, values in result.get_timing_data().items()
+            if len(values)
+        }
+        result.evict()
+    return cache[result.filename]
+
+
+def detect(
+    results: Iterable[Result],
+    base: str,
+    store: trend_store.TrendStore,
+    cp_store: changepoints.ChangePointStore,
+    benchmarks: bool = True,
+) -> list[dict[str, Any]]:
+    """
+    Feed any new results to the detector of each series: the geometric mean
+    against `base` and, if `benchmarks` is True, the median time of each
+    benchmark.
+
+    Returns the change points detected in the new results.
+    """
+    excluded = util.get_excluded_benchmarks()
+    new_changes = []
+
+    for (runner, flags, version), series_results in rich.progress.track(
+        get_series(results, base).items(), description="Detecting change points"
+    ):
+        fields = {"runner": runner, "flags": list(flags), "version": version}
+
+        new_changes.extend(
+            cp_store.update(
+                _get_series_key(runner, flags, version, "(geometric mean)"),
+                {**fields, "benchmark": None, "higher_is_better": True},
+                series_results,
+                lambda r: store.get(r.bases[base].ref, r, base)["geometric_mean"],
+            )
+        )
+
+        if not benchmarks:
+            continue
+
+        medians: dict[Path, dict[str, float]] = {}
+        names = set().union(*(r.benchmark_names for r in series_results)) - excluded
+        for name in sorted(names):
+            new_changes.extend(
+                cp_store.update(
+                    _get_series_key(runner, flags, version, name),
+                    {**fields, "benchmark": name, "higher_is_better": False},
+                    [r for r in series_results if name in r.benchmark_names],
+                    lambda r: _get_medians(r, medians).get(name),
+                )
+            )
+
+    return new_changes
+
+
+def get_regressions(
+    changes: Iterable[dict[str, Any]], min_change: float
+) -> list[dict[str, Any]]:
+    """
+    Get the change points that made things slower by at least `min_change`,
+    most recent first.
+    """
+    regressions = [x for x in changes if changepoints.get_slowdown(x) >= min_change]
+    regressions.sort(
+        key=lambda x: (x["first"]["date"], changepoints.get_slowdown(x)), reverse=True
+    )
+    return regressions
+
+
+def _format_config(change: dict[str, Any]) -> str:
+    return ", ".join(mflags.flags_to_human(change["flags"])) or "default"
+
+
+def _format_range(change: dict[str, Any]) -> str:
+    first = change["first"]
+    before = change["before"]
+    if before is None:
+        return table.link_to_hash(first["hash"], first["fork"])
+    return table.md_link(
+        f"{before['hash']}...{first['hash']}",
+        f"https://github.com/{first['fork']}/cpython/compare/"
+        f"{before['hash']}...{first['hash']}",
+    )
+
+
+def write_report(
+    fd: TextIO, regressions: list[dict[str, Any]], base: str, min_change: float
+) -> None:
+    fd.write("# Regressions\n\n")
+    fd.write(
+        f"Change points in the results of each runner and configuration, that "
+        f"made the geometric mean against {base}, or the median time of a "
+        f"benchmark, at least {min_change:.1%} slower. Most recent first.\n\n"
+    )
+    if not regressions:
+        fd.write("No regressions found.\n")
+        return
+    table.output_table(
+        fd,
+        ["date", "runner", "config", "version", "benchmark", "slower by", "commits"],
+        [
+            [
+                x["first"]["date"],
+                x["runner"],
+                _format_config(x),
+                x["version"],
+                x["benchmark"] or "(geometric mean)",
+                f"{changepoints.get_slowdown(x):.1%}",
+                _format_range(x),
+            ]
+            for x in regressions
+        ],
+    )
+
+
+def get_notification(regressions: list[dict[str, Any]]) -> str:
+    lines = ["🤖 Possible performance regressions were detected:", ""]
+    for x in regressions[:MAX_NOTIFICATION_LINES]:
+        lines.append(
+            f"- {x['runner']} ({_format_config(x)}) {x['version']}, "
+            f"{x['benchmark'] or 'geometric mean'}: "
+            f"{changepoints.get_slowdown(x):.1%} slower in {_format_range(x)}"
+        )
+    if len(regressions) > MAX_NOTIFICATION_LINES:
+        lines.append(f"- ...and {len(regressions) - MAX_NOTIFICATION_LINES} more")
+    return "\n".join(lines)
+
+
+def _main(
+    repo_dir: PathLike,
+    base: str | None = None,
+    output: PathLike | None = None,
+    min_change: float = 0.01,
+    benchmarks: bool = True,
+    notify: bool = False,
+) -> list[dict[str, Any]]:
+    repo_dir = Path(repo_dir)
+    bases = get_bases()
+    if base is None:
+        if len(bases) == 0:
+            raise ValueError("Must have at least one base specified")
+        base = bases[0]
+    if output is None:
+        output = repo_dir / "regressions.md"
+
+    results = load_all_results([base], repo_dir / "results", sorted=False)
+
+    with (
+        trend_store.TrendStore(trend_store.get_store_path(repo_dir)) as store,
+        changepoints.ChangePointStore(
+            changepoints.get_state_path(repo_dir), base
+        ) as cp_store,
+    ):
+        is_new = cp_store.is_new
+        new_changes = detect(results, base, store, cp_store, benchmarks=benchmarks)
+        all_changes = cp_store.get_changes()
+
+    regressions = get_regressions(all_changes, min_change)
+    with Path(output).open("w", encoding="utf-8") as fd:
+        write_report(fd, regressions, base, min_change)
+
+    new_regressions = get_regressions(new_changes, min_change)
+    rich.print(
+        f"Found {len(regressions)} regressions ({len(new_regressions)} new). "
+        f"Wrote {output}"
+    )
+
+    if notify and new_regressions:
+        if is_new:
+            # Everything looks new when the state is rebuilt from scratch
+            rich.print("Not sending notification about historical regressions.")
+        else:
+            gh.send_notification(get_notification(new_regressions))
+
+    return new_regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Detect change points in the results over time, and report the
+        regressions.
+        """,
+        formatter_class=rich_argparse.ArgumentDefaultsRichHelpFormatter,
+    )
+    parser.add_argument(
+        "--base",
+        help="The base to compare the geometric means to. "
+        "Defaults to the first base in bench_runner.toml.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="The path of the report. Defaults to regressions.md.",
+    )
+    parser.add_argument(
+        "--min-change",
+        type=float,
+        default=0.01,
+        help="The smallest slowdown to report, as a fraction",
+    )
+    parser.add_argument(
+        "--no-benchmarks",
+        action="store_true",
+        help="Only look at the geometric means, not each benchmark",
+    )
+    parser.add_argument(
+        "--notify",
+        action="store_true",
+        help="Send a notification about newly detected regressions",
+    )
+    args = parser.parse_args()
+
+    _main(
+        Path(),
+        base=args.base,
+        output=args.output,
+        min_change=args.min_change,
+        benchmarks=not args.no_benchmarks,
+        notify=args.notify,
+    )
+
+
+if __name__ == "__main__":
+    main()
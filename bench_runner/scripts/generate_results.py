@@ -3,11 +3,15 @@ from __future__ import annotations
 
 import argparse
 from collections import defaultdict
+import concurrent.futures
 import datetime
+import functools
 import io
+import multiprocessing
 from pathlib import Path
 import sys
-from typing import Iterable, TextIO, Sequence
+import traceback
+from typing import Callable, Iterable, TextIO, Sequence
 from urllib.parse import unquote
 
 
@@ -20,10 +24,17 @@ from bench_runner.bases import get_bases
 from bench_runner import flags as mflags
 from bench_runner import plot
 from bench_runner.result import (
+    Comparison,
+    comparison_factory,
     load_all_results,
     Result,
+    SUMMARY_SUFFIX,
 )
+from bench_runner import result_index
+from bench_runner import results_archive
+from bench_runner.results_archive import ArchiveEntry
 from bench_runner import table
+from bench_runner import trend_store
 from bench_runner import util
 from bench_runner.util import PathLike
 
@@ -37,7 +48,7 @@ def _tuple_to_nested_dicts(entries: Iterable[tuple], d: dict | None = None) -> d
         else:
             recurse(entry[1:], d.setdefault(entry[0], {}))
 
-    assert len(set(len(x) for x in entries)) == 1
+    assert len(set(len(x) for x in entries)) <= 1
 
     if d is None:
         d = {}
@@ -47,34 +58,196 @@ def _tuple_to_nested_dicts(entries: Iterable[tuple], d: dict | None = None) -> d
     return d
 
 
-def save_generated_results(results: Iterable[Result], force: bool = False) -> None:
+def _write_derived_result(func: Callable, filename: Path) -> str | None:
+    """
+    Write a single derived result.
+
+    Returns None on success, or the formatted traceback on failure, in which
+    case any partially-written file is removed.
+    """
+    try:
+        func(filename)
+    except Exception:
+        filename.unlink(missing_ok=True)
+        return traceback.format_exc()
+    return None
+
+
+@functools.lru_cache(maxsize=1)
+def _get_archive_in_worker(results_dir: Path) -> dict[Path, ArchiveEntry]:
+    return {
+        results_dir.parent / entry.filename: entry
+        for entry in results_archive.load(results_dir)
+    }
+
+
+def _get_result_in_worker(
+    filename: Path,
+    archive_dir: Path | None,
+    index_entry: result_index.IndexEntry | None,
+) -> Result:
+    """
+    Load a result in a worker process. Archived results (whose raw results
+    file no longer exists) are rebuilt from the archive of `archive_dir`.
+    Otherwise, the result's entry from the results index, if any, is used for
+    its metadata and digest, so the file isn't rehashed in the worker.
+    """
+    if archive_dir is None:
+        result = Result.from_filename(filename)
+        if index_entry is not None:
+            result.set_index_entry(index_entry)
+        return result
+    return Result.from_archive_entry(
+        archive_dir, _get_archive_in_worker(archive_dir)[filename]
+    )
+
+
+def _write_comparison_in_worker(
+    ref_filename: Path,
+    ref_archive_dir: Path | None,
+    ref_index_entry: result_index.IndexEntry | None,
+    head_filename: Path,
+    head_index_entry: result_index.IndexEntry | None,
+    base: str,
+    files: list[tuple[str, Path]],
+) -> list[tuple[Path, str]]:
+    """
+    Write the given derived results of a single comparison, as (suffix,
+    filename) pairs, in a worker process.
+
+    Only the filenames and index entries of the results are sent to the
+    worker, which is much cheaper than pickling the `Result` objects, and
+    their (potentially loaded) contents. If the reference result is archived,
+    the results directory whose archive it is in is sent instead.
+
+    Returns a list of ``(filename, traceback)`` for each failure.
+    """
+    compare = comparison_factory(
+        _get_result_in_worker(ref_filename, ref_archive_dir, ref_index_entry),
+        _get_result_in_worker(head_filename, None, head_index_entry),
+        base,
+    )
+    funcs = {suffix: func for func, suffix, _ in compare.get_files(summary=True)}
+    failures = []
+    for suffix, filename in files:
+        if suffix in funcs:
+            error = _write_derived_result(funcs[suffix], filename)
+        else:
+            error = f"No derived result with suffix {suffix}"
+        if error is not None:
+            failures.append((filename, error))
+    return failures
+
+
+def save_generated_results(
+    results: Iterable[Result], force: bool = False, jobs: int = 1
+) -> list[tuple[Path, str]]:
     """
     Write out the comparison tables and plots for every result.
 
     By default, files are only written out if they don't already exist. To force
     regeneration, pass ``force=True``.
+
+    If ``jobs`` is greater than 1, the files are generated in that many worker
+    processes.
+
+    A failure to generate one file doesn't stop the others from being
+    generated. Returns a list of ``(filename, traceback)`` for each failure,
+    sorted by filename.
     """
     work = []
     for result in results:
         for compare in result.bases.values():
             if compare.valid_comparison:
-                for func, suffix, _ in compare.get_files():
+                for func, suffix, _ in compare.get_files(summary=True):
                     filename = util.apply_suffix(compare.base_filename, suffix)
                     if filename.exists() and force:
                         filename.unlink()
 
                     if not filename.exists():
-                        work.append((func, filename))
+                        work.append((result, compare, func, suffix, filename))
 
-    assert len(list(set(x[1] for x in work))) == len(work)
+    assert len(list(set(x[4] for x in work))) == len(work)
 
     rich.print(f"Generating {len(work)} derived results")
 
-    for func, filename in rich.progress.track(
-        work,
-        description="Generating results",
-    ):
-        func(filename)
+    failures = []
+    if jobs > 1 and len(work) > 1:
+        # All of the derived results of a comparison are written by a single
+        # task, so each comparison is only computed once
+        by_comparison: dict[int, tuple[Comparison, list[tuple[str, Path]]]] = {}
+        for _, compare, _, suffix, filename in work:
+            by_comparison.setdefault(id(compare), (compare, []))[1].append(
+                (suffix, filename)
+            )
+
+        # matplotlib (and rich's refresh thread) don't play well with fork,
+        # so use fresh worker processes.
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _write_comparison_in_worker,
+                    compare.ref.filename,
+                    compare.ref.results_dir if compare.ref.is_archived else None,
+                    compare.ref.get_index_entry(),
+                    compare.head.filename,
+                    compare.head.get_index_entry(),
+                    compare.base,
+                    files,
+                ): files
+                for compare, files in by_comparison.values()
+            }
+            for future in rich.progress.track(
+                concurrent.futures.as_completed(futures),
+                description="Generating results",
+                total=len(futures),
+            ):
+                try:
+                    failures.extend(future.result())
+                except Exception:
+                    error = traceback.format_exc()
+                    failures.extend(
+                        (filename, error) for _, filename in futures[future]
+                    )
+    else:
+        for i, (result, _, func, _, filename) in enumerate(
+            rich.progress.track(
+                work,
+                description="Generating results",
+            )
+        ):
+            error = _write_derived_result(func, filename)
+            if error is not None:
+                failures.append((filename, error))
+            # The work for each result is contiguous, so once we move on to the
+            # next result, the full contents of this one can be released.
+            if i + 1 == len(work) or work[i + 1][0] is not result:
+                result.evict()
+
+    failures.sort()
+    for filename, error in failures:
+        rich.print(f"[red]Failed to generate {filename}[/red]")
+        rich.print(error)
+
+    return failures
+
+
+def md_link_to_derived(
+    text: str, filename: PathLike, file_type: str, root: PathLike
+) -> str:
+    """
+    Formats a Markdown link to a derived file of a comparison. Plot data files
+    are linked through the viewer at the top of the results repository, which
+    renders them.
+    """
+    filename = Path(filename)
+    if file_type in util.PLOT_DATA_TYPES:
+        # Derived files are in `results/{dir}/` of the results repository
+        viewer = filename.parents[2] / plot.VIEWER_FILENAME
+        return table.md_viewer_link(text, filename, viewer, root)
+    return table.md_link(text, str(filename), root)
 
 
 def output_results_index(
@@ -96,9 +269,10 @@ def output_results_index(
                 entry = [compare.summary, "<br>"]
                 for _, suffix, file_type in compare.get_files():
                     entry.append(
-                        table.md_link(
+                        md_link_to_derived(
                             util.TYPE_TO_ICON[file_type],
-                            str(util.apply_suffix(compare.base_filename, suffix)),
+                            util.apply_suffix(compare.base_filename, suffix),
+                            file_type,
                             filename,
                         )
                     )
@@ -319,14 +493,17 @@ def get_directory_indices_entries(
                 continue
             result = Result.from_filename(filename)
             type, base, benchmark = result.result_info
-            if type is not None and benchmark is None:
+            if type not in (None, "summary") and benchmark is None:
                 entries.append(
                     (
                         dirpath,
                         result.runner,
                         base,
-                        table.md_link(
-                            util.TYPE_TO_ICON.get(type, "") + type, result.filename.name
+                        md_link_to_derived(
+                            util.TYPE_TO_ICON.get(type, "") + type,
+                            result.filename,
+                            type,
+                            dirpath / "README.md",
                         ),
                     )
                 )
@@ -371,7 +548,105 @@ def filter_broken_memory_results(results):
     return [r for r in results if r.nickname != "darwin"]
 
 
-def _main(repo_dir: PathLike, force: bool = False, bases: Sequence[str] | None = None):
+def render_plots(
+    plots: Sequence[tuple[plot.TimeSeriesPlot, PathLike]], jobs: int = 1
+) -> None:
+    """
+    Render each of the given plots to its output file. If ``jobs`` is greater
+    than 1, the plots are rendered in that many worker processes.
+    """
+    if jobs > 1 and len(plots) > 1:
+        # matplotlib isn't thread-safe, and doesn't play well with fork, so
+        # use fresh worker processes.
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(jobs, len(plots)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(plot.render_plot, plot_data, output_filename)
+                for plot_data, output_filename in plots
+            ]
+            for future in rich.progress.track(
+                concurrent.futures.as_completed(futures),
+                description="Generating plots",
+                total=len(futures),
+            ):
+                future.result()
+    else:
+        for plot_data, output_filename in rich.progress.track(
+            plots, description="Generating plots"
+        ):
+            plot_data.render(output_filename)
+
+
+def get_affected_results(
+    results: Iterable[Result], changed: Iterable[PathLike] = ()
+) -> list[Result]:
+    """
+    Find the results whose derived files need to be (re)generated, because the
+    result itself, or the reference it is compared to, is in ``changed``, or
+    because some of its derived files don't exist yet (for example, because it
+    was just added).
+
+    A missing summary file doesn't make a result affected, since results from
+    before summary files existed don't have one. See
+    ``get_results_missing_summaries``.
+
+    The stale derived files of comparisons involving a changed result are
+    removed, so they will be regenerated by ``save_generated_results``.
+    """
+    changed = set(Path(x).resolve() for x in changed)
+
+    affected = []
+    for result in results:
+        is_affected = result.filename.resolve() in changed
+        for compare in result.bases.values():
+            if not compare.valid_comparison:
+                continue
+            is_stale = is_affected or compare.ref.filename.resolve() in changed
+            for _, suffix, _ in compare.get_files(summary=True):
+                filename = util.apply_suffix(compare.base_filename, suffix)
+                if is_stale:
+                    filename.unlink(missing_ok=True)
+                elif not filename.exists() and suffix != SUMMARY_SUFFIX:
+                    is_stale = True
+            is_affected = is_affected or is_stale
+        if is_affected:
+            affected.append(result)
+    return affected
+
+
+def get_results_missing_summaries(results: Iterable[Result]) -> list[Result]:
+    """
+    Find the results with a comparison that has all of its other derived files,
+    but no summary file. The summary only needs to be written for these, which
+    doesn't change any of the other files that depend on the result.
+    """
+    missing = []
+    for result in results:
+        for compare in result.bases.values():
+            if not compare.valid_comparison:
+                continue
+            suffixes = [suffix for _, suffix, _ in compare.get_files(summary=True)]
+            if (
+                SUMMARY_SUFFIX in suffixes
+                and not util.apply_suffix(
+                    compare.base_filename, SUMMARY_SUFFIX
+                ).exists()
+            ):
+                missing.append(result)
+                break
+    return missing
+
+
+def _main(
+    repo_dir: PathLike,
+    force: bool = False,
+    bases: Sequence[str] | None = None,
+    jobs: int = 1,
+    incremental: bool = False,
+    changed: Iterable[PathLike] = (),
+):
     repo_dir = Path(repo_dir)
     results_dir = repo_dir / "results"
     if bases is None:
@@ -379,49 +654,117 @@ def _main(repo_dir: PathLike, force: bool = False, bases: Sequence[str] | None =
     if len(bases) == 0:
         raise ValueError("Must have at least one base specified")
     rich.print(f"Comparing to bases: {','.join(bases)}")
-    results = load_all_results(bases, results_dir)
-    rich.print(f"Found {len(results)} results")
-    save_generated_results(results, force=force)
+    all_results = load_all_results(bases, results_dir, archive=True)
+    # Archived results no longer have a directory to write derived results
+    # to, but they still appear on the plots
+    results = [r for r in all_results if not r.is_archived]
+    rich.print(
+        f"Found {len(results)} results "
+        f"(and {len(all_results) - len(results)} archived results)"
+    )
     benchmarking_results = [r for r in results if r.result_info[0] == "raw results"]
-    generate_indices(bases, results, benchmarking_results, repo_dir)
-    generate_directory_indices(benchmarking_results)
-
-    memory_benchmarking_results = filter_broken_memory_results(benchmarking_results)
+    plot_results = [r for r in all_results if r.result_info[0] == "raw results"]
 
-    for plot_func, args, kwargs in rich.progress.track(
-        [
-            (
-                plot.longitudinal_plot,
-                (benchmarking_results, repo_dir / "longitudinal.svg"),
-                {},
-            ),
-            (
-                plot.flag_effect_plot,
-                (benchmarking_results, repo_dir / "configs.svg"),
-                {},
-            ),
-            (
-                plot.longitudinal_plot,
-                (memory_benchmarking_results, repo_dir / "memory_long.svg"),
-                dict(
-                    getter=lambda r: r.memory_change_float,
-                    differences=("less", "more"),
-                    title="Memory usage change by major version",
-                ),
+    if incremental and not force:
+        changed_paths = set(Path(x).resolve() for x in changed)
+        affected = get_affected_results(results, changed_paths)
+        changed_filenames = [
+            r.filename for r in results if r.filename.resolve() in changed_paths
+        ]
+        rich.print(f"Found {len(affected)} new or changed results")
+        affected_ids = set(id(r) for r in affected)
+        missing_summaries = [
+            r
+            for r in get_results_missing_summaries(results)
+            if id(r) not in affected_ids
+        ]
+        if missing_summaries:
+            rich.print(f"Found {len(missing_summaries)} results without summaries")
+        failures = save_generated_results([*affected, *missing_summaries], jobs=jobs)
+        # Each directory index covers all of the results in that directory
+        affected_dirs = set(r.filename.parent for r in affected)
+        directory_results = [
+            r for r in benchmarking_results if r.filename.parent in affected_dirs
+        ]
+        # Only the results from the main CPython repo appear on the plots
+        affected_plot_results = [
+            r
+            for r in affected
+            if r.result_info[0] == "raw results" and r.fork == "python"
+        ]
+    else:
+        changed_filenames = []
+        failures = save_generated_results(results, force=force, jobs=jobs)
+        directory_results = benchmarking_results
+        affected_plot_results = plot_results
+
+    # The indices are always regenerated, since the summary in README.md
+    # depends on the current date. They are cheap to generate, since they only
+    # read the summary of each comparison.
+    generate_indices(bases, results, benchmarking_results, repo_dir)
+    generate_directory_indices(directory_results)
+    if plot.get_comparison_plot_format() == "data":
+        plot.install_viewer(repo_dir)
+
+    memory_plot_results = filter_broken_memory_results(plot_results)
+
+    plots = []
+    for get_plot_data, args, kwargs, needs_update in [
+        (
+            plot.get_longitudinal_data,
+            (plot_results, repo_dir / "longitudinal.svg"),
+            {},
+            bool(affected_plot_results),
+        ),
+        (
+            plot.get_flag_effect_data,
+            (plot_results, repo_dir / "configs.svg"),
+            {},
+            bool(affected_plot_results),
+        ),
+        (
+            plot.get_longitudinal_data,
+            (memory_plot_results, repo_dir / "memory_long.svg"),
+            dict(
+                metric="memory_change",
+                differences=("less", "more"),
+                title="Memory usage change by major version",
             ),
-            (
-                plot.flag_effect_plot,
-                (memory_benchmarking_results, repo_dir / "memory_configs.svg"),
-                dict(
-                    getter=lambda r: r.memory_change_float,
-                    differences=("less", "more"),
-                    title="Memory usage change by configuration",
-                ),
+            bool(filter_broken_memory_results(affected_plot_results)),
+        ),
+        (
+            plot.get_flag_effect_data,
+            (memory_plot_results, repo_dir / "memory_configs.svg"),
+            dict(
+                metric="memory_change",
+                differences=("less", "more"),
+                title="Memory usage change by configuration",
             ),
-        ],
-        description="Generating plots",
-    ):
-        plot_func(*args, **kwargs)  # type: ignore
+            bool(filter_broken_memory_results(affected_plot_results)),
+        ),
+    ]:
+        output_filename = args[1]
+        plot.remove_old_plot_cache(output_filename)
+        if needs_update or not output_filename.is_file():
+            plots.append((get_plot_data, args, kwargs))
+
+    with trend_store.TrendStore(trend_store.get_store_path(repo_dir)) as trends:
+        # Points for changed results are recomputed, and points for results
+        # that no longer exist (e.g. because they were purged) are dropped
+        trends.remove(changed_filenames)
+        trends.evict(plot_results)
+
+        # The data for all of the plots is gathered here, so each comparison
+        # is only computed once, even if it appears on more than one plot
+        plot_data = [
+            (get_plot_data(plot_results, trends, **kwargs), output_filename)
+            for get_plot_data, (plot_results, output_filename), kwargs in plots
+        ]
+
+    render_plots(plot_data, jobs=jobs)
+
+    if len(failures):
+        raise RuntimeError(f"Failed to generate {len(failures)} derived results")
 
 
 def main():
@@ -444,6 +787,29 @@ def main():
         action="store_true",
         help="Regenerate the comparison files, even if they already exist.",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="The number of worker processes used to generate comparison files.",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only regenerate the files that depend on new or changed results. "
+        "New results are detected automatically, but results that were "
+        "overwritten must be passed to --changed.",
+    )
+    parser.add_argument(
+        "--changed",
+        nargs="*",
+        type=Path,
+        default=[],
+        help="Results files that have changed since the last run. "
+        "Implies --incremental.",
+    )
 
     args = parser.parse_args()
 
@@ -451,7 +817,13 @@ def main():
         rich.print(f"[red]{args.repo_dir} is not a directory.[/red]")
         sys.exit(1)
 
-    _main(args.repo_dir, force=args.force)
+    _main(
+        args.repo_dir,
+        force=args.force,
+        jobs=args.jobs,
+        incremental=args.incremental or len(args.changed) > 0,
+        changed=args.changed,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+"""
+Compare the Linux perf profiling results of two runs, showing where the time
+went between them.
+"""
+
+from __future__ import annotations
+
+
+import argparse
+from collections import defaultdict
+import concurrent.futures
+import multiprocessing
+from pathlib import Path
+from typing import IO, Mapping
+
+
+from matplotlib import pyplot as plt
+import numpy as np
+import rich_argparse
+
+
+from bench_runner.scripts import profiling_plot
+from bench_runner.util import PathLike
+
+
+# Changes in self-time share smaller than this aren't listed in the tables
+THRESHOLD = 0.0025
+
+# The maximum number of symbols listed in the aggregate table
+MAX_SYMBOLS = 50
+
+
+class Profile:
+    """
+    The share of self time spent in each category and symbol, for each
+    benchmark in a directory of perf CSV files.
+    """
+
+    def __init__(self, input_dir: PathLike, jobs: int | None = None):
+        csv_paths = profiling_plot.get_csv_paths(input_dir)
+
+        self.categories: dict[str, defaultdict[str, float]] = {}
+        self.symbols: dict[str, defaultdict[tuple[str, str], float]] = {}
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            for csv_path, (total, rows) in zip(
+                csv_paths, executor.map(profiling_plot.load_benchmark, csv_paths)
+            ):
+                if total <= 0.0:
+                    continue
+                stem = profiling_plot.get_benchmark_name(csv_path)
+                categories = self.categories[stem] = defaultdict(float)
+                symbols = self.symbols[stem] = defaultdict(float)
+                for self_time, obj, sym in rows:
+                    if self_time <= 0.0:
+                        break
+                    share = self_time / total
+                    categories[profiling_plot.category_for_obj_sym(obj, sym)] += share
+                    symbols[(obj, sym)] += share
+
+    @property
+    def benchmarks(self) -> list[str]:
+        return list(self.categories.keys())
+
+
+def _mean_shares(
+    shares: Mapping[str, Mapping], benchmarks: list[str]
+) -> defaultdict[object, float]:
+    """
+    The share of each key, averaged over the benchmarks, so that each
+    benchmark has the same weight regardless of how long it ran.
+    """
+    result = defaultdict(float)
+    for benchmark in benchmarks:
+        for key, share in shares[benchmark].items():
+            result[key] += share / len(benchmarks)
+    return result
+
+
+def _get_deltas(
+    base: Mapping, head: Mapping
+) -> list[tuple[float, float, float, object]]:
+    """
+    Align the keys of two sets of shares, returning (delta, base, head, key)
+    for each key, sorted by the absolute size of the change.
+    """
+    return sorted(
+        (
+            (
+                head.get(key, 0.0) - base.get(key, 0.0),
+                base.get(key, 0.0),
+                head.get(key, 0.0),
+                key,
+            )
+            for key in set(base) | set(head)
+        ),
+        key=lambda x: (-abs(x[0]), str(x[3])),
+    )
+
+
+def _format_delta(delta: float) -> str:
+    return f"{delta * 100:+.2f} pp"
+
+
+def write_markdown(
+    md: IO[str], base: Profile, head: Profile, benchmarks: list[str]
+) -> None:
+    md.write("# Profiling differences\n\n")
+    md.write(
+        "Changes are in percentage points (pp) of the self time of each "
+        "benchmark. Aggregate values are the mean over all benchmarks.\n"
+    )
+
+    for name, profile in (("base", base), ("head", head)):
+        missing = sorted(set(profile.benchmarks) - set(benchmarks))
+        if missing:
+            md.write(f"\nOnly in {name} ({len(missing)}): {', '.join(missing)}\n")
+
+    md.write("\n## Categories\n\n")
+    md.write("| category | base | head | change |\n")
+    md.write("| :--- | ---: | ---: | ---: |\n")
+    for delta, base_share, head_share, category in _get_deltas(
+        _mean_shares(base.categories, benchmarks),
+        _mean_shares(head.categories, benchmarks),
+    ):
+        md.write(
+            f"| {category} | {base_share:.2%} | {head_share:.2%} | "
+            f"{_format_delta(delta)} |\n"
+        )
+
+    md.write("\n## Symbols\n\n")
+    md.write("| object | symbol | category | base | head | change |\n")
+    md.write("| :--- | :--- | :--- | ---: | ---: | ---: |\n")
+    deltas = _get_deltas(
+        _mean_shares(base.symbols, benchmarks), _mean_shares(head.symbols, benchmarks)
+    )
+    for delta, base_share, head_share, (obj, sym) in deltas[:MAX_SYMBOLS]:
+        if abs(delta) < THRESHOLD:
+            break
+        category = profiling_plot.category_for_obj_sym(obj, sym)
+        md.write(
+            f"| `{obj}` | `{sym}` | {category} | {base_share:.2%} | "
+            f"{head_share:.2%} | {_format_delta(delta)} |\n"
+        )
+
+    md.write("\n## Benchmarks\n")
+    for benchmark in benchmarks:
+        md.write(f"\n### {benchmark}\n\n")
+        md.write("| category | base | head | change |\n")
+        md.write("| :--- | ---: | ---: | ---: |\n")
+        for delta, base_share, head_share, category in _get_deltas(
+            base.categories[benchmark], head.categories[benchmark]
+        ):
+            if abs(delta) < THRESHOLD:
+                break
+            md.write(
+                f"| {category} | {base_share:.2%} | {head_share:.2%} | "
+                f"{_format_delta(delta)} |\n"
+            )
+
+
+def plot_diverging_bargraph(
+    base: Profile, head: Profile, benchmarks: list[str], output_filename: PathLike
+) -> None:
+    """
+    Plot the change in the share of each category, for each benchmark and
+    overall. Categories that take more time in head are to the right.
+    """
+    names = ["(mean)", *benchmarks][::-1]
+    base_shares = {
+        "(mean)": _mean_shares(base.categories, benchmarks),
+        **{x: base.categories[x] for x in benchmarks},
+    }
+    head_shares = {
+        "(mean)": _mean_shares(head.categories, benchmarks),
+        **{x: head.categories[x] for x in benchmarks},
+    }
+    categories = [
+        category
+        for category in profiling_plot.COLOR_ORDER + ["unknown"]
+        if any(
+            base_shares[name].get(category, 0.0) or head_shares[name].get(category, 0.0)
+            for name in names
+        )
+    ]
+
+    fig, ax = plt.subplots(figsize=(8, max(len(names) * 0.3, 2)), layout="constrained")
+
+    # Increases are stacked to the right of zero, and decreases to the left
+    right = np.zeros(len(names))
+    left = np.zeros(len(names))
+    for category in categories:
+        deltas = np.array(
+            [
+                head_shares[name].get(category, 0.0)
+                - base_shares[name].get(category, 0.0)
+                for name in names
+            ],
+            np.float64,
+        )
+        starts = np.where(deltas >= 0.0, right, left)
+        color, hatch = profiling_plot.get_color_and_hatch(category)
+        ax.barh(
+            names,
+            deltas,
+            0.5,
+            label=category,
+            left=starts,
+            hatch=hatch,
+            color=color,
+        )
+        right += np.maximum(deltas, 0.0)
+        left += np.minimum(deltas, 0.0)
+
+    ax.axvline(0.0, color="black", linewidth=0.5)
+    ax.set_xlabel("change in share of self time (head - base)")
+    ax.xaxis.set_major_formatter(lambda x, _: f"{x * 100:+.0f} pp")
+    ax.legend(bbox_to_anchor=(1.05, 1.0), loc="upper left")
+
+    fig.savefig(output_filename)
+    plt.close(fig)
+
+
+def _main(
+    base_dir: PathLike,
+    head_dir: PathLike,
+    output_prefix: PathLike,
+    jobs: int | None = None,
+):
+    output_prefix = Path(output_prefix)
+
+    base = Profile(base_dir, jobs=jobs)
+    head = Profile(head_dir, jobs=jobs)
+
+    benchmarks = [x for x in base.benchmarks if x in head.categories]
+    if not benchmarks:
+        print("No benchmarks with profiling data in both directories. Skipping.")
+        return
+
+    with output_prefix.with_suffix(".md").open("w") as md:
+        write_markdown(md, base, head, benchmarks)
+
+    plot_diverging_bargraph(base, head, benchmarks, output_prefix.with_suffix(".svg"))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the profiling information of two runs",
+        formatter_class=rich_argparse.ArgumentDefaultsRichHelpFormatter,
+    )
+
+    parser.add_argument(
+        "base_dir",
+        type=Path,
+        help="The location of the .csv files of profiling data to compare against",
+    )
+    parser.add_argument(
+        "head_dir",
+        type=Path,
+        help="The location of the .csv files of profiling data to compare",
+    )
+    parser.add_argument(
+        "output",
+        type=Path,
+        help="The path and file prefix for the output files",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of benchmarks to process at once. "
+        "Defaults to the number of CPUs.",
+    )
+
+    args = parser.parse_args()
+
+    _main(args.base_dir, args.head_dir, args.output, jobs=args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,14 @@ from __future__ import annotations
 
 import argparse
 from collections import defaultdict
+import concurrent.futures
 import csv
 import functools
 import json
 from operator import itemgetter
 from pathlib import Path
 import re
-from typing import IO
+from typing import IO, Iterator
 
 
 from matplotlib import pyplot as plt
@@ -252,6 +253,25 @@ CATEGORIES: dict[str, list[str]] = {
     ],
 }
 
+# All of the CATEGORIES in a single regular expression, with a group for each
+# category. Alternatives are tried in order, so the first matching pattern
+# wins, just like matching each of them in turn.
+_CATEGORY_NAMES = list(CATEGORIES.keys())
+_CATEGORY_REGEX = re.compile(
+    "|".join(
+        f"(?P<c{i}>{'|'.join(f'(?:{pattern})' for pattern in patterns)})"
+        for i, patterns in enumerate(CATEGORIES.values())
+    )
+)
+
+_LIBRARY_REGEX = re.compile(r".+\.so(\..+)?")
+
+# `python` processes that have symbols coming from a shared object
+# called pythonX.XX or libpythonX.XX.so are from the orchestrating
+# Python, not the one under benchmarking, so they should be skipped.
+_TAINTED_OBJ_REGEX = re.compile(r"python[0-9]+\.[0-9]+|libpython[0-9]+\.[0-9]+\.so")
+
+
 COLOR_ORDER = ["jit", "kernel", "libc", "library"] + list(CATEGORIES.keys())
 
 
@@ -276,70 +296,72 @@ def category_for_obj_sym(obj: str, sym: str) -> str:
     if obj == "[JIT]":
         return "jit"
 
-    if re.match(r".+\.so(\..+)?$", obj):
+    if _LIBRARY_REGEX.fullmatch(obj):
         return "library"
 
     if obj == "python":
-        for category, patterns in CATEGORIES.items():
-            for pattern in patterns:
-                if re.match(f"^{pattern}$", sym.split()[0].split(".")[0]):
-                    return category
+        if match := _CATEGORY_REGEX.fullmatch(sym.split()[0].split(".")[0]):
+            assert match.lastgroup is not None  # for pyright
+            return _CATEGORY_NAMES[int(match.lastgroup[1:])]
 
     return "unknown"
 
 
-def handle_benchmark(
-    csv_path: PathLike,
-    md: IO[str],
-    results: defaultdict[str, defaultdict[str, float]],
-    categories: defaultdict[str, defaultdict[tuple[str, str], float]],
-) -> float:
-    csv_path = Path(csv_path)
-
-    stem = csv_path.stem.split(".", 1)[0]
-
-    md.write(f"\n## {stem}\n\n")
-    md.write("| percentage | object | symbol | category |\n")
-    md.write("| ---: | :--- | :--- | :--- |\n")
+def load_benchmark(csv_path: PathLike) -> tuple[float, list[tuple[float, str, str]]]:
+    """
+    Read the perf CSV file for a single benchmark.
 
-    # `python` processes that have symbols coming from a shared object
-    # called pythonX.XX or libpythonX.XX.so are from the orchestrating
-    # Python, not the one under benchmarking, so they should be skipped.
+    Returns the total self time, and the self time of each (object, symbol),
+    sorted from highest to lowest.
+    """
+    # The self time of each (obj, sym) is kept per-pid, so the processes that
+    # turn out to be tainted can be removed at the end, in a single pass.
+    times_by_pid: defaultdict[str, defaultdict[tuple[str, str], float]] = defaultdict(
+        lambda: defaultdict(float)
+    )
     tainted_pids = set()
-    with csv_path.open(newline="") as fd:
-        csvreader = csv.reader(fd)
-        for _ in csvreader:
-            break
-
-        for self_time, pid, _, obj, _ in csvreader:
-            if re.match(r"python[0-9]+\.[0-9]+", obj) or re.match(
-                r"libpython[0-9]+\.[0-9]+\.so", obj
-            ):
-                tainted_pids.add(pid)
-
-    times = defaultdict(float)
-    total = 0.0
-    with csv_path.open(newline="") as fd:
+    with Path(csv_path).open(newline="") as fd:
         csvreader = csv.reader(fd)
         for _ in csvreader:
             break
 
         for self_time, pid, command, obj, sym in csvreader:
-            if pid in tainted_pids:
-                continue
+            if _TAINTED_OBJ_REGEX.match(obj):
+                tainted_pids.add(pid)
 
-            if command != "python":
+            if command != "python" or pid in tainted_pids:
                 continue
 
-            self_time = float(self_time)
             if obj == "[JIT]":
-                times[("[JIT]", "jit")] += self_time
+                times_by_pid[pid][("[JIT]", "jit")] += float(self_time)
             else:
-                times[(obj, sym)] += self_time
+                times_by_pid[pid][(obj, sym)] += float(self_time)
+
+    times = defaultdict(float)
+    total = 0.0
+    for pid, pid_times in times_by_pid.items():
+        if pid in tainted_pids:
+            continue
+        for key, self_time in pid_times.items():
+            times[key] += self_time
             total += self_time
 
+    return total, sorted(((v, *k) for k, v in times.items()), reverse=True)
+
+
+def write_benchmark(
+    stem: str,
+    total: float,
+    rows: list[tuple[float, str, str]],
+    md: IO[str],
+    results: defaultdict[str, defaultdict[str, float]],
+    categories: defaultdict[str, defaultdict[tuple[str, str], float]],
+) -> None:
+    md.write(f"\n## {stem}\n\n")
+    md.write("| percentage | object | symbol | category |\n")
+    md.write("| ---: | :--- | :--- | :--- |\n")
+
     scale = 1.0 / total
-    rows = sorted(((v, *k) for k, v in times.items()), reverse=True)
 
     for self_time, obj, sym in rows:
         if self_time <= 0.0:
@@ -354,6 +376,30 @@ def handle_benchmark(
         if scaled_time >= 0.0025:
             md.write(f"| {scaled_time:.2%} | `{obj}` | `{sym}` | {category} |\n")
 
+
+def get_benchmark_name(csv_path: PathLike) -> str:
+    return Path(csv_path).stem.split(".", 1)[0]
+
+
+def get_csv_paths(input_dir: PathLike) -> list[Path]:
+    """
+    Get the perf CSV file for each benchmark in the directory.
+    """
+    return [
+        csv_path
+        for csv_path in sorted(Path(input_dir).glob("*.csv"))
+        if ".tail_calls.csv" not in csv_path.name
+    ]
+
+
+def handle_benchmark(
+    csv_path: PathLike,
+    md: IO[str],
+    results: defaultdict[str, defaultdict[str, float]],
+    categories: defaultdict[str, defaultdict[tuple[str, str], float]],
+) -> float:
+    total, rows = load_benchmark(csv_path)
+    write_benchmark(get_benchmark_name(csv_path), total, rows, md, results, categories)
     return total
 
 
@@ -480,7 +526,26 @@ def handle_tail_call_stats(
             )
 
 
-def _main(input_dir: PathLike, output_prefix: PathLike):
+def load_benchmarks(
+    csv_paths: list[Path], jobs: int | None = None
+) -> Iterator[tuple[float, list[tuple[float, str, str]]]]:
+    """
+    Read the perf CSV file of each benchmark, in `jobs` processes (by default,
+    one per CPU).
+
+    The files may be read in parallel, but the results are in the same order
+    as `csv_paths`, so the output doesn't depend on the scheduling.
+    """
+    if jobs == 1 or len(csv_paths) < 2:
+        yield from map(load_benchmark, csv_paths)
+        return
+
+    # The workers only parse CSV files, so the default start method is fine
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(load_benchmark, csv_paths)
+
+
+def _main(input_dir: PathLike, output_prefix: PathLike, jobs: int | None = None):
     input_dir = Path(input_dir)
     output_prefix = Path(output_prefix)
 
@@ -491,12 +556,22 @@ def _main(input_dir: PathLike, output_prefix: PathLike):
         print("No profiling data. Skipping.")
         return
 
+    csv_paths = get_csv_paths(input_dir)
+
     total = 0.0
     with output_prefix.with_suffix(".md").open("w") as md:
-        for csv_path in sorted(input_dir.glob("*.csv")):
-            if ".tail_calls.csv" in csv_path.name:
-                continue
-            total += handle_benchmark(csv_path, md, results, categories)
+        for csv_path, (benchmark_total, rows) in zip(
+            csv_paths, load_benchmarks(csv_paths, jobs)
+        ):
+            write_benchmark(
+                get_benchmark_name(csv_path),
+                benchmark_total,
+                rows,
+                md,
+                results,
+                categories,
+            )
+            total += benchmark_total
 
         sorted_categories = sorted(
             [(sum(val.values()), key) for (key, val) in categories.items()],
@@ -542,10 +617,18 @@ def main():
         default=Path(),
         help="The path and file prefix for the output files",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of benchmarks to process at once. "
+        "Defaults to the number of CPUs.",
+    )
 
     args = parser.parse_args()
 
-    _main(args.input_dir, args.output)
+    _main(args.input_dir, args.output, jobs=args.jobs)
 
 
 if __name__ == "__main__":
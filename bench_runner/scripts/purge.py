@@ -18,6 +18,7 @@ import rich_argparse
 
 from bench_runner.bases import get_bases, get_minimum_version_for_all_comparisons
 from bench_runner.result import load_all_results
+from bench_runner import results_archive
 from bench_runner.scripts.generate_results import _main as generate_results
 from bench_runner.util import PathLike
 
@@ -32,7 +33,11 @@ def dir_size(path: PathLike) -> int:
 
 
 def _main(
-    repo_dir: PathLike, days: int, dry_run: bool, bases: Sequence[str] | None = None
+    repo_dir: PathLike,
+    days: int,
+    dry_run: bool,
+    bases: Sequence[str] | None = None,
+    archive: bool = False,
 ):
     results_dir = Path(repo_dir) / "results"
     if bases is None:
@@ -77,6 +82,19 @@ def _main(
     )
     rich.print(f"Removing {len(remove_generated_files)} comparison files")
 
+    if archive:
+        archived = [
+            result
+            for result in results
+            if result.result_info[0] == "raw results"
+            and result.filename.parent not in keep_dirs
+        ]
+        rich.print(f"Archiving {len(archived)} results")
+        if not dry_run:
+            results_archive.append(
+                results_dir, rich.progress.track(archived, "Archiving results")
+            )
+
     total = 0
     for d in rich.progress.track(all_dirs, "Removing directories"):
         if d not in keep_dirs:
@@ -123,6 +141,12 @@ def main():
         help="The number of days to retain",
     )
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Add the removed results to the results archive, so they still "
+        "appear on the longitudinal plots",
+    )
 
     args = parser.parse_args()
 
@@ -130,7 +154,7 @@ def main():
         print(f"{args.repo_dir} is not a directory.", file=sys.stderr)
         sys.exit(1)
 
-    _main(args.repo_dir, args.days, args.dry_run)
+    _main(args.repo_dir, args.days, args.dry_run, archive=args.archive)
 
 
 if __name__ == "__main__":
@@ -12,8 +12,10 @@ import rich.progress
 import rich_argparse
 
 
+from bench_runner import changepoints
 from bench_runner import result
 from bench_runner.scripts import generate_results
+from bench_runner import trend_store
 from bench_runner.util import PathLike
 
 
@@ -42,15 +44,22 @@ def remove_benchmark(
             json.dump(data, fd, indent=2)
 
 
-def _main(benchmarks: Sequence[str], keep_hash: Sequence[str], dry_run: bool = False):
+def _main(
+    benchmarks: Sequence[str],
+    keep_hash: Sequence[str],
+    dry_run: bool = False,
+    jobs: int = 1,
+):
     rich.print(f"Removing benchmarks {', '.join(benchmarks)} from all results")
 
     keep_hash_set = set(keep_hash)
     benchmarks_set = set(benchmarks)
 
     if not dry_run:
-        if Path("longitudinal.json").is_file():
-            Path("longitudinal.json").unlink()
+        # Every point in the trend store, and so every change point, depends
+        # on the removed benchmarks
+        trend_store.get_store_path(Path()).unlink(missing_ok=True)
+        changepoints.get_state_path(Path()).unlink(missing_ok=True)
 
     for filename in rich.progress.track(
         list(Path("results").glob("**/*")), description="Deleting results"
@@ -65,7 +74,7 @@ def _main(benchmarks: Sequence[str], keep_hash: Sequence[str], dry_run: bool = F
     rich.print("Regenerating all derived results. This will take quite some time...")
 
     if not dry_run:
-        generate_results._main(Path(), force=True)
+        generate_results._main(Path(), force=True, jobs=jobs)
 
 
 def main():
@@ -86,6 +95,13 @@ def main():
         "--dry-run",
         action="store_true",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="The number of worker processes used to regenerate derived results.",
+    )
 
     args = parser.parse_args()
 
@@ -94,7 +110,7 @@ def main():
     else:
         keep_hash = args.keep_hash
 
-    _main(args.benchmark, keep_hash, args.dry_run)
+    _main(args.benchmark, keep_hash, args.dry_run, args.jobs)
 
 
 if __name__ == "__main__":
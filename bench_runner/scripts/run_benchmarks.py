@@ -2,6 +2,7 @@ from __future__ import annotations
 
 
 import argparse
+import concurrent.futures
 import csv
 import json
 import os
@@ -12,7 +13,7 @@ import subprocess
 import sys
 import tempfile
 import textwrap
-from typing import Iterable
+from typing import Iterable, Sequence
 
 
 import rich_argparse
@@ -29,6 +30,10 @@ from bench_runner.util import PathLike
 REPO_ROOT = Path()
 BENCHMARK_JSON = REPO_ROOT / "benchmark.json"
 PROFILING_RESULTS = REPO_ROOT / "profiling" / "results"
+# Where CPython writes its stats. This is hardcoded in CPython.
+PYSTATS_DIR = Path("/tmp/py_stats")
+# Where the stats for each benchmark are kept until all benchmarks have run
+PYSTATS_WORK_DIR = REPO_ROOT / "pystats_work"
 GITHUB_URL = "https://github.com/" + os.environ.get(
     "GITHUB_REPOSITORY", "faster-cpython/bench_runner"
 )
@@ -68,12 +73,15 @@ def run_benchmarks(
     /,
     test_mode: bool = False,
     extra_args: list[str] | None = None,
+    output: PathLike = BENCHMARK_JSON,
+    command_prefix: Sequence[str] = (),
 ) -> None:
     if benchmarks.strip() == "":
         benchmarks = "all"
 
-    if BENCHMARK_JSON.is_file():
-        BENCHMARK_JSON.unlink()
+    output = Path(output)
+    if output.is_file():
+        output.unlink()
 
     if test_mode:
         fast_arg = ["--fast"]
@@ -91,13 +99,14 @@ def run_benchmarks(
         extra_args.append(f"--affinity={affinity}")
 
     args = [
+        *command_prefix,
         sys.executable,
         "-m",
         "pyperformance",
         "run",
         *fast_arg,
         "-o",
-        BENCHMARK_JSON,
+        output,
         "--manifest",
         "benchmarks.manifest",
         "--benchmarks",
@@ -116,16 +125,129 @@ def run_benchmarks(
     # pyperformance frequently returns an error if any of the benchmarks failed.
     # We only want to fail if things are worse than that.
 
-    if not BENCHMARK_JSON.is_file():
-        raise NoBenchmarkError(
-            f"No benchmark file created at {BENCHMARK_JSON.resolve()}."
-        )
-    with BENCHMARK_JSON.open() as fd:
+    if not output.is_file():
+        raise NoBenchmarkError(f"No benchmark file created at {output.resolve()}.")
+    with output.open() as fd:
         contents = json.load(fd)
     if len(contents.get("benchmarks", [])) == 0:
         raise NoBenchmarkError("No benchmarks were run.")
 
 
+def _get_pystats_isolation_prefix(stats_dir: PathLike) -> list[str]:
+    """
+    Get a command prefix that runs a command in a private mount namespace,
+    with `stats_dir` mounted over the directory that CPython writes its stats
+    to, so that many benchmarks can collect stats at the same time.
+    """
+    return [
+        "unshare",
+        "--user",
+        "--map-root-user",
+        "--mount",
+        "sh",
+        "-c",
+        'mount --bind "$0" "$1" && shift && exec "$@"',
+        str(Path(stats_dir).resolve()),
+        str(PYSTATS_DIR),
+    ]
+
+
+def _can_isolate_pystats() -> bool:
+    """
+    Unprivileged mount namespaces are only available on some Linux systems.
+    """
+    if not sys.platform.startswith("linux") or shutil.which("unshare") is None:
+        return False
+    with tempfile.TemporaryDirectory() as tempdir:
+        return (
+            subprocess.call(
+                [*_get_pystats_isolation_prefix(tempdir), "true"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            == 0
+        )
+
+
+def _create_pyperformance_venv(python: PathLike, benchmarks: Iterable[str]) -> None:
+    """
+    Create the pyperformance virtual environment with the requirements of all
+    of the benchmarks up front, so that concurrent runs don't race to create
+    it.
+    """
+    subprocess.check_call(
+        [
+            sys.executable,
+            "-m",
+            "pyperformance",
+            "venv",
+            "create",
+            "--manifest",
+            "benchmarks.manifest",
+            "--benchmarks",
+            ",".join(benchmarks),
+            "--python",
+            python,
+        ]
+    )
+
+
+def _move_stats(src: Path, dst: Path) -> None:
+    # The work directory is usually on a different filesystem than /tmp
+    for filename in src.iterdir():
+        shutil.move(filename, dst / filename.name)
+
+
+def _copy_stats(srcs: Iterable[Path], dst: Path) -> None:
+    for filename in dst.glob("*"):
+        filename.unlink()
+    for src in srcs:
+        for filename in src.iterdir():
+            shutil.copyfile(filename, dst / filename.name)
+
+
+def _collect_benchmark_pystats(
+    python: PathLike, benchmark: str, extra_args: list[str], isolate: bool
+) -> bool:
+    """
+    Collect the stats for a single benchmark into its own directory in
+    PYSTATS_WORK_DIR. Returns True if the benchmark ran successfully.
+    """
+    work_dir = PYSTATS_WORK_DIR / benchmark
+    # Remove anything left behind by an interrupted run
+    if work_dir.exists():
+        shutil.rmtree(work_dir)
+    stats_dir = work_dir / "stats"
+    stats_dir.mkdir(parents=True)
+
+    try:
+        run_benchmarks(
+            python,
+            benchmark,
+            extra_args=list(extra_args),
+            output=work_dir / "benchmark.json",
+            command_prefix=_get_pystats_isolation_prefix(stats_dir) if isolate else (),
+        )
+    except NoBenchmarkError:
+        success = False
+    else:
+        success = True
+
+    if not isolate:
+        _move_stats(PYSTATS_DIR, stats_dir)
+
+    # Written last, so the benchmark is only skipped on resume if it finished
+    (work_dir / "status").write_text(success and "ok" or "failed")
+    return success
+
+
+def _get_completed_pystats(benchmark: str) -> bool | None:
+    status = PYSTATS_WORK_DIR / benchmark / "status"
+    if not status.is_file():
+        return None
+    return status.read_text() == "ok"
+
+
 def collect_pystats(
     python: PathLike,
     benchmarks: str,
@@ -133,9 +255,20 @@ def collect_pystats(
     ref: str,
     individual: bool,
     flags: Iterable[str] | None = None,
+    jobs: int = 1,
 ) -> None:
-    pystats_dir = Path("/tmp/py_stats")
+    """
+    Collect pystats for each of the benchmarks.
+
+    The stats for each benchmark are collected in their own directory in
+    PYSTATS_WORK_DIR, so if the run is interrupted, running it again with the
+    same arguments only runs the benchmarks that didn't finish.
 
+    If `jobs` is greater than 1, that many benchmarks are run at once. Since
+    CPython always writes its stats to the same directory, this requires
+    running each benchmark in its own mount namespace, which is only possible
+    on some Linux systems. Otherwise, the benchmarks are run one at a time.
+    """
     all_benchmarks = get_benchmark_names(benchmarks)
 
     # Default to loops.json if not explicitly set, like before the
@@ -147,39 +280,99 @@ def collect_pystats(
 
     if flags is None:
         flags = []
+    flags = list(flags)
+
+    # Only resume a run with exactly the same arguments
+    run_info = json.dumps(
+        {
+            "python": str(python),
+            "fork": fork,
+            "ref": ref,
+            "benchmarks": all_benchmarks,
+            "flags": flags,
+        }
+    )
+    run_info_path = PYSTATS_WORK_DIR / "run.json"
+    if PYSTATS_WORK_DIR.is_dir() and (
+        not run_info_path.is_file() or run_info_path.read_text() != run_info
+    ):
+        shutil.rmtree(PYSTATS_WORK_DIR)
+    PYSTATS_WORK_DIR.mkdir(parents=True, exist_ok=True)
+    run_info_path.write_text(run_info)
 
     # Clear all files in /tmp/py_stats. The _pystats.yml workflow already
     # does this, but this helps when running and testing things locally.
-    for filename in pystats_dir.glob("*"):
+    PYSTATS_DIR.mkdir(parents=True, exist_ok=True)
+    for filename in PYSTATS_DIR.glob("*"):
         filename.unlink()
 
-    # We could technically run each benchmark in parallel (since we don't care
-    # about performance timings), however, since the stats are written to the
-    # same directory, they would get intertwined. At some point, specifying an
-    # output directory for stats might make sense for this.
+    remaining = [
+        benchmark
+        for benchmark in all_benchmarks
+        if _get_completed_pystats(benchmark) is None
+    ]
+    if len(remaining) < len(all_benchmarks):
+        print(
+            f"Resuming: {len(all_benchmarks) - len(remaining)} of "
+            f"{len(all_benchmarks)} benchmarks already have stats"
+        )
 
-    with tempfile.TemporaryDirectory() as tempdir:
-        for benchmark in all_benchmarks:
-            try:
-                run_benchmarks(python, benchmark, extra_args=extra_args)
-            except NoBenchmarkError:
+    if jobs > 1 and not _can_isolate_pystats():
+        print(
+            "Can not isolate the stats of each benchmark on this system, "
+            "so running benchmarks one at a time",
+            file=sys.stderr,
+        )
+        jobs = 1
+
+    if jobs > 1 and remaining:
+        _create_pyperformance_venv(python, remaining)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            for _ in executor.map(
+                lambda benchmark: _collect_benchmark_pystats(
+                    python, benchmark, extra_args, True
+                ),
+                remaining,
+            ):
                 pass
-            else:
-                if individual:
-                    run_summarize_stats(python, fork, ref, benchmark, flags=flags)
+    else:
+        for benchmark in remaining:
+            _collect_benchmark_pystats(python, benchmark, extra_args, False)
+
+    completed = [
+        benchmark for benchmark in all_benchmarks if _get_completed_pystats(benchmark)
+    ]
 
-            for filename in pystats_dir.iterdir():
-                os.rename(filename, Path(tempdir) / filename.name)
+    # The stats are copied (rather than moved) into /tmp/py_stats, so nothing
+    # is lost if summarizing them is interrupted.
+    if individual:
+        for benchmark in completed:
+            _copy_stats([PYSTATS_WORK_DIR / benchmark / "stats"], PYSTATS_DIR)
+            run_summarize_stats(python, fork, ref, benchmark, flags=flags)
+
+    # Like the individual benchmarks, the summary of all of them includes the
+    # stats of benchmarks that failed partway through.
+    _copy_stats(
+        (
+            PYSTATS_WORK_DIR / benchmark / "stats"
+            for benchmark in all_benchmarks
+            if _get_completed_pystats(benchmark) is not None
+        ),
+        PYSTATS_DIR,
+    )
 
-        for filename in Path(tempdir).iterdir():
-            os.rename(filename, pystats_dir / filename.name)
+    if individual:
+        benchmark_links = completed
+    else:
+        benchmark_links = []
 
-        if individual:
-            benchmark_links = all_benchmarks
-        else:
-            benchmark_links = []
+    run_summarize_stats(python, fork, ref, "all", benchmark_links, flags=flags)
+
+    shutil.rmtree(PYSTATS_WORK_DIR)
 
-        run_summarize_stats(python, fork, ref, "all", benchmark_links, flags=flags)
+
+# The key that perf report rows are aggregated on: (pid, command, shared_obj, symbol)
+PerfKey = tuple[str, str, str, str]
 
 
 def get_perf_lines(files: Iterable[PathLike]) -> Iterable[str]:
@@ -206,29 +399,67 @@ def get_perf_lines(files: Iterable[PathLike]) -> Iterable[str]:
         p.kill()
 
 
-def perf_to_csv(lines: Iterable[str], output: PathLike):
-    rows = []
+def aggregate_perf_lines(
+    lines: Iterable[str], totals: dict[PerfKey, float] | None = None
+) -> dict[PerfKey, float]:
+    """
+    Sum the self time of each (pid, command, shared_obj, symbol) in the output
+    of `perf report`, without keeping the individual rows around.
+    """
+    if totals is None:
+        totals = {}
     for line in lines:
         line = line.strip()
         if line.startswith("#") or line == "":
-            pass
-        else:
-            _, period, command, _, symbol, shared, _ = line.split(maxsplit=6)
+            continue
+        _, period, command, _, symbol, shared, _ = line.split(maxsplit=6)
+        period = float(period)
+        if period > 0.0:
             pid, command = command.split(":")
-            period = float(period)
-            if period > 0.0:
-                rows.append([period, pid, command, shared, symbol])
+            key = (pid, command, shared, symbol)
+            totals[key] = totals.get(key, 0.0) + period
+    return totals
 
-    rows.sort(key=itemgetter(0), reverse=True)
+
+def _aggregate_perf_file(filename: PathLike) -> dict[PerfKey, float]:
+    return aggregate_perf_lines(get_perf_lines([filename]))
+
+
+def write_perf_csv(totals: dict[PerfKey, float], output: PathLike) -> None:
+    rows = sorted(totals.items(), key=itemgetter(1), reverse=True)
 
     with Path(output).open("w") as fd:
         csvwriter = csv.writer(fd)
         csvwriter.writerow(["self", "pid", "command", "shared_obj", "symbol"])
-        for row in rows:
-            csvwriter.writerow(row)
+        for (pid, command, shared, symbol), period in rows:
+            csvwriter.writerow([period, pid, command, shared, symbol])
+
+
+def perf_to_csv(lines: Iterable[str], output: PathLike):
+    write_perf_csv(aggregate_perf_lines(lines), output)
+
+
+def perf_files_to_csv(
+    files: Iterable[PathLike], output: PathLike, jobs: int | None = None
+) -> None:
+    """
+    Run `perf report` on each of the perf.data files in a pool of `jobs`
+    worker processes, and write the combined self time of each symbol to a CSV
+    file.
+    """
+    files = list(files)
+    totals: dict[PerfKey, float] = {}
+    if len(files) == 1:
+        totals = _aggregate_perf_file(files[0])
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            for file_totals in executor.map(_aggregate_perf_file, files):
+                for key, period in file_totals.items():
+                    totals[key] = totals.get(key, 0.0) + period
+    write_perf_csv(totals, output)
 
 
-def collect_perf(python: PathLike, benchmarks: str):
+def collect_perf(python: PathLike, benchmarks: str, jobs: int | None = None):
     all_benchmarks = get_benchmark_names(benchmarks)
 
     if PROFILING_RESULTS.is_dir():
@@ -246,11 +477,10 @@ def collect_perf(python: PathLike, benchmarks: str):
             extra_args=["--hook", "perf_record"],
         )
 
-        fileiter = Path(".").glob(perf_data_glob)
-        if util.has_any_element(fileiter):
-            perf_to_csv(
-                get_perf_lines(fileiter),
-                PROFILING_RESULTS / f"{benchmark}.perf.csv",
+        files = sorted(Path(".").glob(perf_data_glob))
+        if files:
+            perf_files_to_csv(
+                files, PROFILING_RESULTS / f"{benchmark}.perf.csv", jobs=jobs
             )
         else:
             print(f"No perf.data files generated for {benchmark}", file=sys.stderr)
@@ -384,6 +614,7 @@ def _main(
     run_id: str | None,
     individual: bool,
     flags: Iterable[str],
+    jobs: int | None = None,
 ) -> None:
     benchmarks = select_benchmarks(benchmarks)
 
@@ -392,9 +623,11 @@ def _main(
         update_metadata(BENCHMARK_JSON, fork, ref, run_id=run_id)
         copy_to_directory(BENCHMARK_JSON, python, fork, ref, flags)
     elif mode == "perf":
-        collect_perf(python, benchmarks)
+        collect_perf(python, benchmarks, jobs=jobs)
     elif mode == "pystats":
-        collect_pystats(python, benchmarks, fork, ref, individual, flags)
+        collect_pystats(
+            python, benchmarks, fork, ref, individual, flags, jobs=jobs or 1
+        )
 
 
 def main():
@@ -429,6 +662,16 @@ def main():
         action="store_true",
         help="For pystats mode, collect stats for each individual benchmark",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="For pystats mode, the number of benchmarks to run at once "
+        "(default 1). This is only supported on Linux systems that allow "
+        "unprivileged mount namespaces. For perf mode, the number of perf.data "
+        "files to process at once (default: the number of CPUs).",
+    )
     args = parser.parse_args()
 
     if args.test_mode:
@@ -454,6 +697,7 @@ def main():
         args.run_id,
         args.individual,
         flags.parse_flags(args.flags),
+        jobs=args.jobs,
     )
 
 
@@ -36,7 +36,7 @@ def _main(
     # parts of our library.
     from bench_runner import flags as mflags
     from bench_runner import git
-    from bench_runner.result import has_result
+    from bench_runner.result import has_result, PLOT_DATA_SUFFIX, SUMMARY_SUFFIX
     from bench_runner import util
 
     flags = mflags.parse_flags(flag_str)
@@ -70,7 +70,9 @@ def _main(
     if force:
         if found_result is not None:
             for filepath in found_result.filename.parent.iterdir():
-                if filepath.suffix != ".json":
+                if filepath.suffix != ".json" or filepath.name.endswith(
+                    (SUMMARY_SUFFIX, PLOT_DATA_SUFFIX)
+                ):
                     git.remove(results_dir.parent, filepath)
         should_run = True
     else:
@@ -2,6 +2,7 @@
 Utilities to generate markdown tables.
 """
 
+import os
 from pathlib import Path
 from typing import Iterable, Sequence, TextIO
 from urllib.parse import quote
@@ -26,6 +27,38 @@ def output_table(
         output_row(row)
 
 
+def output_padded_table(
+    fd: TextIO, head: Sequence[str], rows: Sequence[Sequence[str]]
+) -> None:
+    """
+    Output a table in markdown format, with each column padded to the same
+    width and all but the first column centered. This matches the layout of
+    the tables generated by `pyperf compare_to --table-format md`.
+    """
+    widths = [len(col) for col in head]
+    for row in rows:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], len(cell))
+
+    def output_row(row):
+        fd.write(
+            "|" + "|".join(f" {cell.ljust(width)} " for cell, width in zip(row, widths))
+        )
+        fd.write("|\n")
+
+    output_row(head)
+    fd.write(
+        "|"
+        + "|".join(
+            "-" * (width + 2) if i == 0 else f":{'-' * width}:"
+            for i, width in enumerate(widths)
+        )
+        + "|\n"
+    )
+    for row in rows:
+        output_row(row)
+
+
 def replace_section(filename: PathLike, name: str, content: str) -> None:
     """
     Replace a table in a markdown file with the new content.
@@ -67,6 +100,21 @@ def md_link(text: str, link: str, root: PathLike | None = None) -> str:
     return f"[{text}]({link})"
 
 
+def md_viewer_link(text: str, data: PathLike, viewer: PathLike, root: PathLike) -> str:
+    """
+    Formats a Markdown link that opens a plot data file in the viewer. The link
+    is resolved relative to the given root, and the data file relative to the
+    viewer.
+    """
+    viewer = Path(viewer).resolve()
+    viewer_link = os.path.relpath(viewer, Path(root).parent.resolve())
+    data_link = os.path.relpath(Path(data).resolve(), viewer.parent)
+    return (
+        f"[{text}]({'/'.join(quote(x) for x in Path(viewer_link).parts)}"
+        f"?data={'/'.join(quote(x) for x in Path(data_link).parts)})"
+    )
+
+
 def link_to_hash(hash: str, fork: str) -> str:
     """
     Create a markdown link to a specific hash of a specific fork on GitHub.
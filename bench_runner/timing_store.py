@@ -0,0 +1,131 @@
+"""
+A columnar cache of the timing values in each raw results file.
+
+Getting the timings of a result otherwise requires parsing the whole pyperf
+JSON file and walking its `benchmarks → runs → values` structure. The store
+keeps the values of all of the benchmarks in a result concatenated in a single
+NumPy `.npy` file, alongside a small index of where each benchmark's values
+start and end. It is memory-mapped when loaded, so each benchmark's values are
+a zero-copy view into the file.
+
+Entries are keyed on the digest of the results file, so they are never stale.
+They are removed when the results index drops the file they were for.
+"""
+
+from __future__ import annotations
+
+
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Mapping
+
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+from . import util
+from .util import PathLike
+
+
+# Bump this whenever the layout of the store changes, to force a rebuild.
+SCHEMA_VERSION = 1
+
+STORE_DIRNAME = "timings"
+
+
+def get_store_dir(results_dir: PathLike) -> Path:
+    return util.get_cache_dir(results_dir) / STORE_DIRNAME
+
+
+def _get_paths(results_dir: PathLike, digest: str) -> tuple[Path, Path]:
+    root = get_store_dir(results_dir) / f"v{SCHEMA_VERSION}-{digest}"
+    return root.with_suffix(".npy"), root.with_suffix(".json")
+
+
+def load_data(contents: Mapping[str, Any]) -> dict[str, NDArray[np.float64]]:
+    """
+    Get the timing values of each benchmark from the contents of a pyperf JSON
+    file.
+    """
+    results = {}
+    for benchmark in contents["benchmarks"]:
+        name = benchmark.get("metadata", contents["metadata"])["name"]
+        values = []
+        for run in benchmark["runs"]:
+            values.extend(run.get("values", []))
+        results[name] = np.array(values, dtype=np.float64)
+    return results
+
+
+def _write_atomically(path: Path, write) -> None:
+    # Results may be loaded from many worker processes at once, so never
+    # expose a partially-written file.
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            write(fp)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def store(
+    results_dir: PathLike, digest: str, data: Mapping[str, NDArray[np.float64]]
+) -> None:
+    values_path, index_path = _get_paths(results_dir, digest)
+    values_path.parent.mkdir(parents=True, exist_ok=True)
+
+    names = list(data.keys())
+    offsets = [0]
+    for name in names:
+        offsets.append(offsets[-1] + len(data[name]))
+    if names:
+        values = np.concatenate([data[name] for name in names]).astype(np.float64)
+    else:
+        values = np.empty(0, dtype=np.float64)
+
+    _write_atomically(values_path, lambda fp: np.save(fp, values))
+    # The index is written last, so its existence means the entry is complete
+    _write_atomically(
+        index_path,
+        lambda fp: fp.write(
+            json.dumps({"names": names, "offsets": offsets}).encode("utf-8")
+        ),
+    )
+
+
+def remove(results_dir: PathLike, digest: str) -> None:
+    """
+    Remove the stored timing values for the results file with the given digest.
+    """
+    for path in _get_paths(results_dir, digest):
+        path.unlink(missing_ok=True)
+
+
+def load(results_dir: PathLike, digest: str) -> dict[str, NDArray[np.float64]] | None:
+    """
+    Get the stored timing values for the results file with the given digest,
+    or None if they haven't been stored.
+
+    The values are read-only views into a memory-mapped file.
+    """
+    values_path, index_path = _get_paths(results_dir, digest)
+    if not index_path.is_file() or not values_path.is_file():
+        return None
+    with index_path.open() as fd:
+        index = json.load(fd)
+    names = index["names"]
+    offsets = index["offsets"]
+    if offsets[-1] == 0:
+        # Empty files can't be memory-mapped
+        values = np.load(values_path)
+    else:
+        values = np.load(values_path, mmap_mode="r")
+    return {
+        name: values[start:end]
+        for name, start, end in zip(names, offsets[:-1], offsets[1:])
+    }
@@ -0,0 +1,268 @@
+"""
+A time series of the comparisons shown on the longitudinal plots.
+
+Each line of `trends.jsonl`, at the top of the results repository, is a single
+point: a result compared against a reference result, with the commit date,
+runner and configuration of the result, and the geometric mean, memory change
+and HPT values of the comparison. Points are computed once, and new points are
+appended to the end of the file, so it is cheap to keep up to date and easy
+for other tools to consume. Only the values that have been asked for are
+computed, since all but the geometric mean need the full comparison.
+
+Points are keyed on the paths of the two results (relative to the results
+directory) and the base, and are evicted when either result no longer exists.
+"""
+
+from __future__ import annotations
+
+
+import datetime
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Callable, Iterable
+
+
+from . import result as mod_result
+from .util import PathLike
+
+
+TRENDS_FILENAME = "trends.jsonl"
+
+# The values of each point that can be plotted
+METRICS = ("geometric_mean", "memory_change", "hpt_99")
+
+# How to compute each metric, along with any other values stored with it. Only
+# the geometric mean is cheap: the others need the full comparison table.
+_METRIC_VALUES: dict[
+    str, dict[str, Callable[[mod_result.BenchmarkComparison], Any]]
+] = {
+    "geometric_mean": {"geometric_mean": lambda c: c.geometric_mean_float},
+    "memory_change": {"memory_change": lambda c: c.memory_change_float},
+    "hpt_99": {
+        "hpt_reliability": lambda c: c.hpt_reliability,
+        "hpt_99": lambda c: c.hpt_percentile_float(99),
+    },
+}
+
+_MIN_DATETIME = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+
+def get_store_path(repo_dir: PathLike) -> Path:
+    return Path(repo_dir) / TRENDS_FILENAME
+
+
+def get_result_key(filename: PathLike) -> str:
+    """
+    The key of a results file in the store: its path relative to the results
+    directory.
+    """
+    filename = Path(filename)
+    return f"{filename.parent.name}/{filename.name}"
+
+
+def _parse_datetime(value: str) -> datetime.datetime | None:
+    """
+    Parse a commit date, which may be missing (e.g. "<unknown>") from some
+    results. Dates without a timezone are assumed to be in UTC.
+    """
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def _get_point_key(point: dict[str, Any]) -> tuple[str, str, str]:
+    return (point["ref"], point["head"], point["base"])
+
+
+def _make_point(
+    ref: mod_result.Result, head: mod_result.Result, base: str
+) -> dict[str, Any]:
+    return {
+        "ref": get_result_key(ref.filename),
+        "head": get_result_key(head.filename),
+        "base": base,
+        "runner": head.nickname,
+        "fork": head.fork,
+        "version": head.version,
+        "flags": head.flags,
+        "commit_datetime": head.commit_datetime,
+    }
+
+
+def _add_metrics(
+    point: dict[str, Any],
+    ref: mod_result.Result,
+    head: mod_result.Result,
+    metrics: Iterable[str],
+) -> bool:
+    """
+    Compute any of the given metrics that the point doesn't have yet.
+
+    Returns True if any were added.
+    """
+    missing = [metric for metric in metrics if metric not in point]
+    if not missing:
+        return False
+    compare = mod_result.BenchmarkComparison(ref, head, point["base"])
+    for metric in missing:
+        for key, get_value in _METRIC_VALUES[metric].items():
+            point[key] = get_value(compare)
+    compare.evict()
+    return True
+
+
+class TrendStore:
+    """
+    The points in a `trends.jsonl` file.
+
+    Use as a context manager, so that any changes are saved at the end.
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        self._points: dict[tuple[str, str, str], dict[str, Any]] = {}
+        # Points that only need to be appended to the file
+        self._new: list[dict[str, Any]] = []
+        # Whether points have been removed, so the file needs to be rewritten
+        self._dirty = False
+
+        if self.path.is_file():
+            with self.path.open(encoding="utf-8") as fd:
+                for line in fd:
+                    if line.strip():
+                        point = json.loads(line)
+                        self._points[_get_point_key(point)] = point
+
+    def __enter__(self) -> "TrendStore":
+        return self
+
+    def __exit__(self, *_args) -> None:
+        self.save()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def get(
+        self,
+        ref: mod_result.Result,
+        head: mod_result.Result,
+        base: str,
+        metrics: Iterable[str] = ("geometric_mean",),
+    ) -> dict[str, Any]:
+        """
+        Get the point comparing `head` to `ref`, with at least the given
+        metrics (from `METRICS`), computing them if they aren't already in
+        the store.
+        """
+        key = (get_result_key(ref.filename), get_result_key(head.filename), base)
+        point = self._points.get(key)
+        if point is None:
+            point = self._points[key] = _make_point(ref, head, base)
+            _add_metrics(point, ref, head, metrics)
+            self._new.append(point)
+        elif _add_metrics(point, ref, head, metrics):
+            # A point that is already in the file has changed
+            self._dirty = True
+        return point
+
+    def _remove_if(self, should_remove) -> int:
+        removed = [key for key, point in self._points.items() if should_remove(point)]
+        for key in removed:
+            del self._points[key]
+        if removed:
+            self._dirty = True
+        return len(removed)
+
+    def remove(self, filenames: Iterable[PathLike]) -> int:
+        """
+        Remove the points computed from any of the given results files, so
+        they are recomputed the next time they are needed.
+
+        Returns the number of points removed.
+        """
+        keys = set(get_result_key(x) for x in filenames)
+        return self._remove_if(
+            lambda point: point["ref"] in keys or point["head"] in keys
+        )
+
+    def evict(self, results: Iterable[mod_result.Result]) -> int:
+        """
+        Remove the points computed from results other than the given ones,
+        e.g. because they have been purged.
+
+        Returns the number of points removed.
+        """
+        keys = set(get_result_key(r.filename) for r in results)
+        return self._remove_if(
+            lambda point: point["ref"] not in keys or point["head"] not in keys
+        )
+
+    def query(
+        self,
+        start: datetime.datetime | None = None,
+        end: datetime.datetime | None = None,
+        runner: str | None = None,
+        base: str | None = None,
+        flags: Iterable[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Get the points whose commit date is in the range [start, end), and
+        that match any of the other given criteria, sorted by commit date.
+
+        `start` and `end` are assumed to be in UTC if they don't have a
+        timezone. Points without a valid commit date are only included if
+        neither is given, and are sorted last.
+        """
+        if flags is not None:
+            flags = sorted(flags)
+        if start is not None and start.tzinfo is None:
+            start = start.replace(tzinfo=datetime.timezone.utc)
+        if end is not None and end.tzinfo is None:
+            end = end.replace(tzinfo=datetime.timezone.utc)
+
+        points = []
+        for point in self._points.values():
+            commit_datetime = _parse_datetime(point["commit_datetime"])
+            if commit_datetime is None:
+                if start is not None or end is not None:
+                    continue
+            elif (start is not None and commit_datetime < start) or (
+                end is not None and commit_datetime >= end
+            ):
+                continue
+            if (
+                (runner is None or point["runner"] == runner)
+                and (base is None or point["base"] == base)
+                and (flags is None or point["flags"] == flags)
+            ):
+                points.append((commit_datetime, point))
+        points.sort(key=lambda x: (x[0] is None, x[0] or _MIN_DATETIME))
+        return [point for _, point in points]
+
+    def save(self) -> None:
+        if self._dirty:
+            # Rewrite the whole file, atomically, in a stable order
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".jsonl")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                    for key in sorted(self._points.keys()):
+                        fp.write(json.dumps(self._points[key]))
+                        fp.write("\n")
+                os.replace(tmp_name, self.path)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+        elif self._new:
+            with self.path.open("a", encoding="utf-8") as fp:
+                for point in self._new:
+                    fp.write(json.dumps(point))
+                    fp.write("\n")
+        self._new = []
+        self._dirty = False
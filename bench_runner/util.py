@@ -1,9 +1,12 @@
 import functools
 import hashlib
+import importlib.metadata
 import itertools
+import json
 import os
 from pathlib import Path
-from typing import TypeAlias, Union
+import re
+from typing import Any, TypeAlias, Union
 
 
 from . import config
@@ -19,13 +22,52 @@ def get_benchmark_hash() -> str:
     return hash.hexdigest()[:6]
 
 
+CACHE_DIRNAME = ".bench_runner_cache"
+
+
+def get_cache_dir(results_dir: PathLike) -> Path:
+    """
+    Get the directory for machine-local caches of derived data.
+
+    This lives next to (rather than inside) the results directory, since
+    everything inside the results directory is committed to the results
+    repository.
+    """
+    return Path(results_dir).parent / CACHE_DIRNAME
+
+
+def get_file_digest(filename: PathLike) -> str:
+    """
+    Get the SHA-256 digest of the contents of a file.
+    """
+    hash = hashlib.sha256()
+    with Path(filename).open("rb") as fd:
+        while chunk := fd.read(1 << 20):
+            hash.update(chunk)
+    return hash.hexdigest()
+
+
+@functools.cache
+def get_bench_runner_version() -> str:
+    try:
+        return importlib.metadata.version("bench_runner")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
 TYPE_TO_ICON = {
     "table": "📄",
     "time plot": "📈",
     "memory plot": "🧠",
+    "time plot data": "📈",
+    "memory plot data": "🧠",
 }
 
 
+# The file types that are opened in the viewer, rather than linked directly
+PLOT_DATA_TYPES = {"time plot data", "memory plot data"}
+
+
 def apply_suffix(path: PathLike, suffix: str) -> Path:
     """
     Like Path.with_suffix but allows adding things like "-mem.svg".
@@ -55,3 +97,125 @@ def has_any_element(iterable):
         return True  # If successful, the generator is not empty
     except StopIteration:
         return False  # If StopIteration is raised, the generator is empty
+
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_SIGNIFICANT = re.compile(r'["{}\[\]]')
+_JSON_STRING_TAIL = re.compile(r'(?:[^"\\]|\\.)*"')
+_JSON_AFTER_STRING = re.compile(r"\s*(:?)\s*")
+_JSON_MEMBER_SEPARATOR = re.compile(r"\s*,\s*")
+_JSON_CLOSE_OBJECT = re.compile(r"\s*}\s*$")
+_JSON_CHUNK_SIZE = 1 << 20
+_JSON_TAIL_SIZE = 1 << 16
+
+
+def _read_json_value_from_tail(fd, key: str) -> tuple[bool, Any]:
+    """
+    Look for a top-level `key` in the last few kilobytes of a JSON file.
+
+    pyperf writes its keys in sorted order, so the top-level `metadata` comes
+    right after the (huge) `benchmarks` array. A candidate is only accepted if
+    everything after its value is a sequence of further members that closes
+    the outermost object at the end of the file, which guarantees that it is
+    a top-level member.
+    """
+    size = fd.seek(0, os.SEEK_END)
+    fd.seek(max(0, size - _JSON_TAIL_SIZE))
+    tail = fd.read().decode("utf-8", errors="replace")
+
+    needle = f'"{key}"'
+    start = len(tail)
+    while (start := tail.rfind(needle, 0, start)) != -1:
+        after = _JSON_AFTER_STRING.match(tail, start + len(needle))
+        if after is None or after.group(1) != ":":
+            continue
+        try:
+            value, pos = _JSON_DECODER.raw_decode(tail, after.end())
+            while sep := _JSON_MEMBER_SEPARATOR.match(tail, pos):
+                _, pos = _JSON_DECODER.raw_decode(tail, sep.end())
+                after = _JSON_AFTER_STRING.match(tail, pos)
+                if after is None or after.group(1) != ":":
+                    raise ValueError("Not an object member")
+                _, pos = _JSON_DECODER.raw_decode(tail, after.end())
+        except ValueError:
+            continue
+        if _JSON_CLOSE_OBJECT.match(tail, pos):
+            return True, value
+    return False, None
+
+
+def _read_json_value_streaming(fd, key: str) -> tuple[bool, Any]:
+    """
+    Scan a JSON file chunk-by-chunk, tracking only the nesting depth, until
+    the top-level `key` is found. Nothing but the value of `key` is decoded.
+    """
+    buf = ""
+    pos = 0
+    depth = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = fd.read(_JSON_CHUNK_SIZE)
+        eof = chunk == ""
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        m = _JSON_SIGNIFICANT.search(buf, pos)
+        if m is None:
+            if eof:
+                return False, None
+            pos = len(buf)
+            fill()
+            continue
+
+        char = m.group()
+        if char == '"':
+            end = _JSON_STRING_TAIL.match(buf, m.end())
+            after = end and _JSON_AFTER_STRING.match(buf, end.end())
+            if after is None or (after.end() == len(buf) and not eof):
+                # The string (or what follows it) straddles the end of the
+                # buffer
+                if eof:
+                    return False, None
+                pos = m.start()
+                fill()
+                continue
+            pos = after.end()
+            if (
+                depth == 1
+                and after.group(1) == ":"
+                and buf[m.start() : end.end()] == f'"{key}"'
+            ):
+                try:
+                    value, _ = _JSON_DECODER.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    pos = m.start()
+                    fill()
+                    continue
+                return True, value
+        elif char in "{[":
+            depth += 1
+            pos = m.end()
+        else:
+            depth -= 1
+            pos = m.end()
+
+
+def read_json_top_level_value(filename: PathLike, key: str, default: Any = None):
+    """
+    Read the value of a single top-level key of a JSON object from a file,
+    without decoding the rest of the file.
+    """
+    with Path(filename).open("rb") as fd:
+        found, value = _read_json_value_from_tail(fd, key)
+    if found:
+        return value
+    with Path(filename).open(encoding="utf-8") as fd:
+        found, value = _read_json_value_streaming(fd, key)
+    if found:
+        return value
+    return default
@@ -19,6 +19,29 @@ DATA_PATH = Path(__file__).parent / "data"
 ROOT = None
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-speed",
+        action="store_true",
+        help="Run the tests that compare timings, which depend on the machine",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "speed: compares timings, only run with --run-speed"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-speed"):
+        return
+    skip = pytest.mark.skip(reason="needs --run-speed")
+    for item in items:
+        if "speed" in item.keywords:
+            item.add_marker(skip)
+
+
 def _setup_repositories(root):
     root.mkdir()
 
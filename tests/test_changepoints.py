@@ -0,0 +1,99 @@
+from pathlib import Path
+import shutil
+import types
+
+
+import numpy as np
+
+
+from bench_runner import changepoints
+from bench_runner.scripts import detect_regressions
+
+
+DATA_PATH = Path(__file__).parent / "data"
+
+
+def _make_results(n, start=0):
+    return [
+        types.SimpleNamespace(
+            filename=Path(f"results/bm-{i}/bm-{i}.json"),
+            cpython_hash=f"{i:07x}",
+            fork="python",
+            commit_date=f"2024-01-{i + 1:02}",
+        )
+        for i in range(start, n)
+    ]
+
+
+def test_detector():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(1.0, 0.002, 30), rng.normal(1.05, 0.002, 30)])
+
+    detector = changepoints.Detector()
+    changes = []
+    for i, value in enumerate(values):
+        # Round-trip the state, as happens between runs
+        detector = changepoints.Detector(detector.to_dict())
+        change = detector.update(value, i)
+        if change is not None:
+            changes.append(change)
+
+    assert len(changes) == 1
+    assert changes[0]["direction"] == 1
+    assert changes[0]["before"] == 29
+    assert changes[0]["first"] == 30
+    assert 1.04 < changes[0]["ratio"] < 1.06
+
+
+def test_store_is_incremental(tmp_path):
+    values = [1.0] * 10 + [0.9] * 10
+    results = _make_results(len(values))
+    calls = []
+
+    def get_value(result):
+        i = results.index(result)
+        calls.append(i)
+        return values[i]
+
+    fields = {"benchmark": None, "higher_is_better": True}
+    path = tmp_path / "changepoints.json"
+    with changepoints.ChangePointStore(path, "3.12.0") as store:
+        assert store.is_new
+        assert store.update("a", fields, results[:10], get_value) == []
+
+    with changepoints.ChangePointStore(path, "3.12.0") as store:
+        assert not store.is_new
+        (change,) = store.update("a", fields, results, get_value)
+        assert change["before"]["hash"] == f"{9:07x}"
+        assert change["first"]["hash"] == f"{10:07x}"
+        assert changepoints.get_slowdown(change) > 0.1
+    # Only the new results were looked at
+    assert calls == list(range(20))
+
+    # A result inserted before the last one replays the series
+    calls.clear()
+    with changepoints.ChangePointStore(path, "3.12.0") as store:
+        results.insert(5, _make_results(21, 20)[0])
+        values.insert(5, 1.0)
+        assert len(store.update("a", fields, results, get_value)) == 1
+        assert len(store.get_changes()) == 1
+    assert calls == list(range(21))
+
+    # The state is discarded when the base changes
+    assert changepoints.ChangePointStore(path, "3.13.0").is_new
+
+
+def test_detect_regressions(tmp_path, monkeypatch):
+    repo_path = tmp_path / "repo"
+    shutil.copytree(DATA_PATH, repo_path)
+    monkeypatch.chdir(repo_path)
+
+    detect_regressions._main(repo_path, base="3.10.4")
+
+    assert (repo_path / "regressions.md").read_text().startswith("# Regressions\n")
+    assert (repo_path / "changepoints.json").is_file()
+    assert (repo_path / "trends.jsonl").is_file()
+
+    # Nothing new is looked at the second time
+    monkeypatch.setattr(detect_regressions, "_get_medians", lambda *args: 1 / 0)
+    assert detect_regressions._main(repo_path, base="3.10.4") == []
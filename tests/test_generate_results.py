@@ -7,7 +7,12 @@ import shutil
 import pytest
 
 
+from bench_runner import plot
+from bench_runner.result import load_all_results
+from bench_runner import results_archive
 from bench_runner.scripts import generate_results
+from bench_runner.scripts import purge
+from bench_runner import util
 
 
 DATA_PATH = Path(__file__).parent / "data"
@@ -30,8 +35,13 @@ def _run_for_bases(bases, repo_path, force=False, has_base=[], check_readmes=Tru
 
         files_by_type = collections.Counter()
         for filepath in dirpath.iterdir():
-            files_by_type[filepath.suffix] += 1
+            if filepath.name.endswith("-summary.json"):
+                files_by_type["summary"] += 1
+            else:
+                files_by_type[filepath.suffix] += 1
         assert files_by_type[".json"] == 1
+        # Every table (but not the README) has a summary
+        assert files_by_type["summary"] == files_by_type[".md"] - 1
 
         if any(base in dirpath.name for base in has_base):
             assert files_by_type[".md"] == 4
@@ -43,12 +53,11 @@ def _run_for_bases(bases, repo_path, force=False, has_base=[], check_readmes=Tru
             assert files_by_type[".md"] in (3, 4)
             assert files_by_type[".svg"] in (2, 3)
 
-        # Make sure all files in the directory have a link
+        # Make sure all files in the directory, other than the summaries, have
+        # a link
         contents = (dirpath / "README.md").read_text()
-        assert contents.count("\n- [") in (
-            len(list(dirpath.iterdir())),
-            len(list(dirpath.iterdir())) - 1,
-        )
+        n_files = len(list(dirpath.iterdir())) - files_by_type["summary"]
+        assert contents.count("\n- [") in (n_files, n_files - 1)
         assert "## linux x86_64" in contents
         for base in bases:
             if base not in dirpath.name:
@@ -87,6 +96,10 @@ def test_main(tmp_path, monkeypatch):
     _run_for_bases(["3.10.4", "3.11.0b3"], repo_path, has_base=["b0e1f9c"])
     _run_for_bases(["3.10.4", "3.11.0b3"], repo_path, has_base=["b0e1f9c"])
 
+    # The cache of older versions is replaced by the trend store
+    assert not (repo_path / "longitudinal.json").exists()
+    assert (repo_path / "trends.jsonl").is_file()
+
 
 def test_change_bases(tmp_path, monkeypatch):
     repo_path = _copy_repo(tmp_path)
@@ -141,3 +154,298 @@ def test_fork_with_hyphen(tmp_path):
     assert (
         contents.count("with%252dhyphen-main-3.12.0a3%2B-b0e1f9c-vs-3.11.0b3.md") == 1
     )
+
+
+def test_parallel(tmp_path, monkeypatch):
+    serial_path = _copy_repo(tmp_path / "serial")
+    monkeypatch.chdir(serial_path)
+    generate_results._main(serial_path, bases=["3.10.4", "3.11.0b3"])
+
+    parallel_path = _copy_repo(tmp_path / "parallel")
+    monkeypatch.chdir(parallel_path)
+    generate_results._main(parallel_path, bases=["3.10.4", "3.11.0b3"], jobs=2)
+
+    serial_files = sorted(
+        x.relative_to(serial_path) for x in (serial_path / "results").glob("**/*")
+    )
+    parallel_files = sorted(
+        x.relative_to(parallel_path) for x in (parallel_path / "results").glob("**/*")
+    )
+    assert serial_files == parallel_files
+
+    for filename in serial_files:
+        if filename.suffix == ".md":
+            assert (serial_path / filename).read_text() == (
+                parallel_path / filename
+            ).read_text()
+
+    # The summary plots are rendered in worker processes too
+    for name in ["longitudinal", "configs", "memory_long", "memory_configs"]:
+        assert (parallel_path / f"{name}.svg").is_file()
+    assert (serial_path / "trends.jsonl").read_text() == (
+        parallel_path / "trends.jsonl"
+    ).read_text()
+
+
+def test_data_only_plots(tmp_path, monkeypatch):
+    repo_path = _copy_repo(tmp_path)
+    monkeypatch.chdir(repo_path)
+    monkeypatch.setattr(plot, "get_comparison_plot_format", lambda: "data")
+
+    # Run twice, to make sure the data files are recognized as derived results
+    for _ in range(2):
+        generate_results._main(repo_path, bases=["3.10.4", "3.11.0b3"])
+
+    results_path = repo_path / "results"
+    assert not list(results_path.glob("**/*.svg"))
+    data_files = list(results_path.glob("**/*-plot.json"))
+    assert len(data_files) == len(list(results_path.glob("**/*-vs-*.md")))
+    for data_file in data_files:
+        data = json.loads(data_file.read_text())
+        assert data["differences"] in (["slower", "faster"], ["less", "more"])
+        for benchmark in data["benchmarks"]:
+            assert benchmark["values"] is None or len(benchmark["values"]) == 100
+
+    assert (repo_path / plot.VIEWER_FILENAME).is_file()
+    assert "(viewer.html?data=results/bm-" in (repo_path / "README.md").read_text()
+    dirpath = results_path / "bm-20220323-3.10.4-9d38120"
+    assert (
+        f"(../../viewer.html?data=results/{dirpath.name}/"
+        in (dirpath / "README.md").read_text()
+    )
+
+
+def test_failures_are_reported(tmp_path, monkeypatch):
+    repo_path = _copy_repo(tmp_path)
+    monkeypatch.chdir(repo_path)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("Oops")
+
+    monkeypatch.setattr(plot, "plot_diff", fail)
+
+    with pytest.raises(RuntimeError, match="Failed to generate"):
+        generate_results._main(repo_path, bases=["3.10.4", "3.11.0b3"])
+
+    # All of the tables were still generated, and no partial plots were left
+    results_path = repo_path / "results"
+    assert len(list(results_path.glob("**/*-vs-*.md")))
+    assert len(list(results_path.glob("**/*-vs-*.svg"))) == 0
+
+
+def test_summary(tmp_path, monkeypatch):
+    repo_path = _copy_repo(tmp_path)
+    monkeypatch.chdir(repo_path)
+
+    generate_results._main(repo_path, bases=["3.11.0b3"])
+
+    def get_values(compare):
+        return (
+            compare.geometric_mean,
+            compare.geometric_mean_float,
+            compare.hpt_reliability,
+            compare.hpt_percentile(90),
+            compare.hpt_percentile(99),
+            compare.hpt_percentile_float(99),
+            compare.memory_change,
+        )
+
+    def get_comparisons():
+        results = load_all_results(["3.11.0b3"], repo_path / "results")
+        return [
+            compare
+            for result in results
+            for compare in result.bases.values()
+            if compare.valid_comparison
+        ]
+
+    comparisons = get_comparisons()
+    assert len(comparisons)
+    values = []
+    for compare in comparisons:
+        assert compare._summary is not None
+        values.append(get_values(compare))
+    assert any(value[2] is not None for value in values)
+
+    # Reading from the Markdown tables of legacy results gives the same values
+    for compare in comparisons:
+        compare.summary_filename.unlink()
+    for compare, expected in zip(get_comparisons(), values):
+        assert compare._summary is None
+        assert get_values(compare) == expected
+
+
+def _get_mtimes(repo_path):
+    return {
+        x.relative_to(repo_path): x.stat().st_mtime_ns
+        for x in repo_path.glob("**/*")
+        if x.is_file() and ".bench_runner_cache" not in x.parts
+    }
+
+
+def test_incremental(tmp_path, monkeypatch):
+    repo_path = _copy_repo(tmp_path)
+    monkeypatch.chdir(repo_path)
+    bases = ["3.10.4", "3.11.0b3"]
+
+    new_dir = repo_path / "results" / "bm-20221119-3.12.0a3+-b0e1f9c"
+    saved_dir = tmp_path / "saved"
+    shutil.move(new_dir, saved_dir)
+
+    generate_results._main(repo_path, bases=bases)
+    before = _get_mtimes(repo_path)
+
+    # Adding a new result only generates the files that depend on it
+    shutil.move(saved_dir, new_dir)
+    generate_results._main(repo_path, bases=bases, incremental=True)
+    after = _get_mtimes(repo_path)
+
+    touched = set(x for x in after if x not in before or after[x] != before[x]) - set(
+        Path(x) for x in ("README.md", "RESULTS.md")
+    )
+    assert len(touched)
+    for filename in touched:
+        assert filename.parts[:2] == ("results", new_dir.name) or (
+            filename.suffix in (".svg", ".jsonl") and len(filename.parts) == 1
+        )
+    assert Path("results", new_dir.name, "README.md") in touched
+
+    # Running again with nothing new doesn't touch anything
+    generate_results._main(repo_path, bases=bases, incremental=True)
+    again = _get_mtimes(repo_path)
+    assert set(x for x in again if again[x] != after[x]) == set(
+        Path(x) for x in ("README.md", "RESULTS.md")
+    )
+
+    # Changing a base regenerates all of the comparisons against it
+    base_result = next((repo_path / "results").glob("bm-20220601-*/*-eb0004c.json"))
+    generate_results._main(
+        repo_path, bases=bases, incremental=True, changed=[base_result]
+    )
+    changed = _get_mtimes(repo_path)
+    regenerated = [
+        x for x in changed if changed[x] != again[x] and x.name.endswith("-3.11.0b3.md")
+    ]
+    assert len(regenerated) == len(list(repo_path.glob("results/**/*-vs-3.11.0b3.md")))
+
+    # And the result is the same as regenerating everything
+    full_path = _copy_repo(tmp_path / "full")
+    monkeypatch.chdir(full_path)
+    generate_results._main(full_path, bases=bases)
+    for filename in changed:
+        if filename.suffix == ".md" and filename.parts[0] == "results":
+            assert (repo_path / filename).read_text() == (
+                full_path / filename
+            ).read_text()
+
+
+def test_incremental_missing_summaries(tmp_path, monkeypatch):
+    repo_path = _copy_repo(tmp_path)
+    monkeypatch.chdir(repo_path)
+    bases = ["3.10.4", "3.11.0b3"]
+
+    generate_results._main(repo_path, bases=bases)
+    summaries = list(repo_path.glob("results/**/*-summary.json"))
+    assert len(summaries)
+    for filename in summaries:
+        filename.unlink()
+    before = _get_mtimes(repo_path)
+
+    # Results from before summary files existed only get their summaries
+    # written, rather than being treated as new
+    generate_results._main(repo_path, bases=bases, incremental=True)
+    after = _get_mtimes(repo_path)
+    assert all(filename.is_file() for filename in summaries)
+    touched = set(x for x in after if x not in before or after[x] != before[x])
+    assert touched - set(x.relative_to(repo_path) for x in summaries) == set(
+        Path(x) for x in ("README.md", "RESULTS.md")
+    )
+
+
+def test_purge_archive(tmp_path, monkeypatch):
+    repo_path = _copy_repo(tmp_path)
+    monkeypatch.chdir(repo_path)
+    bases = ["3.10.4", "3.11.0b3"]
+
+    purged = set(
+        x.relative_to(repo_path) for x in repo_path.glob("results/*+-*/*.json")
+    )
+    assert len(purged)
+
+    plotted = []
+    get_longitudinal_data = plot.get_longitudinal_data
+
+    def get_longitudinal_data_wrapper(results, *args, **kwargs):
+        plotted.extend(results)
+        return get_longitudinal_data(results, *args, **kwargs)
+
+    monkeypatch.setattr(plot, "get_longitudinal_data", get_longitudinal_data_wrapper)
+
+    purge._main(repo_path, 0, False, bases=bases, archive=True)
+
+    # The purged results are gone, but are still on the plots
+    assert len(list((repo_path / "results").glob("*+-*"))) == 0
+    assert len(list((repo_path / "archive").glob("*.jsonl")))
+    archived = [r for r in plotted if r.is_archived]
+    assert set(r.filename.relative_to(repo_path) for r in archived) == purged
+    for result in archived:
+        assert result.bases["3.11.0b3"].geometric_mean_float is not None
+
+
+def test_parallel_with_archived_base(tmp_path, monkeypatch):
+    repo_path = _copy_repo(tmp_path)
+    monkeypatch.chdir(repo_path)
+    results_path = repo_path / "results"
+
+    base_dir = results_path / "bm-20220601-3.11.0b3-eb0004c"
+    results_archive.append(
+        results_path,
+        [
+            x
+            for x in load_all_results(None, results_path, match=False)
+            if x.filename.parent == base_dir
+        ],
+    )
+    shutil.rmtree(base_dir)
+
+    # The archived base is rebuilt from the archive in the worker processes
+    generate_results._main(repo_path, bases=["3.10.4", "3.11.0b3"], jobs=2)
+    assert len(list(results_path.glob("**/*-vs-3.11.0b3.md")))
+
+
+def test_write_comparison_in_worker(tmp_path, monkeypatch):
+    repo_path = _copy_repo(tmp_path)
+    monkeypatch.chdir(repo_path)
+    results = load_all_results(["3.10.4"], repo_path / "results")
+    (head,) = [x for x in results if x.cpython_hash == "b0e1f9c"]
+    compare = head.bases["3.10.4"]
+    files = [
+        (suffix, util.apply_suffix(compare.base_filename, suffix))
+        for _, suffix, _ in compare.get_files(summary=True)
+    ]
+    assert len(files) > 2
+
+    calls = []
+    comparison_factory = generate_results.comparison_factory
+
+    def comparison_factory_wrapper(*args):
+        calls.append(args)
+        return comparison_factory(*args)
+
+    monkeypatch.setattr(
+        generate_results, "comparison_factory", comparison_factory_wrapper
+    )
+
+    # All of the files of a comparison are written from a single comparison
+    failures = generate_results._write_comparison_in_worker(
+        compare.ref.filename,
+        None,
+        compare.ref.get_index_entry(),
+        compare.head.filename,
+        compare.head.get_index_entry(),
+        "3.10.4",
+        [*files, (".unknown", tmp_path / "unknown")],
+    )
+    assert len(calls) == 1
+    assert all(filename.is_file() for _, filename in files)
+    assert [filename for filename, _ in failures] == [tmp_path / "unknown"]
@@ -0,0 +1,141 @@
+import time
+
+
+import numpy as np
+import pytest
+
+
+from bench_runner import hpt
+
+
+def _get_rank_reference(gr_x):
+    # The original O(n²) implementation
+    rank = np.zeros((len(gr_x),), int)
+    rep = np.zeros((len(gr_x),), int)
+
+    for i in range(len(gr_x)):
+        diff = gr_x - gr_x[i]
+        less = np.sum(diff < 0)
+        same = np.sum(diff == 0)
+        rank[i] = less + 1
+        rep[i] = same
+
+    return rank, rep
+
+
+def _get_realistic_data(rng, n_benchmarks=60, n_values=400):
+    # Timings are recorded with limited precision, so there are plenty of ties
+    return [np.round(rng.lognormal(-4, 0.05, n_values), 6) for _ in range(n_benchmarks)]
+
+
+def test_get_rank():
+    rng = np.random.default_rng(0)
+    cases = [
+        np.array([], dtype=np.float64),
+        np.array([1.0]),
+        np.array([2.0, 1.0, 2.0, 3.0, 1.0, 2.0]),
+        np.array([0.0, -0.0, np.nan, 1.0, np.nan, -1.0]),
+        rng.integers(0, 5, 50).astype(np.float64),
+        *_get_realistic_data(rng, 5),
+    ]
+    for values in cases:
+        rank, rep = hpt.get_rank(values)
+        expected_rank, expected_rep = _get_rank_reference(values)
+        np.testing.assert_array_equal(rank, expected_rank)
+        np.testing.assert_array_equal(rep, expected_rep)
+
+
+@pytest.mark.speed
+def test_get_rank_speed():
+    # A micro-benchmark at the size of a full pyperformance run
+    rng = np.random.default_rng(0)
+    data = [np.hstack((x, x * 0.9)) for x in _get_realistic_data(rng)]
+
+    start = time.perf_counter()
+    for values in data:
+        _get_rank_reference(values)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for values in data:
+        hpt.get_rank(values)
+    vectorized_time = time.perf_counter() - start
+
+    assert (
+        vectorized_time * 10 < reference_time
+    ), f"reference {reference_time:.3f}s, vectorized {vectorized_time:.3f}s"
+
+
+def _maxspeedup_reference(reli, better, alpha, mtx_a, mtx_b):
+    # The original implementation, which calls hpt_basic at every step
+    if better:
+        ret, _, _ = hpt.hpt_basic(mtx_a, mtx_b, alpha, 10.0)
+        if ret < 1.0 - reli:
+            return -1.0
+    else:
+        ret, _, _ = hpt.hpt_basic(mtx_a, mtx_b, alpha, 1.0 / 10.0)
+        if ret > reli:
+            return -1.0
+
+    step = -1
+    myscale = 1.0
+    minimum = 1
+    maximum = 10
+    base_su = 0.0
+    while step < hpt.ACC_MAXSU:
+        mid = (maximum - minimum) // 2 + minimum
+        su = base_su + myscale * mid
+        if better:
+            ret, _, _ = hpt.hpt_basic(mtx_a, mtx_b, alpha, su)
+            above = ret < 1 - reli
+        else:
+            ret, _, _ = hpt.hpt_basic(mtx_a, mtx_b, alpha, 1.0 / su)
+            above = ret > reli
+        if above:
+            minimum = mid
+        else:
+            maximum = mid
+
+        if minimum == maximum - 1:
+            base_su += minimum * myscale
+            myscale /= 10.0
+            step += 1
+            minimum = 0
+            maximum = 10
+
+    return base_su
+
+
+def _get_matrices(rng, speedup, n_benchmarks=20, n_values=24):
+    mtx_a = {}
+    mtx_b = {}
+    for i, values in enumerate(_get_realistic_data(rng, n_benchmarks, n_values)):
+        mtx_b[f"bm{i}"] = values
+        mtx_a[f"bm{i}"] = np.round(
+            values * rng.normal(speedup, 0.05) * rng.normal(1, 0.01, n_values), 6
+        )
+    return mtx_a, mtx_b
+
+
+def test_maxspeedups():
+    rng = np.random.default_rng(0)
+    relis = [0.9, 0.95, 0.99]
+    for speedup in [0.5, 0.8, 0.97, 1.0, 1.03, 1.25, 2.0, 12.0]:
+        mtx_a, mtx_b = _get_matrices(rng, speedup)
+        if speedup == 1.25:
+            # Different numbers of values on each side
+            mtx_b["bm0"] = mtx_b["bm0"][:-2]
+        for better in [True, False]:
+            expected = [
+                _maxspeedup_reference(reli, better, 0.1, mtx_a, mtx_b) for reli in relis
+            ]
+            assert hpt.maxspeedups(relis, better, 0.1, mtx_a, mtx_b) == expected
+
+
+def test_batched_hpt_basic():
+    rng = np.random.default_rng(1)
+    mtx_a, mtx_b = _get_matrices(rng, 1.1)
+    multis = np.array([0.1, 0.5, 1.0, 1.07, 1.1, 1.2, 10.0])
+    batched = hpt._BatchedHpt(mtx_a, mtx_b, 0.1).evaluate(multis)
+    for multi, ret in zip(multis, batched):
+        assert ret == hpt.hpt_basic(mtx_a, mtx_b, 0.1, multi)[0]
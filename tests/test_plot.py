@@ -0,0 +1,106 @@
+from pathlib import Path
+import shutil
+import xml.etree.ElementTree as ET
+
+
+from matplotlib import pyplot as plt
+import pytest
+
+
+from bench_runner import plot
+from bench_runner import result
+from bench_runner import trend_store
+
+
+DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_minify_svg():
+    # matplotlib puts each path command on its own line, with trailing spaces
+    contents = "\n".join(
+        [
+            '<?xml version="1.0" encoding="utf-8"?>',
+            '<svg xmlns="http://www.w3.org/2000/svg">',
+            " <!-- a comment -->",
+            ' <style type="text/css">*{stroke-width: 0.123456}',
+            " </style>",
+            ' <g id="axes_1">',
+            '  <path d="M 57.6 307.584 ',
+            "L 414.72 307.58612 ",
+            "L 414.72 41.472 ",
+            "C 0.0123556 1 2 3 4 5 ",
+            "L 1 2 ",
+            "z",
+            '" style="stroke-width: 0.8"/>',
+            '  <text x="1.23456">1.23456</text>',
+            " </g>",
+            "</svg>",
+            "",
+        ]
+    ).encode("utf-8")
+
+    # Numbers are rounded, and only in attribute values
+    assert plot.minify_svg(contents) == (
+        b'<?xml version="1.0" encoding="utf-8"?>'
+        b'<svg xmlns="http://www.w3.org/2000/svg">'
+        b'<style type="text/css">*{stroke-width: 0.123456}\n </style>'
+        b'<g id="axes_1">'
+        b'<path d="M57.6 307.58 414.72 307.59 414.72 41.47'
+        b'C0.0124 1 2 3 4 5L1 2z" style="stroke-width: 0.8"/>'
+        b'<text x="1.23">1.23456</text>'
+        b"</g></svg>"
+    )
+
+
+@pytest.mark.parametrize("optimizer", plot.SVG_OPTIMIZERS)
+def test_savefig(tmp_path, monkeypatch, optimizer):
+    monkeypatch.chdir(DATA_PATH)
+    monkeypatch.setattr(plot, "get_svg_config", lambda: (optimizer, False))
+
+    plt.plot([1.0, 2.0, 3.0], [1.0, 4.0, 9.0])
+    stats = plot.savefig(tmp_path / "plot.svg")
+
+    assert stats is not None
+    assert stats.optimizer == optimizer
+    assert stats.size == (tmp_path / "plot.svg").stat().st_size
+    if optimizer == "none":
+        assert stats.size == stats.original_size
+    else:
+        assert stats.size < stats.original_size
+    ET.parse(tmp_path / "plot.svg")
+
+    # Rendering the same figure again gives the same file
+    plt.plot([1.0, 2.0, 3.0], [1.0, 4.0, 9.0])
+    contents = (tmp_path / "plot.svg").read_bytes()
+    plot.savefig(tmp_path / "plot.svg")
+    assert (tmp_path / "plot.svg").read_bytes() == contents
+
+
+def test_longitudinal_plot_getter(tmp_path, monkeypatch):
+    shutil.copytree(DATA_PATH, tmp_path, dirs_exist_ok=True)
+    monkeypatch.chdir(tmp_path)
+    results = result.load_all_results(["3.10.4"], tmp_path / "results")
+    output_filename = tmp_path / "longitudinal.svg"
+    # The cache of older versions, which is replaced by the trend store
+    old_cache = tmp_path / "longitudinal.json"
+    assert old_cache.is_file()
+
+    with trend_store.TrendStore(tmp_path / "trends.jsonl") as store:
+        expected = plot.get_longitudinal_data(results, store)
+
+        with pytest.warns(DeprecationWarning):
+            plot.longitudinal_plot(
+                results,
+                output_filename,
+                getter=lambda r: r.geometric_mean_float,
+                store=store,
+            )
+        actual = plot.get_longitudinal_data(
+            results, store, lambda r: r.geometric_mean_float
+        )
+
+    assert output_filename.is_file()
+    assert not old_cache.exists()
+    changes = [line["changes"] for _, lines, _ in expected.axes for line in lines]
+    assert len(changes)
+    assert [line["changes"] for _, lines, _ in actual.axes for line in lines] == changes
@@ -0,0 +1,44 @@
+import csv
+
+
+from bench_runner.scripts import profiling_diff
+
+
+def _write_csv(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="") as fd:
+        writer = csv.writer(fd)
+        writer.writerow(["self", "pid", "command", "shared_obj", "symbol"])
+        for self_time, obj, sym in rows:
+            writer.writerow([self_time, "1", "python", obj, sym])
+
+
+def test_profiling_diff(tmp_path):
+    base = tmp_path / "base"
+    head = tmp_path / "head"
+    _write_csv(
+        base / "nbody.perf.csv",
+        [(75.0, "python", "_PyEval_EvalFrameDefault"), (25.0, "python", "float_add")],
+    )
+    _write_csv(
+        head / "nbody.perf.csv",
+        [
+            (50.0, "python", "_PyEval_EvalFrameDefault"),
+            (25.0, "python", "float_add"),
+            (25.0, "[JIT]", "0x1234"),
+        ],
+    )
+    _write_csv(base / "2to3.perf.csv", [(1.0, "python", "PyImport_Foo")])
+
+    profiling_diff._main(base, head, tmp_path / "diff", jobs=1)
+
+    md = (tmp_path / "diff.md").read_text()
+    assert "Only in base (1): 2to3" in md
+    categories = md.split("## Categories\n")[1].split("##")[0]
+    assert categories.strip().splitlines()[2:] == [
+        "| interpreter | 75.00% | 50.00% | -25.00 pp |",
+        "| jit | 0.00% | 25.00% | +25.00 pp |",
+        "| float | 25.00% | 25.00% | +0.00 pp |",
+    ]
+    assert "| `python` | `float_add` |" not in md
+    assert (tmp_path / "diff.svg").is_file()
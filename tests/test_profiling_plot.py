@@ -0,0 +1,69 @@
+import csv
+
+
+from bench_runner.scripts import profiling_plot
+
+
+def test_category_for_obj_sym():
+    assert profiling_plot.category_for_obj_sym("python", "_PyEval_Foo") == (
+        "interpreter"
+    )
+    # Matches both "memory" and "dynamic", but "memory" comes first
+    assert profiling_plot.category_for_obj_sym("python", "_PyObject_Malloc") == (
+        "memory"
+    )
+    assert profiling_plot.category_for_obj_sym("python", "PyObject_GetAttr") == (
+        "dynamic"
+    )
+    assert profiling_plot.category_for_obj_sym("python", "dictresize.part.0") == (
+        "dict"
+    )
+    assert profiling_plot.category_for_obj_sym("python", "x_add (inlined)") == "int"
+    # Patterns must match the entire symbol
+    assert profiling_plot.category_for_obj_sym("python", "my_replace") == "unknown"
+    assert profiling_plot.category_for_obj_sym("_json.so", "scanstring") == "library"
+    assert profiling_plot.category_for_obj_sym("[kernel.kallsyms]", "x") == "kernel"
+
+
+def test_load_benchmark(tmp_path):
+    csv_path = tmp_path / "nbody.perf.csv"
+    with csv_path.open("w", newline="") as fd:
+        writer = csv.writer(fd)
+        writer.writerow(["self", "pid", "command", "shared_obj", "symbol"])
+        writer.writerow([10.0, "1", "python", "python", "_PyEval_EvalFrameDefault"])
+        writer.writerow([4.0, "2", "python", "python", "_PyEval_EvalFrameDefault"])
+        writer.writerow([3.0, "1", "python", "[JIT]", "0x1234"])
+        writer.writerow([2.0, "1", "python", "[JIT]", "0x5678"])
+        writer.writerow([5.0, "3", "sh", "libc.so.6", "read"])
+        # pid 2 is the orchestrating Python, which is only known after
+        # some of its rows have already been seen
+        writer.writerow([1.0, "2", "python", "libpython3.12.so.1.0", "main"])
+
+    total, rows = profiling_plot.load_benchmark(csv_path)
+    assert total == 15.0
+    assert rows == [
+        (10.0, "python", "_PyEval_EvalFrameDefault"),
+        (5.0, "[JIT]", "jit"),
+    ]
+
+
+def test_load_benchmarks(tmp_path, monkeypatch):
+    csv_paths = []
+    for i in range(3):
+        csv_path = tmp_path / f"bm{i}.perf.csv"
+        with csv_path.open("w", newline="") as fd:
+            writer = csv.writer(fd)
+            writer.writerow(["self", "pid", "command", "shared_obj", "symbol"])
+            writer.writerow([1.0 + i, "1", "python", "python", "_PyEval_Foo"])
+        csv_paths.append(csv_path)
+
+    # The results are in order, whether or not they are read in parallel
+    expected = [profiling_plot.load_benchmark(x) for x in csv_paths]
+    assert list(profiling_plot.load_benchmarks(csv_paths, jobs=2)) == expected
+
+    # A single job is read in-process
+    def fail(*args, **kwargs):
+        raise AssertionError("Should not start any processes")
+
+    monkeypatch.setattr(profiling_plot.concurrent.futures, "ProcessPoolExecutor", fail)
+    assert list(profiling_plot.load_benchmarks(csv_paths, jobs=1)) == expected
@@ -0,0 +1,182 @@
+import itertools
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+
+
+import numpy as np
+import pyperf
+import pytest
+
+
+from bench_runner import pyperf_compare
+from bench_runner import result as mod_result
+
+
+DATA_PATH = Path(__file__).parent / "data"
+
+
+def _get_results_files():
+    return sorted((DATA_PATH / "results").glob("**/*.json"))
+
+
+def _copy_result(filename, tmp_path):
+    dest = tmp_path / "results" / filename.parent.name / filename.name
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(filename, dest)
+    return dest
+
+
+@pytest.mark.parametrize(
+    "ref,head",
+    # The first file against all the others, and a handful of other pairs
+    [(_get_results_files()[0], x) for x in _get_results_files()[1:]]
+    + list(itertools.combinations(_get_results_files()[-4:], 2)),
+    ids=lambda x: x.stem.split("-")[-1],
+)
+def test_matches_pyperf(ref, head, tmp_path, monkeypatch):
+    # The test configuration doesn't exclude any benchmarks, just like the
+    # pyperf command line.
+    monkeypatch.chdir(DATA_PATH)
+
+    # Work on copies, so the caches aren't written to the test data
+    ref = _copy_result(ref, tmp_path)
+    head = _copy_result(head, tmp_path)
+
+    ref_result = mod_result.Result.from_filename(ref)
+    head_result = mod_result.Result.from_filename(head)
+
+    expected = subprocess.check_output(
+        [
+            sys.executable,
+            "-m",
+            "pyperf",
+            "compare_to",
+            "-G",
+            "--table",
+            "--table-format",
+            "md",
+            ref,
+            head,
+        ],
+        encoding="utf-8",
+    )
+
+    assert pyperf_compare.compare_results(ref_result, head_result) == expected
+
+
+def _write_suite(filename, benchmarks):
+    pyperf.BenchmarkSuite(
+        [
+            pyperf.Benchmark(
+                [
+                    pyperf.Run(
+                        list(values[i : i + 3]),
+                        metadata={"name": name, "tags": tags, "unit": "second"},
+                        collect_metadata=False,
+                    )
+                    for i in range(0, len(values), 3)
+                ]
+            )
+            for name, tags, values in benchmarks
+        ]
+    ).dump(str(filename))
+
+
+def test_matches_pyperf_with_tags(tmp_path, monkeypatch):
+    monkeypatch.chdir(DATA_PATH)
+
+    rng = np.random.default_rng(42)
+    ref_benchmarks = []
+    head_benchmarks = []
+    for i, tags in enumerate([["b"], ["a", "b"], [], ["a"], ["c"], ["a", "c"]]):
+        values = rng.normal(1.0 + i, 0.05, 12)
+        ref_benchmarks.append((f"bm{i}", tags, values))
+        head_benchmarks.append((f"bm{i}", tags, values * rng.uniform(0.8, 1.2)))
+    # Benchmarks that only exist on one side
+    ref_benchmarks.append(("only_ref", [], rng.normal(1.0, 0.05, 6)))
+    head_benchmarks.append(("only_head", [], rng.normal(1.0, 0.05, 6)))
+
+    ref = tmp_path / "ref.json"
+    head = tmp_path / "head.json"
+    _write_suite(ref, ref_benchmarks)
+    _write_suite(head, head_benchmarks)
+
+    expected = subprocess.check_output(
+        [
+            sys.executable,
+            "-m",
+            "pyperf",
+            "compare_to",
+            "-G",
+            "--table",
+            "--table-format",
+            "md",
+            ref,
+            head,
+        ],
+        encoding="utf-8",
+    )
+    assert "Benchmarks with tag 'a':" in expected
+
+    # Excluded benchmarks are still in the table, as they are with pyperf
+    monkeypatch.setattr(mod_result.util, "get_excluded_benchmarks", lambda: {"bm1"})
+    output = pyperf_compare.compare_results(
+        mod_result.Result.from_arbitrary_filename(ref),
+        mod_result.Result.from_arbitrary_filename(head),
+    )
+    assert output == expected
+
+
+def test_is_significant():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        a = rng.normal(1.0, 0.1, 20)
+        b = rng.normal(rng.uniform(0.9, 1.1), 0.1, 20)
+        assert pyperf_compare.is_significant(a, b)[0] == pyperf_is_significant(a, b)
+
+    assert pyperf_compare.is_significant(np.ones(3), np.ones(4)) == (True, None)
+    assert pyperf_compare.is_significant(np.ones(3), np.ones(3)) == (True, None)
+
+
+def pyperf_is_significant(a, b):
+    from pyperf import _utils
+
+    return _utils.is_significant(list(a), list(b))[0]
+
+
+def test_is_significant_batch():
+    from pyperf import _utils
+
+    rng = np.random.default_rng(1)
+    samples1 = []
+    samples2 = []
+    for _ in range(200):
+        n = int(rng.integers(2, 60))
+        samples1.append(rng.normal(1.0, 0.1, n))
+        samples2.append(rng.normal(rng.uniform(0.9, 1.1), 0.1, n))
+    # Cases that can't be tested
+    samples1.extend([np.ones(1), np.ones(3), np.ones(5), np.empty(0)])
+    samples2.extend([np.ones(1), np.ones(4), np.ones(5), np.empty(0)])
+
+    significant, t_scores = pyperf_compare.is_significant_batch(samples1, samples2)
+    assert len(significant) == len(t_scores) == len(samples1)
+
+    for a, b, sig, t_score in zip(samples1, samples2, significant, t_scores):
+        try:
+            expected_sig, expected_t_score = _utils.is_significant(
+                a.tolist(), b.tolist()
+            )
+        except Exception:
+            expected_sig, expected_t_score = True, None
+        if len(a) <= 1:
+            expected_sig, expected_t_score = True, None
+        assert sig == expected_sig
+        if expected_t_score is None:
+            assert np.isnan(t_score)
+        else:
+            assert t_score == pytest.approx(expected_t_score, rel=1e-9)
+
+    significant, t_scores = pyperf_compare.is_significant_batch([], [])
+    assert len(significant) == len(t_scores) == 0
@@ -1,12 +1,25 @@
+import collections
+import datetime
+import hashlib
+import itertools
 import json
 from pathlib import Path
 import platform
+import random
 import shutil
 import socket
 import sys
+import time
+
+
+import numpy as np
+import pytest
 
 
 from bench_runner import result as mod_result
+from bench_runner import results_archive
+from bench_runner import timing_store
+from bench_runner import trend_store
 
 
 DATA_PATH = Path(__file__).parent / "data"
@@ -122,3 +135,633 @@ def test_from_scratch(monkeypatch):
         f"bm-20221119-{platform.system().lower()}-{platform.machine().lower()}"
         f"-my%2dfork-9d38120e335357a3b294-{platform.python_version()}-b7e4f1d.json"
     )
+
+
+def test_result_index(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    results = mod_result.load_all_results([], results_path, match=False)
+    assert all(result._index_entry is not None for result in results)
+    assert all("contents" not in result.__dict__ for result in results)
+
+    with mod_result.result_index.ResultIndex(results_path) as index:
+        # Nothing has changed, so nothing needs to be reparsed
+        assert index.update(results) == 0
+
+    # Modify one of the results, so it is reparsed
+    result_path = (
+        results_path
+        / "bm-20221119-3.12.0a3+-b0e1f9c"
+        / "bm-20221119-linux-x86_64-python-main-3.12.0a3+-b0e1f9c.json"
+    )
+    with open(result_path) as fd:
+        contents = json.load(fd)
+    contents["metadata"]["commit_merge_base"] = "9d38120e335357a3b294"
+    with open(result_path, "w") as fd:
+        json.dump(contents, fd)
+
+    # Remove another, so it is pruned from the index
+    shutil.rmtree(results_path / "bm-20211208-3.11.0a3-2e91dba")
+
+    results = mod_result.load_all_results([], results_path, match=False)
+    assert len(results) == 10
+    by_hash = {x.cpython_hash: x for x in results}
+    assert by_hash["b0e1f9c"].commit_merge_base == "9d38120e335357a3b294"
+    assert by_hash["9d38120"].run_datetime == "2022-06-07 20:13:37.571845"
+    assert "deltablue" in by_hash["9d38120"].benchmark_names
+
+    with mod_result.result_index.ResultIndex(results_path) as index:
+        assert index.update(results) == 0
+        (count,) = index._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        assert count == 10
+
+
+def test_result_index_with_pystats(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    # pystats raw results have no "benchmarks" key
+    with open(
+        results_path
+        / "bm-20221119-3.12.0a3+-b0e1f9c"
+        / "bm-20221119-linux-x86_64-python-main-3.12.0a3+-b0e1f9c-pystats.json",
+        "w",
+    ) as fd:
+        json.dump({"opcode[LOAD_FAST].execution_count": 10}, fd)
+
+    results = mod_result.load_all_results(["3.10.4", "3.11.0b3"], results_path)
+    assert len(results) == 12
+    (pystats,) = [x for x in results if x.result_info[0] == "pystats raw"]
+    assert pystats.benchmark_names == set()
+
+
+def test_result_index_shared_cache(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    other_path = tmp_path / "other_results"
+    shutil.copytree(results_path, other_path)
+    shutil.rmtree(other_path / "bm-20211208-3.11.0a3-2e91dba")
+    monkeypatch.chdir(tmp_path)
+
+    mod_result.load_all_results([], results_path, match=False)
+    mod_result.load_all_results([], other_path, match=False)
+
+    # Both directories share the cache, but loading one doesn't remove the
+    # entries of the other
+    with mod_result.result_index.ResultIndex(results_path) as index:
+        (count,) = index._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        assert count == 21
+        results = mod_result.load_all_results([], results_path, match=False)
+        assert index.update(results) == 0
+
+
+def test_result_index_digest(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    mod_result.load_all_results([], results_path, match=False)
+
+    def fail(*args):
+        raise AssertionError("Should have come from the index")
+
+    with monkeypatch.context() as m:
+        m.setattr(mod_result.util, "get_file_digest", fail)
+        results = mod_result.load_all_results([], results_path, match=False)
+        (result,) = [
+            x
+            for x in results
+            if x.filename.name
+            == "bm-20211208-linux-x86_64-python-main-3.11.0a3-2e91dba.json"
+        ]
+        assert result.digest == hashlib.sha256(result.filename.read_bytes()).hexdigest()
+        assert len(result.get_timing_data())
+
+    timing_paths = timing_store._get_paths(results_path, result.digest)
+    assert all(path.is_file() for path in timing_paths)
+
+    # The cached timings are removed along with the result
+    shutil.rmtree(result.filename.parent)
+    mod_result.load_all_results([], results_path, match=False)
+    assert not any(path.exists() for path in timing_paths)
+
+
+def test_comparison_cache(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    def get_comparison():
+        results = mod_result.load_all_results(["3.10.4"], results_path)
+        (head,) = [x for x in results if x.cpython_hash == "b0e1f9c"]
+        return head.bases["3.10.4"]
+
+    compare = get_comparison()
+    assert compare.base_filename is not None
+    assert not compare.base_filename.with_suffix(".md").exists()
+    contents = compare._contents
+    geometric_mean = compare.geometric_mean_float
+    hpt_reliability = compare.hpt_reliability
+    hpt_percentile = compare.hpt_percentile(99)
+    memory_change = compare.memory_change
+    assert "Geometric mean" in contents
+    assert hpt_reliability is not None
+    old_key = compare._cache_key
+
+    def fail(*args):
+        raise AssertionError("Should have been cached")
+
+    # The inputs haven't changed, so nothing is recomputed
+    with monkeypatch.context() as m:
+        m.setattr(mod_result.BenchmarkComparison, "_generate_contents", fail)
+        m.setattr(mod_result.BenchmarkComparison, "get_timing_diff", fail)
+        m.setattr(mod_result.BenchmarkComparison, "_parse_hpt_reliability", fail)
+        m.setattr(mod_result.BenchmarkComparison, "_parse_hpt_percentiles", fail)
+        m.setattr(mod_result.BenchmarkComparison, "_parse_memory_change", fail)
+        compare = get_comparison()
+        assert compare.geometric_mean_float == geometric_mean
+        assert compare.hpt_reliability == hpt_reliability
+        assert compare.hpt_percentile(99) == hpt_percentile
+        assert compare.memory_change == memory_change
+        assert compare._contents == contents
+
+    # Modify the head, so the comparison is recomputed
+    with open(compare.head.filename) as fd:
+        head_contents = json.load(fd)
+    head_contents["benchmarks"] = head_contents["benchmarks"][1:]
+    with open(compare.head.filename, "w") as fd:
+        json.dump(head_contents, fd)
+
+    compare = get_comparison()
+    assert compare._cached_values is None
+    assert compare._contents != contents
+    assert compare._cached_values is not None
+
+    # The comparison of the old head was removed with its index entry
+    assert mod_result.comparison_cache.load(results_path, old_key) is None
+
+
+def test_metadata_without_contents(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    results = mod_result.load_all_results(
+        [], results_path, match=False, use_index=False
+    )
+    by_hash = {x.cpython_hash: x for x in results}
+    result = by_hash["9d38120"]
+
+    assert result.commit_datetime == "2022-03-23T20:12:04+00:00"
+    assert result.benchmark_hash == "215d35"
+    assert "contents" not in result.__dict__
+
+    assert len(result.get_timing_data())
+    assert "contents" in result.__dict__
+    result.evict()
+    assert "contents" not in result.__dict__
+
+
+def _match_to_bases_reference(results, bases):
+    # The original implementation, which scans the candidates linearly
+    def find_match(result, candidates, base, func):
+        for result_set in [
+            candidates.get(result.benchmark_hash, []),
+            *(v for k, v in candidates.items() if k != result.benchmark_hash),
+        ]:
+            for ref in result_set:
+                if ref != result and func(ref):
+                    result.bases[base] = (ref, base)
+                    return True
+        return False
+
+    groups = collections.defaultdict(lambda: collections.defaultdict(list))
+    for result in results:
+        if result.fork == "python":
+            groups[(result.nickname, tuple(result.extra))][
+                result.benchmark_hash
+            ].append(result)
+
+    compare_to_default = (
+        mod_result.config.get_bench_runner_config()
+        .get("bases", {})
+        .get("compare_to_default", [])
+    )
+
+    for result in results:
+        candidates = groups[(result.nickname, tuple(result.extra))]
+
+        if (
+            result.version not in bases
+            and result.parsed_version.release[0:2]
+            < mod_result.mbases.get_minimum_version_for_all_comparisons()
+        ):
+            continue
+
+        for base in bases:
+            find_match(
+                result,
+                candidates,
+                base,
+                lambda ref: ref.version == base and ref.flags == [],
+            )
+
+        merge_base = result.commit_merge_base
+        found_base = False
+        if merge_base is not None:
+            found_base = find_match(
+                result,
+                candidates,
+                "base",
+                lambda ref: (
+                    merge_base.startswith(ref.cpython_hash)
+                    and ref.flags == result.flags
+                ),
+            )
+            for flag in compare_to_default:
+                if result.flags == [flag]:
+                    found_default_base = find_match(
+                        result,
+                        candidates,
+                        "default_base_vs_" + flag,
+                        lambda ref: (
+                            merge_base.startswith(ref.cpython_hash) and ref.flags == []
+                        ),
+                    )
+                    found_base = found_base or found_default_base
+
+        if not found_base and result.fork == "python" and result.flags != []:
+            find_match(
+                result,
+                candidates,
+                "base",
+                lambda ref: (
+                    ref.cpython_hash == result.cpython_hash and ref.flags == []
+                ),
+            )
+
+
+def _make_synthetic_results(n, seed=0):
+    rng = random.Random(seed)
+    commits = [f"{rng.getrandbits(160):040x}" for _ in range(max(n // 5, 10))]
+    versions = ["3.10.4", "3.11.0b3", "3.12.0", "3.13.0a1+", "3.14.0a2+"]
+    all_flags = [[], [], ["JIT"], ["NOGIL"], ["JIT", "NOGIL"]]
+
+    results = []
+    for _ in range(n):
+        commit = rng.choice(commits)
+        result = mod_result.Result(
+            nickname=rng.choice(["linux", "linux2", "darwin"]),
+            machine="x86_64",
+            fork=rng.choice(["python", "python", "python", "faster-cpython"]),
+            ref="main",
+            version=rng.choice(versions),
+            cpython_hash=commit[: rng.choice([7, 7, 7, 10])],
+            flags=rng.choice(all_flags),
+        )
+        metadata = {"benchmark_hash": rng.choice(["aaaaaa", "bbbbbb", "cccccc"])}
+        if rng.random() < 0.8:
+            metadata["commit_merge_base"] = rng.choice(commits)
+        result.set_index_entry(mod_result.result_index.IndexEntry(metadata, None, []))
+        results.append(result)
+    return results
+
+
+def test_match_to_bases(monkeypatch):
+    monkeypatch.chdir(DATA_PATH)
+    monkeypatch.setattr(
+        mod_result, "comparison_factory", lambda ref, head, base: (ref, base)
+    )
+    bases = ["3.10.4", "3.12.0"]
+
+    results = _make_synthetic_results(2000)
+    expected_results = _make_synthetic_results(2000)
+    mod_result.match_to_bases(results, bases, progress=False)
+    _match_to_bases_reference(expected_results, bases)
+
+    index = {id(x): i for i, x in enumerate(results)}
+    expected_index = {id(x): i for i, x in enumerate(expected_results)}
+    n_bases = 0
+    for result, expected in zip(results, expected_results):
+        assert {k: index[id(v[0])] for k, v in result.bases.items()} == {
+            k: expected_index[id(v[0])] for k, v in expected.bases.items()
+        }
+        n_bases += len(result.bases)
+    assert n_bases > 2000
+
+
+@pytest.mark.speed
+def test_match_to_bases_speed(monkeypatch):
+    # 10,000 results should match in well under a second on a typical machine,
+    # with plenty of headroom for slow ones
+    monkeypatch.chdir(DATA_PATH)
+    monkeypatch.setattr(
+        mod_result, "comparison_factory", lambda ref, head, base: (ref, base)
+    )
+    results = _make_synthetic_results(10_000)
+
+    start = time.perf_counter()
+    mod_result.match_to_bases(results, ["3.10.4", "3.12.0"], progress=False)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 5.0, f"{len(results)} results in {elapsed:.3f}s"
+
+
+def _has_result_reference(results_dir, commit_hash, machine, pystats, flags, bhash):
+    # The original implementation, which loads all of the results
+    nickname = None if machine == "all" else machine.split("-")[2]
+    for result in mod_result.load_all_results([], results_dir, False, progress=False):
+        if (
+            commit_hash.startswith(result.cpython_hash)
+            and (
+                result.result_info[0] == "pystats raw"
+                if pystats
+                else (nickname is None or result.nickname == nickname)
+            )
+            and result.flags == flags
+            and result.benchmark_hash == bhash
+        ):
+            return result
+    return None
+
+
+def test_has_result(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    # A pystats result for the same commit and configuration as a raw result,
+    # but a different benchmark hash, which only it can match
+    dirpath = results_path / "bm-20221119-3.12.0a3+-b0e1f9c"
+    with open(
+        dirpath / "bm-20221119-linux-x86_64-python-main-3.12.0a3+-b0e1f9c.json"
+    ) as fd:
+        metadata = json.load(fd)["metadata"]
+    metadata["benchmark_hash"] = "pystat"
+    with open(
+        dirpath / "bm-20221119-linux-x86_64-python-main-3.12.0a3+-b0e1f9c-pystats.json",
+        "w",
+    ) as fd:
+        json.dump({"metadata": metadata}, fd)
+
+    results = mod_result.load_all_results([], results_path, False, use_index=False)
+    benchmark_hashes = set(x.benchmark_hash for x in results)
+    assert len(benchmark_hashes)
+
+    n_found = 0
+    for result in results:
+        for commit_hash in [result.cpython_hash, result.cpython_hash + "0123abcd"]:
+            for machine in ["linux-x86_64-linux", "linux-x86_64-darwin", "all"]:
+                for flags, pystats in itertools.product([[], ["JIT"]], [False, True]):
+                    for bhash in [*benchmark_hashes, "xxxxxx"]:
+                        args = (commit_hash, machine, pystats, flags, bhash)
+                        found = mod_result.has_result(
+                            results_path, *args, progress=False
+                        )
+                        expected = _has_result_reference(results_path, *args)
+                        if expected is None:
+                            assert found is None
+                        else:
+                            assert found.filename == expected.filename
+                            n_found += 1
+                            # Only the metadata should have been read
+                            assert "contents" not in found.__dict__
+    assert n_found > 0
+
+    assert (
+        mod_result.has_result(
+            results_path, "0000000", "all", False, [], "xxxxxx", progress=False
+        )
+        is None
+    )
+
+
+def test_timing_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(DATA_PATH)
+    results_dir = tmp_path / "results"
+    shutil.copytree(DATA_PATH / "results", results_dir)
+    filename = next(results_dir.glob("**/*-3.11.0b3-eb0004c.json"))
+
+    expected = timing_store.load_data(json.loads(filename.read_text()))
+
+    result = mod_result.Result.from_filename(filename)
+    assert timing_store.load(results_dir, result.digest) is None
+    data = result.get_timing_data()
+    assert set(data.keys()) == set(expected.keys())
+    for name, values in expected.items():
+        assert np.array_equal(data[name], values)
+
+    # A fresh result reads the values from the store, without parsing the JSON
+    result = mod_result.Result.from_filename(filename)
+    stored = timing_store.load(results_dir, result.digest)
+    assert stored is not None
+    assert list(stored.keys()) == list(expected.keys())
+    monkeypatch.setattr(mod_result.Result, "contents", property(lambda self: 1 / 0))
+    data = result.get_timing_data()
+    for name, values in expected.items():
+        assert np.array_equal(data[name], values)
+
+
+def test_results_archive(tmp_path, monkeypatch):
+    monkeypatch.chdir(DATA_PATH)
+    results_dir = tmp_path / "results"
+    shutil.copytree(DATA_PATH / "results", results_dir)
+
+    results = mod_result.load_all_results(["3.11.0b3"], results_dir)
+    to_archive = [r for r in results if r.version.startswith("3.12")]
+    assert len(to_archive)
+
+    expected = {}
+    for result in to_archive:
+        compare = result.bases["3.11.0b3"]
+        expected[result.filename] = (
+            result.metadata,
+            result.get_timing_data(),
+            result.get_memory_data(),
+            compare._generate_contents(),
+        )
+
+    assert results_archive.append(results_dir, to_archive) == len(to_archive)
+    # Adding the same results again is a no-op
+    assert results_archive.append(results_dir, to_archive) == 0
+    for result in to_archive:
+        shutil.rmtree(result.filename.parent)
+
+    results = mod_result.load_all_results(["3.11.0b3"], results_dir)
+    assert not any(r.filename in expected for r in results)
+
+    results = mod_result.load_all_results(["3.11.0b3"], results_dir, archive=True)
+    archived = [r for r in results if r.is_archived]
+    assert set(r.filename for r in archived) == set(expected.keys())
+
+    for result in archived:
+        metadata, timing_data, memory_data, contents = expected[result.filename]
+        assert result.metadata == metadata
+        for actual, data in (
+            (result.get_timing_data(), timing_data),
+            (result.get_memory_data(), memory_data),
+        ):
+            assert list(actual.keys()) == list(data.keys())
+            for name, values in data.items():
+                assert np.array_equal(actual[name], values)
+        assert result.bases["3.11.0b3"]._generate_contents() == contents
+
+
+def test_comparison_diffs_are_memoized(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    results = mod_result.load_all_results(["3.10.4"], results_path)
+    (head,) = [x for x in results if x.cpython_hash == "b0e1f9c"]
+    compare = head.bases["3.10.4"]
+
+    calls = collections.Counter()
+    get_combined_data = mod_result.BenchmarkComparison._get_combined_data
+
+    def counting_get_combined_data(self, ref_data, head_data):
+        calls[self] += 1
+        return get_combined_data(self, ref_data, head_data)
+
+    monkeypatch.setattr(
+        mod_result.BenchmarkComparison, "_get_combined_data", counting_get_combined_data
+    )
+
+    for func, suffix, _ in compare.get_files(summary=True):
+        func(mod_result.util.apply_suffix(compare.base_filename, suffix))
+    # Once for the timings, and once for the memory usage in the table
+    assert calls[compare] == 2
+
+    # The base, and its data, is shared by all of the comparisons against it
+    others = [
+        r.bases["3.10.4"]
+        for r in results
+        if r is not head and "3.10.4" in r.bases and r.bases["3.10.4"].valid_comparison
+    ]
+    assert len(others)
+    timing_data = compare.ref._timing_data
+    for other in others:
+        assert other.ref is compare.ref
+        other.get_timing_diff()
+    assert compare.ref._timing_data is timing_data
+
+    head.evict()
+    assert compare.get_timing_diff() is not None
+    assert calls[compare] == 3
+
+
+def test_combined_data_is_bounded(monkeypatch):
+    rng = np.random.default_rng(0)
+    ref_data = {
+        "small": rng.normal(1.0, 0.01, 40),
+        "large": rng.normal(1.0, 0.01, 1000),
+    }
+    head_data = {
+        "small": rng.normal(0.9, 0.01, 40),
+        "large": rng.normal(0.9, 0.01, 1000),
+    }
+    compare = mod_result.BenchmarkComparison(None, None, "base", force_valid=True)
+    monkeypatch.setattr(mod_result.util, "get_excluded_benchmarks", lambda: set())
+    combined = {x[0]: x[1:] for x in compare._get_combined_data(ref_data, head_data)}
+
+    for name, (values, mean) in combined.items():
+        assert values is not None
+        assert np.all(np.diff(values) >= 0)
+        assert len(values) <= mod_result.MAX_DIFF_SAMPLES**2
+
+        ref = ref_data[name]
+        head = head_data[name]
+        keep_ref = abs(ref - ref.mean()) < 2 * ref.std()
+        keep_head = abs(head - head.mean()) < 2 * head.std()
+        exact = np.sort(np.outer(ref[keep_ref], 1.0 / head[keep_head]).ravel())
+        assert mean == pytest.approx(exact.mean(), rel=1e-12)
+        if len(exact) <= mod_result.MAX_DIFF_SAMPLES**2:
+            assert np.array_equal(values, exact)
+        else:
+            quantiles = np.linspace(0, 1, 101)
+            assert np.allclose(
+                np.quantile(values, quantiles),
+                np.quantile(exact, quantiles),
+                atol=(exact[-1] - exact[0]) * 0.01,
+            )
+
+
+def test_trend_store(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    results = mod_result.load_all_results(["3.10.4"], results_path)
+    ref = next(r for r in results if r.version == "3.10.4")
+    heads = [r for r in results if r.fork == "python" and r is not ref]
+    assert len(heads) > 2
+
+    path = trend_store.get_store_path(tmp_path)
+    with trend_store.TrendStore(path) as store:
+        for head in heads[:-1]:
+            point = store.get(ref, head, "3.10.4", trend_store.METRICS)
+            compare = mod_result.BenchmarkComparison(ref, head, "3.10.4")
+            assert point["geometric_mean"] == compare.geometric_mean_float
+            assert point["memory_change"] == compare.memory_change_float
+            assert point["hpt_99"] == compare.hpt_percentile_float(99)
+    lines = path.read_text().splitlines()
+    assert len(lines) == len(heads) - 1
+
+    # New points are appended, and existing points aren't recomputed
+    with trend_store.TrendStore(path) as store:
+        for head in heads:
+            store.get(ref, head, "3.10.4")
+    assert path.read_text().splitlines()[:-1] == lines
+    assert len(path.read_text().splitlines()) == len(heads)
+
+    with trend_store.TrendStore(path) as store:
+        points = store.query(runner=heads[0].nickname, base="3.10.4")
+        dates = [p["commit_datetime"] for p in points]
+        assert dates == sorted(dates)
+        start = datetime.datetime.fromisoformat(dates[1])
+        assert store.query(start=start, runner=heads[0].nickname) == points[1:]
+        # Naive datetimes are assumed to be in UTC
+        naive_start = start.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        assert store.query(start=naive_start, runner=heads[0].nickname) == points[1:]
+
+        # Points without a commit date don't match any range, and sort last
+        unknown = dict(points[0], head="unknown/unknown.json")
+        unknown["commit_datetime"] = "<unknown>"
+        store._points[trend_store._get_point_key(unknown)] = unknown
+        assert store.query(runner=heads[0].nickname, base="3.10.4")[-1] is unknown
+        assert store.query(start=start, runner=heads[0].nickname) == points[1:]
+        del store._points[trend_store._get_point_key(unknown)]
+
+        # Points for purged results are evicted
+        assert store.evict([ref, *heads[1:]]) == 1
+        assert store.remove([heads[1].filename]) == 1
+
+    with trend_store.TrendStore(path) as store:
+        assert len(store) == len(heads) - 2
+
+
+def test_trend_store_metrics(tmp_path, monkeypatch):
+    results_path = _copy_results(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    results = mod_result.load_all_results(["3.10.4"], results_path)
+    ref = next(r for r in results if r.version == "3.10.4")
+    head = next(r for r in results if r.fork == "python" and r is not ref)
+    # Without a table or summary on disk, the other metrics need the full
+    # comparison, but the geometric mean doesn't
+    for filename in head.filename.parent.glob("*-vs-*"):
+        filename.unlink()
+
+    def fail(*args):
+        raise AssertionError("Should only compute the geometric mean")
+
+    path = trend_store.get_store_path(tmp_path)
+    with monkeypatch.context() as m:
+        m.setattr(mod_result.BenchmarkComparison, "_generate_contents", fail)
+        with trend_store.TrendStore(path) as store:
+            point = store.get(ref, head, "3.10.4")
+            assert point["geometric_mean"] is not None
+            assert "memory_change" not in point
+
+    # Other metrics are added when they are asked for
+    with trend_store.TrendStore(path) as store:
+        point = store.get(ref, head, "3.10.4", ["memory_change"])
+        assert "memory_change" in point
+        assert "hpt_99" not in point
+    with trend_store.TrendStore(path) as store:
+        (point,) = store.query()
+        assert "memory_change" in point
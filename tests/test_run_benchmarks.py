@@ -1,4 +1,6 @@
+import errno
 import json
+import os
 from pathlib import Path
 import platform
 import shutil
@@ -351,3 +353,88 @@ def test_run_benchmarks_flags(benchmarks_checkout):
 
 def test_get_benchmark_hash():
     assert util.get_benchmark_hash() == "215d35"
+
+
+def test_collect_pystats_resumes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pystats_dir = tmp_path / "py_stats"
+    monkeypatch.setattr(run_benchmarks, "PYSTATS_DIR", pystats_dir)
+    monkeypatch.setattr(run_benchmarks, "PYSTATS_WORK_DIR", tmp_path / "work")
+
+    benchmarks = ["a", "b", "c", "d"]
+    monkeypatch.setattr(run_benchmarks, "get_benchmark_names", lambda x: benchmarks)
+
+    ran = []
+    crash_on = {"c"}
+
+    def fake_run_benchmarks(python, benchmark, /, extra_args=None, **kwargs):
+        if benchmark in crash_on:
+            raise RuntimeError("crash")
+        ran.append(benchmark)
+        (pystats_dir / f"{benchmark}.txt").write_text(benchmark)
+        if benchmark == "b":
+            raise run_benchmarks.NoBenchmarkError()
+
+    summarized = []
+
+    def fake_run_summarize_stats(python, fork, ref, benchmark, *args, **kwargs):
+        summarized.append((benchmark, sorted(x.name for x in pystats_dir.iterdir())))
+
+    def cross_device_rename(src, dst):
+        # /tmp/py_stats and the work directory are usually on different
+        # filesystems
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(run_benchmarks, "run_benchmarks", fake_run_benchmarks)
+    monkeypatch.setattr(run_benchmarks, "run_summarize_stats", fake_run_summarize_stats)
+    monkeypatch.setattr(os, "rename", cross_device_rename)
+
+    with pytest.raises(RuntimeError):
+        run_benchmarks.collect_pystats("python", "all", "fork", "ref", True)
+    assert ran == ["a", "b"]
+    assert summarized == []
+
+    # Only the benchmarks that didn't finish are run again
+    crash_on = set()
+    run_benchmarks.collect_pystats("python", "all", "fork", "ref", True)
+    assert ran == ["a", "b", "c", "d"]
+    # The failed benchmark is skipped when summarizing individually, but its
+    # stats are still part of the summary of all of them
+    assert summarized == [
+        ("a", ["a.txt"]),
+        ("c", ["c.txt"]),
+        ("d", ["d.txt"]),
+        ("all", ["a.txt", "b.txt", "c.txt", "d.txt"]),
+    ]
+    assert not (tmp_path / "work").exists()
+
+    # A run with different arguments starts from scratch
+    ran.clear()
+    crash_on = {"d"}
+    with pytest.raises(RuntimeError):
+        run_benchmarks.collect_pystats("python", "all", "fork", "ref", False)
+    crash_on = set()
+    run_benchmarks.collect_pystats("python", "all", "fork", "other", False)
+    assert ran == ["a", "b", "c", "a", "b", "c", "d"]
+
+
+def test_perf_to_csv(tmp_path):
+    lines = [
+        "# Samples: 1K of event 'cycles'\n",
+        "#\n",
+        "\n",
+        "    10.00%  300  1234:python  [.] _PyEval_EvalFrameDefault  python  -\n",
+        "     5.00%  150  1234:python  [.] PyObject_Malloc  python  -\n",
+        "     5.00%  150  1234:python  [.] _PyEval_EvalFrameDefault  python  -\n",
+        "     1.00%  100  99:python  [k] do_syscall_64  [kernel.kallsyms]  -\n",
+        "     0.00%    0  1234:python  [.] unused  python  -\n",
+    ]
+    output = tmp_path / "out.csv"
+    run_benchmarks.perf_to_csv(lines, output)
+
+    assert output.read_text().splitlines() == [
+        "self,pid,command,shared_obj,symbol",
+        "450.0,1234,python,python,_PyEval_EvalFrameDefault",
+        "150.0,1234,python,python,PyObject_Malloc",
+        "100.0,99,python,[kernel.kallsyms],do_syscall_64",
+    ]